@@ -0,0 +1,100 @@
+import io
+import zipfile
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable writable stream which collects written chunks."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks += [bytes(data)]
+        return len(data)
+
+    def pop(self) -> bytes:
+        """
+        Get and forget collected chunks.
+
+        Returns
+        -------
+        bytes
+            Data written since previous call.
+        """
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    ZIP archive which is produced incrementally, each added entry is returned
+    as bytes which can be sent to client before the next entry is ready.
+    Entries are stored without compression, because encoded images are
+    already compressed.
+
+    Methods
+    -------
+    add(name, data)
+        Add entry to archive.
+    close()
+        Finish archive.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of ZipStream class.
+
+        Returns
+        -------
+        None
+        """
+        self._sink = _Sink()
+        # zipfile writes data descriptors when output stream isn't seekable
+        self._zip = zipfile.ZipFile(
+            self._sink, mode="w", compression=zipfile.ZIP_STORED
+        )
+        self._names = set()
+
+    def add(self, name: str, data: bytes) -> bytes:
+        """
+        Add entry to archive.
+
+        Parameters
+        ----------
+        name : str
+            Entry name, suffix is added if entry with the same name exists.
+        data : bytes
+            Entry content.
+
+        Returns
+        -------
+        bytes
+            Archive part with the entry.
+        """
+        unique_name, i = name, 1
+        while unique_name in self._names:
+            stem, dot, ext = name.rpartition(".")
+            unique_name = f"{stem}_{i}{dot}{ext}" if dot else f"{name}_{i}"
+            i += 1
+        self._names.add(unique_name)
+
+        with self._zip.open(unique_name, mode="w", force_zip64=True) as f:
+            f.write(data)
+        return self._sink.pop()
+
+    def close(self) -> bytes:
+        """
+        Finish archive.
+
+        Returns
+        -------
+        bytes
+            Central directory of archive.
+        """
+        self._zip.close()
+        return self._sink.pop()
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable
+
+
+def cache_key(data: bytes, *params: Any) -> str:
+    """
+    Get content address of request.
+
+    Parameters
+    ----------
+    data : bytes
+        Request payload, e.g. uploaded image bytes.
+    *params : Any
+        Parameters which change result, e.g. model key and output format.
+
+    Returns
+    -------
+    str
+        Hex digest of SHA-256 hash.
+    """
+    digest = hashlib.sha256(data)
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier content-addressed cache of encoded results with request coalescing.
+    Results are kept in memory LRU tier, entries evicted from memory are spilled
+    to optional disk tier which has its own size limit. Concurrent requests with
+    the same key share one computation.
+
+    Attributes
+    ----------
+    memory_budget : int
+        Maximum total size of memory tier in bytes.
+    disk_path : str
+        Path to disk tier directory, None if disk tier is disabled.
+    disk_budget : int
+        Maximum total size of disk tier in bytes.
+
+    Methods
+    -------
+    get(key)
+        Get cached result.
+    put(key, value)
+        Add result to cache.
+    lookup(key)
+        Get cached result without blocking event loop and count hit.
+    get_or_compute(key, compute)
+        Get cached result or compute it once for all concurrent requests.
+    stats()
+        Get cache statistics.
+    """
+
+    def __init__(
+        self, memory_budget: int, disk_path: str = None, disk_budget: int = 0
+    ) -> None:
+        """
+        Constructor of ResultCache class.
+
+        Parameters
+        ----------
+        memory_budget : int
+            Maximum total size of memory tier in bytes.
+        disk_path : str
+            Path to disk tier directory, None disables disk tier.
+        disk_budget : int
+            Maximum total size of disk tier in bytes.
+
+        Returns
+        -------
+        None
+        """
+        self.memory_budget = memory_budget
+        self.disk_path = disk_path
+        self.disk_budget = disk_budget
+
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+        }
+
+        if disk_path is not None:
+            os.makedirs(disk_path, exist_ok=True)
+            # existing entries are reused from least to most recently accessed
+            entries = []
+            for name in os.listdir(disk_path):
+                stat = os.stat(os.path.join(disk_path, name))
+                if name.endswith(".tmp"):
+                    os.remove(os.path.join(disk_path, name))
+                    continue
+                entries += [(stat.st_mtime, name, stat.st_size)]
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self._disk_bytes += size
+            self._shrink_disk()
+
+    def get(self, key: str) -> tuple[bytes, str]:
+        """
+        Get cached result.
+
+        Parameters
+        ----------
+        key : str
+            Content address of request.
+
+        Returns
+        -------
+        tuple[bytes, str]
+            0. Cached result, None if key isn't cached,
+            1. Tier of result: memory, disk or None.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key], "memory"
+            if key not in self._disk:
+                return None, None
+            self._disk.move_to_end(key)
+
+        path = os.path.join(self.disk_path, key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None, None
+        return value, "disk"
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Add result to memory tier, least recently used results are spilled to disk.
+
+        Parameters
+        ----------
+        key : str
+            Content address of request.
+        value : bytes
+            Result.
+
+        Returns
+        -------
+        None
+        """
+        spilled = []
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key))
+            self._memory[key] = value
+            self._memory_bytes += len(value)
+            while self._memory_bytes > self.memory_budget and self._memory:
+                spilled_key, spilled_value = self._memory.popitem(last=False)
+                self._memory_bytes -= len(spilled_value)
+                spilled += [(spilled_key, spilled_value)]
+
+        if self.disk_path is None:
+            return
+        for spilled_key, spilled_value in spilled:
+            self._write_disk(spilled_key, spilled_value)
+
+    async def lookup(self, key: str) -> tuple[bytes, str]:
+        """
+        Get cached result without blocking event loop and count hit.
+
+        Parameters
+        ----------
+        key : str
+            Content address of request.
+
+        Returns
+        -------
+        tuple[bytes, str]
+            0. Cached result, None if key isn't cached,
+            1. Tier of result: memory, disk or None.
+        """
+        if key in self._disk and key not in self._memory:
+            value, source = await asyncio.to_thread(self.get, key)
+        else:
+            value, source = self.get(key)
+        if value is not None:
+            self._count(f"{source}_hits", len(value))
+        return value, source
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[bytes]]
+    ) -> tuple[bytes, str]:
+        """
+        Get cached result or compute it once for all concurrent requests.
+
+        Parameters
+        ----------
+        key : str
+            Content address of request.
+        compute : Callable[[], Awaitable[bytes]]
+            Coroutine function which computes result.
+
+        Returns
+        -------
+        tuple[bytes, str]
+            0. Result,
+            1. Its source: memory, disk, coalesced or miss.
+        """
+        value, source = await self.lookup(key)
+        if value is not None:
+            return value, source
+
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    break
+            try:
+                # shield keeps shared result when waiting request is cancelled
+                value = await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                # request which computed result was cancelled, so it's recomputed
+                if not future.cancelled():
+                    raise
+                continue
+            self._count("coalesced", len(value))
+            return value, "coalesced"
+
+        try:
+            value = await compute()
+            self._count("misses")
+            # result is cached before waiters are released, so it's computed once
+            if self.disk_path is not None:
+                await asyncio.to_thread(self.put, key, value)
+            else:
+                self.put(key, value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+        future.set_result(value)
+        return value, "miss"
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns
+        -------
+        dict[str, Any]
+            Hits per tier, coalesced requests, misses, hit ratio, saved bytes
+            and size of tiers.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["disk_entries"] = len(self._disk)
+            stats["disk_bytes"] = self._disk_bytes
+
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["coalesced"]
+        total = hits + stats["misses"]
+        stats["hit_ratio"] = hits / total if total else 0.0
+        return stats
+
+    def _count(self, name: str, nbytes: int = 0) -> None:
+        """
+        Update counters.
+
+        Parameters
+        ----------
+        name : str
+            Counter name.
+        nbytes : int
+            Number of bytes which weren't computed.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._counters[name] += 1
+            self._counters["bytes_saved"] += nbytes
+
+    def _write_disk(self, key: str, value: bytes) -> None:
+        """
+        Write result to disk tier, least recently used results are removed.
+
+        Parameters
+        ----------
+        key : str
+            Content address of request.
+        value : bytes
+            Result.
+
+        Returns
+        -------
+        None
+        """
+        if len(value) > self.disk_budget:
+            return
+        path = os.path.join(self.disk_path, key)
+        # file is renamed after writing, so readers never see partial result
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(value)
+        os.replace(f"{path}.tmp", path)
+
+        with self._lock:
+            self._disk_bytes += len(value) - self._disk.pop(key, 0)
+            self._disk[key] = len(value)
+        self._shrink_disk()
+
+    def _shrink_disk(self) -> None:
+        """
+        Remove least recently used results while disk tier exceeds its budget.
+
+        Returns
+        -------
+        None
+        """
+        removed = []
+        with self._lock:
+            while self._disk_bytes > self.disk_budget and self._disk:
+                key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                removed += [key]
+        for key in removed:
+            try:
+                os.remove(os.path.join(self.disk_path, key))
+            except OSError:
+                pass
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+
+class CostModel:
+    """
+    Inference cost of model configs in seconds per input megapixel for each
+    backend, calibrated by utils/calibrate_cost.py.
+
+    Attributes
+    ----------
+    path : str
+        Path to JSON file with costs.
+
+    Methods
+    -------
+    estimate(key, backend, megapixels)
+        Estimate inference time of one image.
+    update(key, backend, seconds_per_megapixel)
+        Set cost of model config.
+    save()
+        Write costs to JSON file.
+    """
+
+    def __init__(self, path: str = None) -> None:
+        """
+        Constructor of CostModel class, costs are loaded from file if it exists.
+
+        Parameters
+        ----------
+        path : str
+            Path to JSON file with costs in {config: {backend: seconds}} format.
+
+        Returns
+        -------
+        None
+        """
+        self.path = path
+        self._costs = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._costs = json.load(f)
+
+    def estimate(self, key: str, backend: str, megapixels: float) -> float:
+        """
+        Estimate inference time of one image.
+
+        Parameters
+        ----------
+        key : str
+            Model config name, e.g. pretrained/RealESRGAN_x4plus.
+        backend : str
+            Inference backend, e.g. torch or onnx.
+        megapixels : float
+            Input image size in megapixels.
+
+        Returns
+        -------
+        float
+            Estimated time in seconds, None if config isn't calibrated.
+        """
+        with self._lock:
+            cost = self._costs.get(key, {}).get(backend)
+        if cost is None:
+            return None
+        return cost * megapixels
+
+    def update(self, key: str, backend: str, seconds_per_megapixel: float) -> None:
+        """
+        Set cost of model config.
+
+        Parameters
+        ----------
+        key : str
+            Model config name, e.g. pretrained/RealESRGAN_x4plus.
+        backend : str
+            Inference backend, e.g. torch or onnx.
+        seconds_per_megapixel : float
+            Inference time in seconds per input megapixel.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self._costs.setdefault(key, {})[backend] = seconds_per_megapixel
+
+    def save(self) -> None:
+        """
+        Write costs to JSON file.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            costs = {key: dict(value) for key, value in sorted(self._costs.items())}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(costs, f, indent=4)
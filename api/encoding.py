@@ -0,0 +1,189 @@
+import io
+
+import cv2
+import numpy as np
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "npy": "application/x-npy",
+}
+ALIASES = {"jpg": "jpeg", "image/jpg": "jpeg"}
+DEFAULT_FORMAT = "png"
+DEFAULT_QUALITY = 95
+
+
+def negotiate_format(accept: str = None, fmt: str = None) -> str:
+    """
+    Choose output format from query parameter or Accept header.
+    Query parameter has priority, media types from Accept header are checked
+    in order of their quality values.
+
+    Parameters
+    ----------
+    accept : str
+        Accept header value.
+    fmt : str
+        Format from query parameter, one of png, webp, jpeg, npy.
+
+    Returns
+    -------
+    str
+        Output format.
+    """
+    if fmt is not None:
+        fmt = ALIASES.get(fmt.lower(), fmt.lower())
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(
+                f"format {fmt} is not supported, use one of {list(MEDIA_TYPES)}."
+            )
+        return fmt
+
+    if not accept:
+        return DEFAULT_FORMAT
+
+    media_formats = {media: name for name, media in MEDIA_TYPES.items()}
+    candidates = []
+    for i, part in enumerate(accept.split(",")):
+        media, *params = [x.strip() for x in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        candidates += [(-q, i, media.lower())]
+
+    for neg_q, _, media in sorted(candidates):
+        if neg_q == 0:
+            break
+        media = ALIASES.get(media, media)
+        if media in media_formats:
+            return media_formats[media]
+        if media in ["*/*", "image/*"]:
+            return DEFAULT_FORMAT
+    raise ValueError(f"none of media types {accept} is supported.")
+
+
+def check_options(quality: int = None, compression: int = None) -> None:
+    """
+    Check encoding options.
+
+    Parameters
+    ----------
+    quality : int
+        Quality in [0, 100] for jpeg and webp.
+    compression : int
+        PNG compression level in [0, 9].
+
+    Returns
+    -------
+    None
+    """
+    if quality is not None and not 0 <= quality <= 100:
+        raise ValueError(f"quality should be in [0, 100], got {quality}.")
+    if compression is not None and not 0 <= compression <= 9:
+        raise ValueError(f"compression should be in [0, 9], got {compression}.")
+
+
+def encode_image(
+    img: np.ndarray, fmt: str, quality: int = None, compression: int = None
+) -> bytes:
+    """
+    Encode image into output format.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        Image in (h, w, c) format.
+    fmt : str
+        Output format, one of png, webp, jpeg, npy.
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9], OpenCV default if None.
+
+    Returns
+    -------
+    bytes
+        Encoded image.
+    """
+    check_options(quality, compression)
+
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(img, dtype=np.uint8))
+        return buffer.getvalue()
+
+    _, enc_img = cv2.imencode(f".{fmt}", img, _params(fmt, quality, compression))
+    return enc_img.tobytes()
+
+
+def encode_image_file(
+    img: np.ndarray, fmt: str, path: str, quality: int = None, compression: int = None
+) -> None:
+    """
+    Encode image into output format and write it to file without keeping
+    encoded image in memory.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        Image in (h, w, c) format.
+    fmt : str
+        Output format, one of png, webp, jpeg, npy.
+    path : str
+        Path to output file, its extension should match format for images.
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9], OpenCV default if None.
+
+    Returns
+    -------
+    None
+    """
+    check_options(quality, compression)
+
+    if fmt == "npy":
+        with open(path, "wb") as f:
+            np.save(f, np.ascontiguousarray(img, dtype=np.uint8))
+        return
+
+    if not cv2.imwrite(path, img, _params(fmt, quality, compression)):
+        raise ValueError(f"can't write image to {path}.")
+
+
+def _params(fmt: str, quality: int = None, compression: int = None) -> list[int]:
+    """
+    Get OpenCV encoding parameters.
+
+    Parameters
+    ----------
+    fmt : str
+        Output format, one of png, webp, jpeg.
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9], OpenCV default if None.
+
+    Returns
+    -------
+    list[int]
+        Encoding parameters.
+    """
+    if fmt == "png":
+        if compression is None:
+            return []
+        return [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    if fmt == "webp":
+        # quality above 100 means lossless compression
+        return [cv2.IMWRITE_WEBP_QUALITY, 101 if quality is None else quality]
+    if fmt == "jpeg":
+        return [
+            cv2.IMWRITE_JPEG_QUALITY,
+            DEFAULT_QUALITY if quality is None else quality,
+        ]
+    raise ValueError(f"format {fmt} is not supported.")
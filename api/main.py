@@ -1,24 +1,93 @@
+import asyncio
+import hashlib
+import io
 import logging
+import math
 import os
 import sys
+import tempfile
+import threading
 import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable
 
 import cv2
 import numpy as np
 import requests
-import torch.cuda
 import yaml
-from fastapi import FastAPI, HTTPException, UploadFile
-from fastapi.responses import FileResponse, Response
+from fastapi import FastAPI, Header, HTTPException, Query, Request, UploadFile
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 root = Path(__file__).parents[1]
 sys.path.insert(0, str(root))
 
 import model as model_registry
+from api.archive import ZipStream
+from api.cache import ResultCache, cache_key
+from api.cost import CostModel
+from api.encoding import (
+    MEDIA_TYPES,
+    check_options,
+    encode_image,
+    encode_image_file,
+    negotiate_format,
+)
+from api.memory import MemoryTrace
+from api.metrics import Counter, Gauge, Histogram, Registry, resolution_bucket
+from api.pool import ModelPool
+from api.scheduler import (
+    InferenceScheduler,
+    LatencyBudgetError,
+    QueueFullError,
+    SchedulerClosedError,
+)
+from api.upload import (
+    HEADER_BYTES,
+    UploadLimitMiddleware,
+    file_buffer,
+    image_size,
+    read_image_size,
+)
 from utils.parse import parse_yaml
 
+MAX_BATCH_SIZE = int(os.environ.get("SRGB_MAX_BATCH_SIZE", 4))
+BATCH_WINDOW_MS = float(os.environ.get("SRGB_BATCH_WINDOW_MS", 10))
+MAX_QUEUE_SIZE = int(os.environ.get("SRGB_MAX_QUEUE_SIZE", 16))
+MODEL_CONCURRENCY = int(os.environ.get("SRGB_MODEL_CONCURRENCY", 1))
+MODEL_POOL_BUDGET_MB = float(os.environ.get("SRGB_MODEL_POOL_BUDGET_MB", 8192))
+ENCODE_WORKERS = int(os.environ.get("SRGB_ENCODE_WORKERS", 2))
+CACHE_MEMORY_MB = float(os.environ.get("SRGB_CACHE_MEMORY_MB", 256))
+CACHE_DIR = os.environ.get("SRGB_CACHE_DIR")
+CACHE_DISK_MB = float(os.environ.get("SRGB_CACHE_DISK_MB", 2048))
+SPILL_MEGAPIXELS = float(os.environ.get("SRGB_SPILL_MEGAPIXELS", 8))
+SPILL_DIR = os.environ.get("SRGB_SPILL_DIR")
+MAX_BATCH_FILES = int(os.environ.get("SRGB_MAX_BATCH_FILES", 256))
+MAX_UPLOAD_MB = float(os.environ.get("SRGB_MAX_UPLOAD_MB", 64))
+MAX_BATCH_UPLOAD_MB = float(os.environ.get("SRGB_MAX_BATCH_UPLOAD_MB", 1024))
+COST_MODEL_PATH = os.environ.get(
+    "SRGB_COST_MODEL", str(root / "configs/cost_model.json")
+)
+# admission by latency SLO applies only to model configs calibrated with
+# utils/calibrate_cost.py, other configs are admitted by queue size only
+LATENCY_SLO_S = float(os.environ.get("SRGB_LATENCY_SLO_S", 30))
+BATCH_CONCURRENCY = 2 * MAX_BATCH_SIZE
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"]
+WARMUP_SHAPES = [
+    shape for shape in os.environ.get("SRGB_WARMUP_SHAPES", "270p").split(",") if shape
+]
+
 
 def load_triton_model(triton_url: str, model_name: str) -> None:
     """
@@ -81,21 +150,445 @@ def set_cpu_mode(config: dict[str, Any]) -> dict[str, Any]:
     return config
 
 
-app = FastAPI()
+class ServedModel:
+    """
+    Configured upsampler with its own inference scheduler.
+
+    Attributes
+    ----------
+    key : str
+        Model key in the pool.
+    config : dict[str, Any]
+        Model configuration dictionary.
+    upsampler : Any
+        Configured upsampler.
+    outscale : float
+        Upscale factor of model.
+    scheduler : InferenceScheduler
+        Scheduler which batches requests to this model.
+
+    Methods
+    -------
+    cost(h, w)
+        Estimate inference time of image.
+    close()
+        Process queued requests and stop scheduler.
+    """
 
-init_model = "RealESRGAN_x4plus"
-app.config_path = str(root / f"configs/model/pretrained/{init_model}.yaml")
-app.config = parse_yaml(app.config_path)
+    def __init__(self, key: str, config: dict[str, Any], upsampler: Any) -> None:
+        """
+        Constructor of ServedModel class.
+
+        Parameters
+        ----------
+        key : str
+            Model key in the pool.
+        config : dict[str, Any]
+            Model configuration dictionary.
+        upsampler : Any
+            Configured upsampler.
+
+        Returns
+        -------
+        None
+        """
+        self.key = key
+        self.config = config
+        self.upsampler = upsampler
+
+        if "outscale" in config:
+            self.outscale = config["outscale"]
+        elif "network_g" in config and "upscale" in config["network_g"]:
+            self.outscale = config["network_g"]["upscale"]
+        else:
+            self.outscale = 4
+
+        # models without batched forward don't wait for other requests
+        batched = getattr(model_registry, config["model"]).batched(config)
+        self.scheduler = InferenceScheduler(
+            self._predict_batch,
+            max_batch_size=MAX_BATCH_SIZE if batched else 1,
+            batch_window=BATCH_WINDOW_MS / 1000 if batched else 0.0,
+            name=config["filename"],
+            max_queue_size=MAX_QUEUE_SIZE,
+            workers=MODEL_CONCURRENCY,
+            cost=lambda img: self.cost(img.shape[0], img.shape[1]),
+            slo=LATENCY_SLO_S,
+        )
 
-if app.config["backend"] == "triton":
-    app.triton_url = "triton:8000"
-    app.config["triton_url"] = app.triton_url
-    load_triton_model(app.triton_url, init_model)
+    def cost(self, h: int, w: int) -> float:
+        """
+        Estimate inference time of image using calibrated cost model.
+
+        Parameters
+        ----------
+        h : int
+            Input height.
+        w : int
+            Input width.
+
+        Returns
+        -------
+        float
+            Estimated time in seconds, None if model config isn't calibrated.
+        """
+        return app.costs.estimate(self.key, self.config["backend"], h * w / 10**6)
+
+    def _predict_batch(self, imgs: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Enhance batch of images with the same shape.
+
+        Parameters
+        ----------
+        imgs : list[np.ndarray]
+            Images in (h, w, c) format.
+
+        Returns
+        -------
+        list[np.ndarray]
+            High resolution images in (h*, w*, c) format.
+        """
+        module = getattr(model_registry, self.config["model"])
+        return module.predict_batch(imgs, self.upsampler)
+
+    def close(self) -> None:
+        """
+        Process queued requests and stop scheduler.
+
+        Returns
+        -------
+        None
+        """
+        self.scheduler.close()
+
+
+def build_model(key: str, config: dict[str, Any]) -> ServedModel:
+    """
+    Build upsampler from configuration dictionary.
 
-if torch.cuda.device_count() < 1 and app.config["backend"] != "triton":
-    app.config = set_cpu_mode(app.config)
+    Parameters
+    ----------
+    key : str
+        Model key in the pool.
+    config : dict[str, Any]
+        Model configuration dictionary.
+
+    Returns
+    -------
+    ServedModel
+        Configured upsampler with its scheduler.
+    """
+    if "backend" in config and config["backend"] == "triton":
+        config["triton_url"] = app.triton_url
+        load_triton_model(app.triton_url, config["triton_model_name"])
+
+    if config["backend"] != "triton":
+        # torch is imported with the first model, so server starts without it
+        import torch.cuda
+
+        if torch.cuda.device_count() < 1:
+            config = set_cpu_mode(config)
+    # model is warmed up before it serves requests, so first user isn't slowed down
+    upsampler = getattr(model_registry, config["model"]).configure(
+        root, config, WARMUP_SHAPES
+    )
+    model = ServedModel(key, config, upsampler)
+    if LATENCY_SLO_S and model.cost(1, 1) is None:
+        logger.warning(
+            f"{key} ({config['backend']}) isn't in cost model {COST_MODEL_PATH}, "
+            "latency SLO admission is disabled, run utils/calibrate_cost.py"
+        )
+    return model
+
+
+def model_footprint(model: ServedModel) -> int:
+    """
+    Estimate memory footprint of model as total size of its weight files.
+
+    Parameters
+    ----------
+    model : ServedModel
+        Configured upsampler with its scheduler.
+
+    Returns
+    -------
+    int
+        Estimated footprint in bytes.
+    """
+    config = model.config
+    if config["backend"] == "onnx":
+        paths = [config.get("onnx")]
+    else:
+        paths = [
+            config.get("weights"),
+            config.get("path", {}).get("pretrain_network_g"),
+        ]
+    return sum(
+        os.path.getsize(root / path)
+        for path in paths
+        if path and os.path.exists(root / path)
+    )
+
+
+def release_model(key: str, model: ServedModel) -> None:
+    """
+    Release model evicted from the pool, queued requests are processed first.
+
+    Parameters
+    ----------
+    key : str
+        Model key in the pool.
+    model : ServedModel
+        Configured upsampler with its scheduler.
+
+    Returns
+    -------
+    None
+    """
+    model.close()
+    if "backend" in model.config and model.config["backend"] == "triton":
+        unload_triton_model(app.triton_url, model.config["triton_model_name"])
+    logger.debug(f"evicted model {key} from pool")
+
+
+def get_model(key: str, config: dict[str, Any]) -> ServedModel:
+    """
+    Get model from the pool or load it into the pool.
+
+    Parameters
+    ----------
+    key : str
+        Model key in the pool.
+    config : dict[str, Any]
+        Model configuration dictionary, used if model isn't in the pool.
+
+    Returns
+    -------
+    ServedModel
+        Configured upsampler with its scheduler.
+    """
+    try:
+        return app.pool.get(key, lambda: build_model(key, config))
+    except AttributeError:
+        raise HTTPException(
+            status_code=400, detail=f"model '{config['model']}' is not supported."
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="something went wrong with model configuration."
+        )
+
+
+def load_config(config_name: str) -> dict[str, Any]:
+    """
+    Load model configuration dictionary by its config name.
+
+    Parameters
+    ----------
+    config_name : str
+        Model config name in pretrained/model or trained/model format.
+
+    Returns
+    -------
+    dict[str, Any]
+        Model configuration dictionary.
+    """
+    try:
+        return parse_yaml(str(root / f"configs/model/{config_name}.yaml"))
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"config '{config_name}' is not supported."
+        )
+
+
+def check_config(config: dict[str, Any]) -> None:
+    """
+    Check that model configuration can be loaded, used before background switch,
+    so invalid config is rejected with 400 status code.
+
+    Parameters
+    ----------
+    config : dict[str, Any]
+        Model configuration dictionary.
+
+    Returns
+    -------
+    None
+    """
+    if not isinstance(config, dict):
+        raise HTTPException(status_code=400, detail="config should be a YAML mapping.")
+    if config.get("model") not in model_registry.available():
+        raise HTTPException(
+            status_code=400, detail=f"model '{config.get('model')}' is not supported."
+        )
+    if "backend" not in config:
+        raise HTTPException(status_code=400, detail="config has no backend.")
+
+
+def get_model_by_name(config_name: str) -> ServedModel:
+    """
+    Get model by its config name from the pool or load it into the pool.
+
+    Parameters
+    ----------
+    config_name : str
+        Model config name in pretrained/model or trained/model format.
+
+    Returns
+    -------
+    ServedModel
+        Configured upsampler with its scheduler.
+    """
+    return get_model(config_name, load_config(config_name))
+
+
+def swap_model(
+    key: str, config: dict[str, Any], config_path: str, generation: int
+) -> ServedModel:
+    """
+    Load and warm up model while active model keeps serving, then make it active.
+    Previous active model is unpinned, so the pool releases it after processing
+    its queue if memory budget is exceeded. Initial model is loaded the same way
+    when server starts.
+
+    Parameters
+    ----------
+    key : str
+        Model key in the pool.
+    config : dict[str, Any]
+        Model configuration dictionary, used if model isn't in the pool.
+    config_path : str
+        Path to config file, None for uploaded config.
+    generation : int
+        Number of switch request, model isn't activated if newer switch
+        was requested.
+
+    Returns
+    -------
+    ServedModel
+        Loaded model.
+    """
+    start = time.perf_counter()
+    try:
+        model = get_model(key, config)
+    except Exception as exc:
+        with app.swap_lock:
+            if app.swap["generation"] == generation:
+                app.swap["state"] = "failed"
+                app.swap["error"] = getattr(exc, "detail", str(exc))
+        raise
+
+    with app.swap_lock:
+        if app.swap["generation"] != generation:
+            return model
+        previous_key = app.model_key
+        app.pool.pin(key)
+        app.model, app.model_key, app.config_path = model, key, config_path
+        app.swap["state"] = "ready"
+        app.swap["load_time"] = time.perf_counter() - start
+
+    if previous_key is not None and previous_key != key:
+        app.pool.unpin(previous_key)
+
+    logger.debug(f"set new config path = {app.config_path}")
+    logger.debug(f"set new config dict = {model.config}")
+    logger.debug(f"model switch time = {time.perf_counter() - start:.3f}")
+    return model
+
+
+def start_swap(
+    key: str, config: dict[str, Any], config_path: str, wait: bool
+) -> dict[str, Any]:
+    """
+    Start background model switch.
+
+    Parameters
+    ----------
+    key : str
+        Model key in the pool.
+    config : dict[str, Any]
+        Model configuration dictionary, used if model isn't in the pool.
+    config_path : str
+        Path to config file, None for uploaded config.
+    wait : bool
+        Wait until model is loaded and activated.
+
+    Returns
+    -------
+    dict[str, Any]
+        Dictionary with model configuration parameters.
+    """
+    with app.swap_lock:
+        generation = app.swap["generation"] + 1
+        app.swap = {
+            "state": "loading",
+            "target": key,
+            "generation": generation,
+            "error": None,
+            "load_time": None,
+            "started": time.perf_counter(),
+        }
+    future = app.loader.submit(swap_model, key, config, config_path, generation)
+    if not wait:
+        # config is changed by loading thread, so copy is returned
+        return dict(config)
+
+    try:
+        return future.result().config
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=400, detail="something went wrong with model configuration."
+        )
+
+
+def startup() -> None:
+    """
+    Start loading of initial model, server accepts connections while model
+    is loading and reports progress in /health/ready.
+
+    Returns
+    -------
+    None
+    """
+    config_path = str(root / f"configs/model/{app.init_model}.yaml")
+    start_swap(app.init_model, load_config(app.init_model), config_path, wait=False)
+
+
+def shutdown() -> None:
+    """
+    Process queued requests and stop inference schedulers of all models.
+
+    Returns
+    -------
+    None
+    """
+    app.loader.shutdown(cancel_futures=True)
+    app.encoder.shutdown()
+    for key in app.pool.keys():
+        app.pool.evict(key)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Run startup before server accepts requests and shutdown after it stops.
+
+    Parameters
+    ----------
+    app : FastAPI
+        Application instance.
+
+    Returns
+    -------
+    AsyncIterator[None]
+        Context which is active while server runs.
+    """
+    startup()
+    yield
+    shutdown()
 
-app.upsampler = getattr(model_registry, app.config["model"]).configure(root, app.config)
 
 logger = logging.getLogger("uvicorn")
 formatter = logging.Formatter("%(asctime)s [%(levelname)-5.5s] %(message)s")
@@ -106,11 +599,182 @@ os.makedirs(logs_path, exist_ok=True)
 file_handler = logging.FileHandler(f"{logs_path}/api.log")
 file_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
+# warmup times are logged by model modules
+logging.getLogger("model").addHandler(file_handler)
+logging.getLogger("model").setLevel("INFO")
 
 logger.setLevel("DEBUG")
 
-logger.debug(f"set config path = {app.config_path}")
-logger.debug(f"set config dict = {app.config}")
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/upscale/file": int(MAX_UPLOAD_MB * 2**20),
+        "/upscale/batch": int(MAX_BATCH_UPLOAD_MB * 2**20),
+    },
+)
+app.triton_url = "triton:8000"
+app.pool = ModelPool(
+    budget=int(MODEL_POOL_BUDGET_MB * 2**20),
+    estimate=model_footprint,
+    on_evict=release_model,
+)
+
+# initial model is loaded in background after startup, see startup function
+app.init_model = "pretrained/RealESRGAN_x4plus"
+app.config_path = None
+app.model_key = None
+app.model = None
+
+# seconds per megapixel of model configs, written by utils/calibrate_cost.py
+app.costs = CostModel(COST_MODEL_PATH)
+
+app.cache = ResultCache(
+    memory_budget=int(CACHE_MEMORY_MB * 2**20),
+    disk_path=CACHE_DIR,
+    disk_budget=int(CACHE_DISK_MB * 2**20),
+)
+
+# encoding releases GIL, so it runs in threads without blocking event loop
+app.encoder = ThreadPoolExecutor(
+    max_workers=ENCODE_WORKERS, thread_name_prefix="encoder"
+)
+
+# models are switched one by one in background thread
+app.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+app.swap_lock = threading.Lock()
+app.swap = {
+    "state": "loading",
+    "target": app.init_model,
+    "generation": 0,
+    "error": None,
+    "load_time": None,
+    "started": time.perf_counter(),
+}
+
+app.metrics = Registry()
+stage_seconds = app.metrics.register(
+    Histogram(
+        "srgb_request_stage_seconds",
+        "Duration of upscale request stage in seconds.",
+        ("stage", "model", "resolution"),
+    )
+)
+requests_total = app.metrics.register(
+    Counter(
+        "srgb_requests_total",
+        "Number of handled requests.",
+        ("endpoint", "status"),
+    )
+)
+errors_total = app.metrics.register(
+    Counter(
+        "srgb_errors_total",
+        "Number of failed requests and failed images of batch requests.",
+        ("endpoint", "reason"),
+    )
+)
+cache_results_total = app.metrics.register(
+    Counter(
+        "srgb_cache_results_total",
+        "Number of upscale results by source: memory, disk, coalesced, miss, spill.",
+        ("model", "source"),
+    )
+)
+app.metrics.register(
+    Gauge(
+        "srgb_queue_depth",
+        "Number of requests waiting in scheduler queue of model.",
+        lambda: {
+            (key,): model.scheduler.stats()["queue_depth"]
+            for key, model in app.pool.items()
+        },
+        ("model",),
+    )
+)
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next: Callable) -> Response:
+    """
+    Count requests and errors by endpoint and status code.
+
+    Parameters
+    ----------
+    request : Request
+        Incoming request.
+    call_next : Callable
+        Next request handler.
+
+    Returns
+    -------
+    Response
+        Response of handler.
+    """
+    # unknown paths share one label, so scanners can't create new series
+    paths = {route.path for route in app.routes}
+    endpoint = request.url.path if request.url.path in paths else "other"
+    try:
+        response = await call_next(request)
+    except Exception:
+        requests_total.inc(endpoint=endpoint, status=500)
+        errors_total.inc(endpoint=endpoint, reason=500)
+        raise
+
+    requests_total.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        errors_total.inc(endpoint=endpoint, reason=response.status_code)
+    return response
+
+
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """
+    Get metrics in Prometheus text format.
+
+    Returns
+    -------
+    PlainTextResponse
+        Per-stage latency histograms, request, error and cache counters
+        and queue depth of each resident model.
+    """
+    return PlainTextResponse(
+        app.metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/health/live")
+def health_live() -> dict[str, str]:
+    """
+    Check that server is running, model doesn't have to be loaded.
+
+    Returns
+    -------
+    dict[str, str]
+        Server status.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def health_ready() -> JSONResponse:
+    """
+    Check that server is ready to upscale images with configured model.
+
+    Returns
+    -------
+    JSONResponse
+        Model loading progress, status code is 200 if configured model is loaded
+        and 503 otherwise.
+    """
+    status = configure_model_status()
+    ready = app.model is not None
+    status["ready"] = ready
+    return JSONResponse(
+        status,
+        status_code=200 if ready else 503,
+        headers=None if ready else {"Retry-After": "1"},
+    )
 
 
 @app.get("/info")
@@ -130,83 +794,158 @@ def info() -> FileResponse:
     return info_file
 
 
-@app.post("/configure_model/name")
-def configure_model(config_name: str) -> dict[str, Any]:
+@app.get("/stats/scheduler")
+def scheduler_stats() -> dict[str, Any]:
+    """
+    Get inference scheduler statistics of all resident models.
+
+    Returns
+    -------
+    dict[str, Any]
+        Queue depth, batch size histogram and per-request wait time statistics
+        for each model.
+    """
+    return {key: model.scheduler.stats() for key, model in app.pool.items()}
+
+
+@app.get("/stats/pool")
+def pool_stats() -> dict[str, Any]:
+    """
+    Get model pool statistics.
+
+    Returns
+    -------
+    dict[str, Any]
+        Pool hits, misses, evictions and resident bytes per model.
+    """
+    return app.pool.stats()
+
+
+@app.get("/stats/cache")
+def cache_stats() -> dict[str, Any]:
+    """
+    Get result cache statistics.
+
+    Returns
+    -------
+    dict[str, Any]
+        Hits per tier, coalesced requests, misses, hit ratio and saved bytes.
+    """
+    return app.cache.stats()
+
+
+@app.get("/estimate")
+def estimate(height: int, width: int, config_name: str = None) -> dict[str, Any]:
     """
-    Configure model using its config name.
+    Estimate completion time of upscale request before uploading image.
 
     Parameters
     ----------
+    height : int
+        Input height.
+    width : int
+        Input width.
     config_name : str
-        Model config name in pretrained/model or trained/model format.
+        Model config name in pretrained/model or trained/model format,
+        if None configured model is used.
 
     Returns
     -------
     dict[str, Any]
-        Dictionary with model configuration parameters.
+        Estimated inference time and completion time with current queue
+        in seconds (None if model config isn't calibrated), latency SLO,
+        whether model config is calibrated and whether request would be
+        admitted now.
     """
-    if "backend" in app.config and app.config["backend"] == "triton":
-        try:
-            tmp_model_name = app.config["triton_model_name"]
-            unload_triton_model(app.triton_url, tmp_model_name)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="something went wrong with unloading triton model.",
-            )
-
-    previous_config, previous_config_path = app.config, app.config_path
-    try:
-        app.config_path = str(root / f"configs/model/{config_name}.yaml")
-        app.config = parse_yaml(app.config_path)
-    except ValueError:
-        app.config_path = previous_config_path
-        app.config = previous_config
+    key = config_name or app.model_key
+    if key is None:
         raise HTTPException(
-            status_code=400, detail=f"config '{config_name}' is not supported."
+            status_code=503,
+            detail="model is loading, see /health/ready.",
+            headers={"Retry-After": "1"},
         )
+    model = dict(app.pool.items()).get(key)
+    backend = (model.config if model is not None else load_config(key))["backend"]
+    cost = app.costs.estimate(key, backend, height * width / 10**6)
+
+    estimated_time = None
+    if cost is not None:
+        # model which isn't in the pool has empty queue
+        estimated_time = model.scheduler.estimate(cost) if model else cost
+    admitted = (
+        not LATENCY_SLO_S or estimated_time is None or estimated_time <= LATENCY_SLO_S
+    )
+    return {
+        "model": key,
+        "inference_time": cost,
+        "estimated_time": estimated_time,
+        "slo": LATENCY_SLO_S,
+        "calibrated": cost is not None,
+        "admitted": admitted,
+    }
+
+
+@app.get("/configure_model/status")
+def configure_model_status() -> dict[str, Any]:
+    """
+    Get status of the last model switch.
 
-    if "backend" in app.config and app.config["backend"] == "triton":
-        try:
-            app.config["triton_url"] = app.triton_url
-            load_triton_model(app.triton_url, app.config["triton_model_name"])
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="something went wrong with loading triton model.",
-            )
+    Returns
+    -------
+    dict[str, Any]
+        Switch state (loading, ready or failed), target and active model keys,
+        error message, switch time and time since switch was requested.
+    """
+    with app.swap_lock:
+        status = {
+            key: value
+            for key, value in app.swap.items()
+            if key not in ["generation", "started"]
+        }
+        status["active"] = app.model_key
+        status["elapsed"] = time.perf_counter() - app.swap["started"]
+    return status
 
-    try:
-        if torch.cuda.device_count() < 1 and app.config["backend"] != "triton":
-            app.config = set_cpu_mode(app.config)
-        app.upsampler = getattr(model_registry, app.config["model"]).configure(
-            root, app.config
-        )
-    except AttributeError:
-        raise HTTPException(
-            status_code=400, detail=f"model '{app.config['model']}' is not supported."
-        )
-    except ValueError:
-        raise HTTPException(
-            status_code=400, detail="something went wrong with model configuration."
-        )
 
-    logger.debug("used /configure_model/name")
-    logger.debug(f"set new config path = {app.config_path}")
-    logger.debug(f"set new config dict = {app.config}")
+@app.post("/configure_model/name")
+def configure_model(config_name: str, wait: bool = False) -> dict[str, Any]:
+    """
+    Configure model using its config name. Model is loaded in background,
+    active model serves requests until new one is ready.
 
-    return app.config
+    Parameters
+    ----------
+    config_name : str
+        Model config name in pretrained/model or trained/model format.
+    wait : bool
+        Wait until model is loaded and activated.
+
+    Returns
+    -------
+    dict[str, Any]
+        Dictionary with model configuration parameters.
+    """
+    config_path = str(root / f"configs/model/{config_name}.yaml")
+    config = load_config(config_name)
+    check_config(config)
+    config = start_swap(config_name, config, config_path, wait)
+
+    logger.debug("used /configure_model/name")
+    return config
 
 
 @app.post("/configure_model/file")
-def configure_model_file(config_file: UploadFile) -> dict[str, Any]:
+def configure_model_file(config_file: UploadFile, wait: bool = False) -> dict[str, Any]:
     """
-    Configure model using its config YAML file.
+    Configure model using its config YAML file. Model is loaded in background,
+    active model serves requests until new one is ready.
 
     Parameters
     ----------
     config_file : UploadFile
         Config YAML file.
+    wait : bool
+        Wait until model is loaded and activated.
 
     Returns
     -------
@@ -219,68 +958,159 @@ def configure_model_file(config_file: UploadFile) -> dict[str, Any]:
             detail=f"file type of {config_file.content_type} is not supported",
         )
 
-    if "backend" in app.config and app.config["backend"] == "triton":
-        try:
-            tmp_model_name = app.config["triton_model_name"]
-            unload_triton_model(app.triton_url, tmp_model_name)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="something went wrong with unloading triton model.",
-            )
+    content = config_file.file.read()
+    config = yaml.safe_load(content)
+    check_config(config)
+    config["filename"] = Path(config_file.filename).stem
 
-    app.config_path = None
-    app.config = yaml.safe_load(config_file.file.read())
-    app.config["filename"] = Path(config_file.filename).stem
+    # uploaded configs are identified by content, same file reuses loaded model
+    key = f"file/{config['filename']}/{hashlib.sha1(content).hexdigest()[:12]}"
+    config = start_swap(key, config, None, wait)
 
-    if "backend" in app.config and app.config["backend"] == "triton":
-        try:
-            app.config["triton_url"] = app.triton_url
-            load_triton_model(app.triton_url, app.config["triton_model_name"])
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="something went wrong with loading triton model.",
-            )
+    logger.debug("used /configure_model/file")
+    return config
+
+
+def _output_format(
+    accept: str = None,
+    fmt: str = None,
+    quality: int = None,
+    compression: int = None,
+) -> str:
+    """
+    Choose output format and check encoding options.
 
+    Parameters
+    ----------
+    accept : str
+        Accept header value.
+    fmt : str
+        Format from query parameter, one of png, webp, jpeg, npy.
+    quality : int
+        Quality in [0, 100] for jpeg and webp.
+    compression : int
+        PNG compression level in [0, 9].
+
+    Returns
+    -------
+    str
+        Output format.
+    """
     try:
-        if torch.cuda.device_count() < 1 and app.config["backend"] != "triton":
-            app.config = set_cpu_mode(app.config)
-        app.upsampler = getattr(model_registry, app.config["model"]).configure(
-            root, app.config
-        )
-    except AttributeError:
-        raise HTTPException(
-            status_code=400, detail=f"model {app.config['model']} is not supported."
-        )
-    except ValueError:
-        raise HTTPException(
-            status_code=400, detail="something went wrong with model configuration."
-        )
+        check_options(quality, compression)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    logger.debug("used /configure_model/file")
-    logger.debug(f"set new config path = {app.config_path}")
-    logger.debug(f"set new config dict = {app.config}")
+    try:
+        return negotiate_format(accept, fmt)
+    except ValueError as exc:
+        raise HTTPException(status_code=400 if fmt else 406, detail=str(exc))
+
+
+def _encode(
+    img: np.ndarray,
+    fmt: str,
+    quality: int = None,
+    compression: int = None,
+    path: str = None,
+) -> tuple[bytes, float]:
+    """
+    Encode image and measure encoding time, used in encoder threads.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        Image in (h, w, c) format.
+    fmt : str
+        Output format, one of png, webp, jpeg, npy.
+    quality : int
+        Quality in [0, 100] for jpeg and webp.
+    compression : int
+        PNG compression level in [0, 9].
+    path : str
+        Path to output file, if None encoded image is returned.
+
+    Returns
+    -------
+    tuple[bytes, float]
+        0. Encoded image, None if it's written to file,
+        1. Encoding time.
+    """
+    start = time.perf_counter()
+    if path is None:
+        bytes_img = encode_image(img, fmt, quality, compression)
+    else:
+        bytes_img = None
+        encode_image_file(img, fmt, path, quality, compression)
+    return bytes_img, time.perf_counter() - start
+
+
+def _headers(
+    timings: dict[str, float], source: str, estimated_time: float = None
+) -> dict[str, str]:
+    """
+    Get timing and cache headers.
+
+    Parameters
+    ----------
+    timings : dict[str, float]
+        Durations of request stages in seconds.
+    source : str
+        Source of result: memory, disk, coalesced, miss or spill.
+    estimated_time : float
+        Completion time estimated by scheduler at submit in seconds.
+
+    Returns
+    -------
+    dict[str, str]
+        X-Cache, X-Queue-Wait, X-Inference-Time, X-Encode-Time and
+        X-Estimated-Time (if estimate is available) headers.
+    """
+    headers = {
+        "X-Cache": source,
+        "X-Queue-Wait": f"{timings['queue_wait']:.6f}",
+        "X-Inference-Time": f"{timings['inference']:.6f}",
+        "X-Encode-Time": f"{timings['encode']:.6f}",
+    }
+    if estimated_time is not None:
+        headers["X-Estimated-Time"] = f"{estimated_time:.6f}"
+    return headers
+
+
+def _observe(timings: dict[str, float], labels: dict[str, str]) -> None:
+    """
+    Add durations of request stages to stage histogram.
+
+    Parameters
+    ----------
+    timings : dict[str, float]
+        Durations of request stages in seconds.
+    labels : dict[str, str]
+        Model and input resolution labels.
 
-    return app.config
+    Returns
+    -------
+    None
+    """
+    for stage, duration in timings.items():
+        stage_seconds.observe(duration, stage=stage, **labels)
 
 
-def _upscale(img: np.ndarray) -> tuple[bytes, tuple[int, int], tuple[int, int], float]:
+def _check_size(img: np.ndarray, model: ServedModel) -> tuple[int, int]:
     """
-    Enhance image.
+    Check that model output resolution isn't too large.
 
     Parameters
     ----------
     img : np.ndarray
         np.ndarray image in (h, w, c) format.
+    model : ServedModel
+        Model which enhances image.
 
     Returns
     -------
-    tuple[bytes, tuple[int, int], tuple[int, int], float]
-        0. Encoded image,
-        1. (low resolution height, low resolution width),
-        2. (high resolution height, high resolution width),
-        3. Inference time.
+    tuple[int, int]
+        (high resolution height, high resolution width).
     """
     try:
         h, w = img.shape[0], img.shape[1]
@@ -289,62 +1119,371 @@ def _upscale(img: np.ndarray) -> tuple[bytes, tuple[int, int], tuple[int, int],
             status_code=400,
             detail="incorrect img object, should be 3 dimensional numpy.ndarray.",
         )
+    return _check_shape(h, w, model)
 
-    if "outscale" in app.config:
-        outscale = app.config["outscale"]
-    elif "network_g" in app.config and "upscale" in app.config["network_g"]:
-        outscale = app.config["network_g"]["upscale"]
-    else:
-        outscale = 4
 
-    h_up, w_up = int(h * outscale), int(w * outscale)
+def _check_shape(h: int, w: int, model: ServedModel) -> tuple[int, int]:
+    """
+    Check that model output resolution for input resolution isn't too large,
+    used before decoding with size from image header.
+
+    Parameters
+    ----------
+    h : int
+        Input height.
+    w : int
+        Input width.
+    model : ServedModel
+        Model which enhances image.
+
+    Returns
+    -------
+    tuple[int, int]
+        (high resolution height, high resolution width).
+    """
+    h_up, w_up = int(h * model.outscale), int(w * model.outscale)
     if h_up > 4320 or w_up > 7680:
         raise HTTPException(
             status_code=400,
             detail=f"potential output resolution ({h_up, w_up}) is too large, "
             "max possible resolution is (4320, 7680) pixels in (h, w) format.",
         )
+    return h_up, w_up
+
+
+def _check_budget(h: int, w: int, model: ServedModel) -> None:
+    """
+    Check that estimated inference time of image fits latency SLO, used before
+    decoding with size from image header.
 
-    start_time = time.time()
-    out_img = getattr(model_registry, app.config["model"]).predict(img, app.upsampler)
-    total_time = time.time() - start_time
+    Parameters
+    ----------
+    h : int
+        Input height.
+    w : int
+        Input width.
+    model : ServedModel
+        Model which enhances image.
 
-    _, enc_img = cv2.imencode(".png", out_img)
-    bytes_img = enc_img.tobytes()
-    return bytes_img, (h, w), (h_up, w_up), total_time
+    Returns
+    -------
+    None
+    """
+    cost = model.cost(h, w)
+    if LATENCY_SLO_S and cost is not None and cost > LATENCY_SLO_S:
+        raise HTTPException(
+            status_code=503,
+            detail=f"estimated inference time {cost:.1f}s exceeds "
+            f"latency SLO {LATENCY_SLO_S:.1f}s of {model.key}.",
+            headers={"Retry-After": str(_budget_retry_after(cost))},
+        )
 
 
-@app.post("/upscale/example")
-def upscale_example() -> Response:
+def _budget_retry_after(estimated_time: float) -> int:
     """
-    Upscale example image using configured model.
+    Get Retry-After of request rejected by latency SLO.
+
+    Parameters
+    ----------
+    estimated_time : float
+        Estimated inference time of request in seconds.
+
+    Returns
+    -------
+    int
+        Time in whole seconds by which estimate exceeds SLO, at least 1.
+    """
+    return max(1, math.ceil(estimated_time - LATENCY_SLO_S))
+
+
+def _submit(img: np.ndarray, model: ServedModel) -> Future:
+    """
+    Add image to scheduler queue of the model, request is rejected with
+    429 status code if queue is full or it can't be completed within latency
+    SLO, and with 503 status code if image alone exceeds latency SLO.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        np.ndarray image in (h, w, c) format.
+    model : ServedModel
+        Model which enhances image.
+
+    Returns
+    -------
+    Future
+        Future with enhanced image.
+    """
+    try:
+        return model.scheduler.submit(img)
+    except LatencyBudgetError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(_budget_retry_after(exc.estimated_time))},
+        )
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    except SchedulerClosedError as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": "1"}
+        )
+
+
+async def _upscale(
+    read: Callable[[], Awaitable[bytes | memoryview]],
+    flags: int,
+    model: ServedModel,
+    fmt: str = "png",
+    quality: int = None,
+    compression: int = None,
+) -> Response:
+    """
+    Enhance encoded image. Result is taken from cache if the same image was
+    enhanced by the same model into the same format, concurrent identical
+    requests share one inference. Outputs above spill threshold bypass cache,
+    they are encoded into temporary file which is streamed to client.
+    Image is decoded only by request which runs inference, each buffer is
+    released as soon as next stage doesn't need it.
+
+    Parameters
+    ----------
+    read : Callable[[], Awaitable[bytes | memoryview]]
+        Coroutine function which reads encoded input image, image isn't
+        referenced by caller, so it's released after decoding.
+    flags : int
+        Flags for cv2.imdecode.
+    model : ServedModel
+        Model which enhances image.
+    fmt : str
+        Output format, one of png, webp, jpeg, npy.
+    quality : int
+        Quality in [0, 100] for jpeg and webp.
+    compression : int
+        PNG compression level in [0, 9].
 
     Returns
     -------
     Response
-        Generated HR image.
+        Response with encoded image, timing and cache headers.
     """
-    img = cv2.imread("./extra/example.png", cv2.IMREAD_UNCHANGED)
-    bytes_img, (h, w), (h_up, w_up), total_time = _upscale(img)
+    start = time.perf_counter()
+    raw = await read()
+    read_time = time.perf_counter() - start
+
+    timings = {"queue_wait": 0.0, "inference": 0.0, "encode": 0.0}
+    # hashing of large upload would block event loop
+    key = await run_in_threadpool(
+        cache_key, raw, flags, model.key, fmt, quality, compression
+    )
+    bytes_img, source = await app.cache.lookup(key)
+    if bytes_img is not None:
+        cache_results_total.inc(model=model.key, source=source)
+        headers = _headers(timings, source)
+        return Response(bytes_img, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+    trace = MemoryTrace()
+    trace.hold("raw", len(raw))
+    img = None
+
+    async def decode() -> float:
+        nonlocal raw, img, h, w
+        start = time.perf_counter()
+        img = await run_in_threadpool(cv2.imdecode, np.frombuffer(raw, np.uint8), flags)
+        decode_time = time.perf_counter() - start
+        # next buffer is registered before previous is released, both exist at
+        # boundary
+        if img is not None:
+            trace.hold("img", img.nbytes)
+        raw = None
+        trace.release("raw")
+        _check_size(img, model)
+        h, w = img.shape[0], img.shape[1]
+        return decode_time
+
+    # only request which runs inference decodes image, so size for spill
+    # decision is taken from header, images of other formats are decoded at once
+    stages = {"upload_read": read_time}
+    size = image_size(raw[:HEADER_BYTES])
+    if size is None:
+        stages["decode"] = await decode()
+    else:
+        h, w = size
+    h_up, w_up = _check_shape(h, w, model)
+    spill = h_up * w_up >= SPILL_MEGAPIXELS * 10**6
+    labels = {"model": model.key, "resolution": resolution_bucket(h, w)}
+    _observe(stages, labels)
+
+    estimated_time = None
+
+    async def compute(path: str = None) -> bytes:
+        nonlocal img, estimated_time
+        if img is None:
+            _observe({"decode": await decode()}, labels)
+        start = time.perf_counter()
+        future = _submit(img, model)
+        img = None
+        estimated_time = future.estimated_time
+        out_img = await asyncio.wrap_future(future)
+        trace.hold("out_img", out_img.nbytes)
+        trace.release("img")
+        timings["queue_wait"] = future.wait_time
+        timings["inference"] = future.inference_time
+        # delivery of result from inference worker to this request
+        timings["postprocess"] = max(
+            0.0,
+            time.perf_counter() - start - future.wait_time - future.inference_time,
+        )
+        logger.debug(
+            f"queue wait = {future.wait_time:.3f}, batch size = {future.batch_size}"
+        )
+        del future
+
+        loop = asyncio.get_running_loop()
+        bytes_img, timings["encode"] = await loop.run_in_executor(
+            app.encoder, _encode, out_img, fmt, quality, compression, path
+        )
+        trace.hold("bytes_img", len(bytes_img) if bytes_img is not None else 0)
+        del out_img
+        trace.release("out_img")
+        # only request which computed result observes inference stages
+        _observe(timings, labels)
+        return bytes_img
+
+    if spill:
+        fd, path = tempfile.mkstemp(suffix=f".{fmt}", dir=SPILL_DIR)
+        os.close(fd)
+        try:
+            await compute(path)
+        except BaseException:
+            os.remove(path)
+            raise
+        source = "spill"
+        response = FileResponse(
+            path,
+            media_type=MEDIA_TYPES[fmt],
+            headers=_headers(timings, source, estimated_time),
+            background=BackgroundTask(os.remove, path),
+        )
+    else:
+        bytes_img, source = await app.cache.get_or_compute(key, compute)
+        headers = _headers(timings, source, estimated_time)
+        response = Response(bytes_img, media_type=MEDIA_TYPES[fmt], headers=headers)
+    cache_results_total.inc(model=model.key, source=source)
 
-    logger.debug("used /upscale/example")
     logger.debug(
         f"low_res shape = ({h},{w}), "
         f"ups_res shape = ({h_up},{w_up}), "
-        f"ups_time = {total_time:.3f}"
+        f"ups_time = {timings['inference']:.3f}, "
+        f"enc_time = {timings['encode']:.3f}, "
+        f"{trace.summary()}"
+    )
+    return response
+
+
+async def _resolve_model(config_name: str = None) -> ServedModel:
+    """
+    Get model for request without changing configured model.
+
+    Parameters
+    ----------
+    config_name : str
+        Model config name in pretrained/model or trained/model format,
+        if None configured model is used.
+
+    Returns
+    -------
+    ServedModel
+        Configured upsampler with its scheduler.
+    """
+    if config_name is None:
+        if app.model is None:
+            raise HTTPException(
+                status_code=503,
+                detail="model is loading, see /health/ready.",
+                headers={"Retry-After": "1"},
+            )
+        return app.model
+    # model may be loaded from disk, so it's done outside of event loop
+    return await run_in_threadpool(get_model_by_name, config_name)
+
+
+@app.post("/upscale/example")
+async def upscale_example(
+    config_name: str = None,
+    output_format: str = Query(None, alias="format"),
+    quality: int = None,
+    compression: int = None,
+    accept: str = Header(None),
+) -> Response:
+    """
+    Upscale example image using configured model.
+
+    Parameters
+    ----------
+    config_name : str
+        Model config name in pretrained/model or trained/model format,
+        if None configured model is used.
+    output_format : str
+        Output format (png, webp, jpeg or npy), has priority over Accept header.
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9].
+    accept : str
+        Accept header, used if output format isn't set.
+
+    Returns
+    -------
+    Response
+        Generated HR image.
+    """
+    fmt = _output_format(accept, output_format, quality, compression)
+    model = await _resolve_model(config_name)
+    response = await _upscale(
+        partial(run_in_threadpool, Path("./extra/example.png").read_bytes),
+        cv2.IMREAD_UNCHANGED,
+        model,
+        fmt,
+        quality,
+        compression,
     )
-    return Response(bytes_img, media_type="image/png")
+
+    logger.debug(f"used /upscale/example, cache = {response.headers['X-Cache']}")
+    return response
 
 
 @app.post("/upscale/file")
-def upscale(image_file: UploadFile) -> Response:
+async def upscale(
+    image_file: UploadFile,
+    config_name: str = None,
+    output_format: str = Query(None, alias="format"),
+    quality: int = None,
+    compression: int = None,
+    accept: str = Header(None),
+) -> Response:
     """
-    Upscale image from file using configured model.
+    Upscale image from file using configured model or model from config name.
 
     Parameters
     ----------
     image_file : UploadFile
         File with image in (h, w, c) format.
+    config_name : str
+        Model config name in pretrained/model or trained/model format,
+        if None configured model is used.
+    output_format : str
+        Output format (png, webp, jpeg or npy), has priority over Accept header.
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9].
+    accept : str
+        Accept header, used if output format isn't set.
 
     Returns
     -------
@@ -357,14 +1496,291 @@ def upscale(image_file: UploadFile) -> Response:
             detail=f"file type of {image_file.content_type} is not supported",
         )
 
-    raw = np.fromstring(image_file.file.read(), np.uint8)
-    img = cv2.imdecode(raw, cv2.IMREAD_COLOR)
-    bytes_img, (h, w), (h_up, w_up), total_time = _upscale(img)
+    fmt = _output_format(accept, output_format, quality, compression)
+    model = await _resolve_model(config_name)
+    # oversized images are rejected by header before upload is read and decoded
+    size = await run_in_threadpool(read_image_size, image_file.file)
+    if size is not None:
+        _check_shape(*size, model)
+        _check_budget(*size, model)
+    response = await _upscale(
+        partial(run_in_threadpool, file_buffer, image_file.file),
+        cv2.IMREAD_COLOR,
+        model,
+        fmt,
+        quality,
+        compression,
+    )
 
-    logger.debug("used /upscale/file")
-    logger.debug(
-        f"low_res shape = ({h},{w}), "
-        f"ups_res shape = ({h_up},{w_up}), "
-        f"ups_time = {total_time:.3f}"
+    logger.debug(f"used /upscale/file, cache = {response.headers['X-Cache']}")
+    return response
+
+
+def _read_zip_entry(
+    archive: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    lock: threading.Lock,
+    size: int = -1,
+) -> bytes:
+    """
+    Read entry of ZIP archive which is shared between threads.
+
+    Parameters
+    ----------
+    archive : zipfile.ZipFile
+        Opened ZIP archive.
+    info : zipfile.ZipInfo
+        Archive entry.
+    lock : threading.Lock
+        Lock of archive file.
+    size : int
+        Number of bytes to read from the start of entry, -1 reads whole entry.
+
+    Returns
+    -------
+    bytes
+        Entry content.
+    """
+    with lock:
+        with archive.open(info) as f:
+            return f.read(size)
+
+
+def _zip_entry_size(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, lock: threading.Lock
+) -> tuple[int, int]:
+    """
+    Get image size of ZIP archive entry by inflating only its header.
+
+    Parameters
+    ----------
+    archive : zipfile.ZipFile
+        Opened ZIP archive.
+    info : zipfile.ZipInfo
+        Archive entry.
+    lock : threading.Lock
+        Lock of archive file.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width), None if format isn't supported or header is incomplete.
+    """
+    return image_size(_read_zip_entry(archive, info, lock, HEADER_BYTES))
+
+
+async def _upscale_batch(
+    items: list[
+        tuple[str, Callable[[], tuple[int, int]], Callable[[], bytes | memoryview]]
+    ],
+    model: ServedModel,
+    fmt: str = "png",
+    quality: int = None,
+    compression: int = None,
+    uploads: list[BinaryIO] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Enhance images and stream ZIP archive with results. All images are offered
+    to the model scheduler together, so images with the same shape are batched.
+    Entries are written in order of completion, failed images are written as
+    text entries with error message.
+
+    Parameters
+    ----------
+    items : list[
+        tuple[str, Callable[[], tuple[int, int]], Callable[[], bytes | memoryview]]
+    ]
+        Image names, functions which read image size from header and functions
+        which read encoded images.
+    model : ServedModel
+        Model which enhances images.
+    fmt : str
+        Output format, one of png, webp, jpeg, npy.
+    quality : int
+        Quality in [0, 100] for jpeg and webp.
+    compression : int
+        PNG compression level in [0, 9].
+    uploads : list[BinaryIO]
+        Uploaded files which items read from, they are closed when archive
+        is finished.
+
+    Returns
+    -------
+    AsyncIterator[bytes]
+        Parts of ZIP archive.
+    """
+    # bounds number of images which are held in memory at the same time
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def process(
+        name: str,
+        read_size: Callable[[], tuple[int, int]],
+        read: Callable[[], bytes | memoryview],
+    ) -> tuple[str, bytes]:
+        async with semaphore:
+            try:
+                # large images are rejected before whole entry is read or inflated
+                size = await run_in_threadpool(read_size)
+                if size is not None:
+                    _check_shape(*size, model)
+                start = time.perf_counter()
+                raw = await run_in_threadpool(read)
+                timings = {"upload_read": time.perf_counter() - start}
+                start = time.perf_counter()
+                img = await run_in_threadpool(
+                    cv2.imdecode, np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR
+                )
+                timings["decode"] = time.perf_counter() - start
+                del raw
+                _check_size(img, model)
+                labels = {
+                    "model": model.key,
+                    "resolution": resolution_bucket(img.shape[0], img.shape[1]),
+                }
+                while True:
+                    try:
+                        start = time.perf_counter()
+                        future = model.scheduler.submit(img)
+                        break
+                    except QueueFullError:
+                        # batch waits for free space instead of failing
+                        await asyncio.sleep(BATCH_WINDOW_MS / 1000)
+                del img
+                out_img = await asyncio.wrap_future(future)
+                timings["queue_wait"] = future.wait_time
+                timings["inference"] = future.inference_time
+                timings["postprocess"] = max(
+                    0.0,
+                    time.perf_counter()
+                    - start
+                    - future.wait_time
+                    - future.inference_time,
+                )
+                bytes_img, timings["encode"] = await loop.run_in_executor(
+                    app.encoder, _encode, out_img, fmt, quality, compression
+                )
+                _observe(timings, labels)
+            except HTTPException as exc:
+                errors_total.inc(endpoint="/upscale/batch", reason=exc.status_code)
+                return f"{name}.error.txt", str(exc.detail).encode()
+            except Exception as exc:
+                errors_total.inc(endpoint="/upscale/batch", reason="image")
+                return f"{name}.error.txt", str(exc).encode()
+        return str(Path(name).with_suffix(f".{fmt}")), bytes_img
+
+    archive = ZipStream()
+    tasks = [asyncio.ensure_future(process(*item)) for item in items]
+    try:
+        for task in asyncio.as_completed(tasks):
+            name, data = await task
+            yield archive.add(name, data)
+        yield archive.close()
+    finally:
+        # client disconnected before archive was finished
+        for task in tasks:
+            task.cancel()
+        for upload in uploads or []:
+            upload.close()
+
+
+@app.post("/upscale/batch")
+async def upscale_batch(
+    files: list[UploadFile],
+    config_name: str = None,
+    output_format: str = Query(None, alias="format"),
+    quality: int = None,
+    compression: int = None,
+) -> StreamingResponse:
+    """
+    Upscale many images, images are uploaded as files or as one ZIP archive.
+
+    Parameters
+    ----------
+    files : list[UploadFile]
+        Files with images in (h, w, c) format or ZIP archive with images.
+    config_name : str
+        Model config name in pretrained/model or trained/model format,
+        if None configured model is used.
+    output_format : str
+        Output format (png, webp, jpeg or npy).
+    quality : int
+        Quality in [0, 100] for jpeg and webp, webp is lossless if None.
+    compression : int
+        PNG compression level in [0, 9].
+
+    Returns
+    -------
+    StreamingResponse
+        ZIP archive with generated HR images, entries are streamed as soon as
+        images are ready.
+    """
+    fmt = _output_format(None, output_format, quality, compression)
+
+    items = []
+    for file in files:
+        if file.content_type in ["application/zip", "application/x-zip-compressed"]:
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(
+                    status_code=400, detail=f"{file.filename} is not a ZIP archive."
+                )
+            # archive is read by several threads
+            lock = threading.Lock()
+            for info in archive.infolist():
+                if (
+                    info.is_dir()
+                    or Path(info.filename).suffix.lower() not in IMAGE_EXTENSIONS
+                ):
+                    continue
+                # body limit applies to compressed size, so inflated size is checked
+                if info.file_size > MAX_UPLOAD_MB * 2**20:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{info.filename} in {file.filename} is too large, "
+                        f"max size is {MAX_UPLOAD_MB} MB.",
+                    )
+                items += [
+                    (
+                        info.filename,
+                        partial(_zip_entry_size, archive, info, lock),
+                        partial(_read_zip_entry, archive, info, lock),
+                    )
+                ]
+        elif file.content_type.split("/")[0] == "image":
+            items += [
+                (
+                    file.filename,
+                    partial(read_image_size, file.file),
+                    partial(file_buffer, file.file),
+                )
+            ]
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"file type of {file.content_type} is not supported",
+            )
+
+    if not items:
+        raise HTTPException(status_code=400, detail="no images to upscale.")
+    if len(items) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"too many images ({len(items)}), max is {MAX_BATCH_FILES}.",
+        )
+
+    model = await _resolve_model(config_name)
+    logger.debug(f"used /upscale/batch, images = {len(items)}")
+
+    # uploads are closed by framework before streaming body is iterated, so
+    # their spooled files are taken over and closed when archive is finished
+    uploads = []
+    for file in files:
+        uploads.append(file.file)
+        file.file = io.BytesIO()
+    return StreamingResponse(
+        _upscale_batch(items, model, fmt, quality, compression, uploads),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="upscaled.zip"'},
     )
-    return Response(bytes_img, media_type="image/png")
@@ -0,0 +1,91 @@
+import resource
+
+from api.pool import resident_bytes
+
+
+class MemoryTrace:
+    """
+    Tracker of buffers held by one request.
+    Peak is the maximum total size of buffers which were held at the same time,
+    process resident set size is recorded for comparison.
+
+    Attributes
+    ----------
+    peak : int
+        Peak total size of held buffers in bytes.
+    rss_start : int
+        Resident set size of process at the start of request in bytes.
+
+    Methods
+    -------
+    hold(name, nbytes)
+        Register buffer.
+    release(name)
+        Unregister buffer.
+    summary()
+        Get human readable summary.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of MemoryTrace class.
+
+        Returns
+        -------
+        None
+        """
+        self.peak = 0
+        self.rss_start = resident_bytes()
+        self._buffers = {}
+
+    def hold(self, name: str, nbytes: int) -> None:
+        """
+        Register buffer.
+
+        Parameters
+        ----------
+        name : str
+            Buffer name.
+        nbytes : int
+            Buffer size in bytes.
+
+        Returns
+        -------
+        None
+        """
+        self._buffers[name] = nbytes
+        self.peak = max(self.peak, sum(self._buffers.values()))
+
+    def release(self, name: str) -> None:
+        """
+        Unregister buffer.
+
+        Parameters
+        ----------
+        name : str
+            Buffer name.
+
+        Returns
+        -------
+        None
+        """
+        self._buffers.pop(name, None)
+
+    def summary(self) -> str:
+        """
+        Get human readable summary.
+
+        Returns
+        -------
+        str
+            Peak size of request buffers, change of process resident set size
+            and process peak resident set size.
+        """
+        rss_delta = resident_bytes() - self.rss_start
+        # ru_maxrss is measured in kilobytes on linux
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return (
+            f"peak buffers = {self.peak / 2**20:.1f} MB, "
+            f"rss delta = {rss_delta / 2**20:.1f} MB, "
+            f"max rss = {max_rss / 2**20:.1f} MB"
+        )
@@ -0,0 +1,392 @@
+import bisect
+import threading
+from typing import Callable
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+RESOLUTIONS = (270, 360, 540, 720, 1080, 1440, 2160)
+
+
+def resolution_bucket(h: int, w: int) -> str:
+    """
+    Get resolution bucket label of image.
+
+    Parameters
+    ----------
+    h : int
+        Image height.
+    w : int
+        Image width.
+
+    Returns
+    -------
+    str
+        Smallest standard resolution which fits image, e.g. 540p.
+    """
+    side = min(h, w)
+    i = bisect.bisect_left(RESOLUTIONS, side)
+    if i == len(RESOLUTIONS):
+        return f">{RESOLUTIONS[-1]}p"
+    return f"{RESOLUTIONS[i]}p"
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    """
+    Format labels in Prometheus text format.
+
+    Parameters
+    ----------
+    names : tuple[str, ...]
+        Label names.
+    values : tuple[str, ...]
+        Label values.
+    **extra : str
+        Additional labels, e.g. le of histogram bucket.
+
+    Returns
+    -------
+    str
+        Formatted labels, empty string if there are no labels.
+    """
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = [
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """
+    Monotonically increasing counter with labels.
+
+    Attributes
+    ----------
+    name : str
+        Metric name.
+    description : str
+        Metric description.
+    labelnames : tuple[str, ...]
+        Label names.
+
+    Methods
+    -------
+    inc(value, **labels)
+        Increase counter.
+    render()
+        Get metric in Prometheus text format.
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, description: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        """
+        Constructor of Counter class.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        description : str
+            Metric description.
+        labelnames : tuple[str, ...]
+            Label names.
+
+        Returns
+        -------
+        None
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        """
+        Increase counter.
+
+        Parameters
+        ----------
+        value : float
+            Increment.
+        **labels : str
+            Label values.
+
+        Returns
+        -------
+        None
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> list[str]:
+        """
+        Get metric in Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            Lines of metric samples.
+        """
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge:
+    """
+    Gauge with values collected by callback at scrape time.
+
+    Attributes
+    ----------
+    name : str
+        Metric name.
+    description : str
+        Metric description.
+    labelnames : tuple[str, ...]
+        Label names.
+
+    Methods
+    -------
+    render()
+        Get metric in Prometheus text format.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        collect: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        """
+        Constructor of Gauge class.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        description : str
+            Metric description.
+        collect : Callable[[], dict[tuple[str, ...], float]]
+            Function which returns mapping of label values to gauge values.
+        labelnames : tuple[str, ...]
+            Label names.
+
+        Returns
+        -------
+        None
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._collect = collect
+
+    def render(self) -> list[str]:
+        """
+        Get metric in Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            Lines of metric samples.
+        """
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {value}"
+            for key, value in sorted(self._collect().items())
+        ]
+
+
+class Histogram:
+    """
+    Histogram of durations with labels.
+
+    Attributes
+    ----------
+    name : str
+        Metric name.
+    description : str
+        Metric description.
+    labelnames : tuple[str, ...]
+        Label names.
+    buckets : tuple[float, ...]
+        Upper bounds of buckets.
+
+    Methods
+    -------
+    observe(value, **labels)
+        Add observation.
+    render()
+        Get metric in Prometheus text format.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        Constructor of Histogram class.
+
+        Parameters
+        ----------
+        name : str
+            Metric name.
+        description : str
+            Metric description.
+        labelnames : tuple[str, ...]
+            Label names.
+        buckets : tuple[float, ...]
+            Upper bounds of buckets.
+
+        Returns
+        -------
+        None
+        """
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Add observation.
+
+        Parameters
+        ----------
+        value : float
+            Observed value, e.g. duration in seconds.
+        **labels : str
+            Label values.
+
+        Returns
+        -------
+        None
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = self._values[key]
+            counts[0][i] += 1
+            counts[1] += value
+
+    def render(self) -> list[str]:
+        """
+        Get metric in Prometheus text format.
+
+        Returns
+        -------
+        list[str]
+            Lines of metric samples.
+        """
+        with self._lock:
+            values = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._values.items()
+            }
+
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _labels(self.labelnames, key, le=repr(float(bound)))
+                lines += [f"{self.name}_bucket{labels} {cumulative}"]
+            cumulative += counts[-1]
+            labels = _labels(self.labelnames, key, le="+Inf")
+            lines += [f"{self.name}_bucket{labels} {cumulative}"]
+            lines += [f"{self.name}_sum{_labels(self.labelnames, key)} {total}"]
+            lines += [f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"]
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics exported together.
+
+    Methods
+    -------
+    register(metric)
+        Add metric to registry.
+    render()
+        Get all metrics in Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor of Registry class.
+
+        Returns
+        -------
+        None
+        """
+        self._metrics = []
+
+    def register(
+        self, metric: Counter | Gauge | Histogram
+    ) -> Counter | Gauge | Histogram:
+        """
+        Add metric to registry.
+
+        Parameters
+        ----------
+        metric : Counter | Gauge | Histogram
+            Metric.
+
+        Returns
+        -------
+        Counter | Gauge | Histogram
+            Registered metric.
+        """
+        self._metrics += [metric]
+        return metric
+
+    def render(self) -> str:
+        """
+        Get all metrics in Prometheus text format.
+
+        Returns
+        -------
+        str
+            Metrics in Prometheus text format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines += [f"# HELP {metric.name} {metric.description}"]
+            lines += [f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,294 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+def resident_bytes() -> int:
+    """
+    Get resident set size of the current process.
+
+    Returns
+    -------
+    int
+        Resident set size in bytes, 0 if it can't be measured.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class ModelPool:
+    """
+    LRU pool of loaded models limited by memory budget.
+    Footprint of each model is measured as change of resident set size during
+    its loading, if it can't be measured (e.g. weights are loaded to GPU)
+    estimate function is used. Least recently used models are evicted while
+    total footprint exceeds budget, the most recently used model and pinned
+    models are always kept.
+
+    Attributes
+    ----------
+    budget : int
+        Memory budget in bytes.
+    hits : int
+        Number of requests served by resident models.
+    misses : int
+        Number of requests which required model loading.
+    evictions : int
+        Number of evicted models.
+    pinned : set[str]
+        Keys of models which can't be evicted by budget.
+
+    Methods
+    -------
+    get(key, load)
+        Get resident model or load it.
+    evict(key)
+        Remove model from the pool.
+    pin(key)
+        Protect model from eviction by budget.
+    unpin(key)
+        Allow model eviction and evict models above budget.
+    keys()
+        Get keys of resident models from least to most recently used.
+    items()
+        Get keys and resident models from least to most recently used.
+    stats()
+        Get pool statistics.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        estimate: Callable[[Any], int] = None,
+        on_evict: Callable[[str, Any], None] = None,
+        measure: bool = True,
+    ) -> None:
+        """
+        Constructor of ModelPool class.
+
+        Parameters
+        ----------
+        budget : int
+            Memory budget in bytes.
+        estimate : Callable[[Any], int]
+            Function which estimates footprint of loaded model in bytes,
+            used when footprint can't be measured.
+        on_evict : Callable[[str, Any], None]
+            Function called with key and model after eviction, e.g. to unload
+            model from inference server.
+        measure : bool
+            Measure footprint as change of resident set size, if False estimate
+            function is always used.
+
+        Returns
+        -------
+        None
+        """
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pinned = set()
+
+        self._estimate = estimate
+        self._on_evict = on_evict
+        self._measure = measure
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # models are loaded one by one, so RSS delta belongs to one model
+        self._load_lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str, load: Callable[[], Any]) -> Any:
+        """
+        Get resident model or load it.
+
+        Parameters
+        ----------
+        key : str
+            Model key, e.g. config name.
+        load : Callable[[], Any]
+            Function which loads model, it's called only on pool miss.
+
+        Returns
+        -------
+        Any
+            Loaded model.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        with self._load_lock:
+            with self._lock:
+                # model could be loaded while waiting for load lock
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+
+            rss = resident_bytes() if self._measure else 0
+            value = load()
+            nbytes = resident_bytes() - rss if self._measure else 0
+            if nbytes <= 0 and self._estimate is not None:
+                nbytes = self._estimate(value)
+
+            with self._lock:
+                self._entries[key] = (value, max(nbytes, 0))
+                evicted = self._shrink()
+
+        self._release(evicted)
+        return value
+
+    def evict(self, key: str) -> None:
+        """
+        Remove model from the pool.
+
+        Parameters
+        ----------
+        key : str
+            Model key.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            if key not in self._entries:
+                return
+            value, _ = self._entries.pop(key)
+            self.pinned.discard(key)
+            self.evictions += 1
+        self._release([(key, value)])
+
+    def pin(self, key: str) -> None:
+        """
+        Protect model from eviction by budget.
+
+        Parameters
+        ----------
+        key : str
+            Model key.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self.pinned.add(key)
+
+    def unpin(self, key: str) -> None:
+        """
+        Allow model eviction and evict models above budget.
+
+        Parameters
+        ----------
+        key : str
+            Model key.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self.pinned.discard(key)
+            evicted = self._shrink()
+        self._release(evicted)
+
+    def keys(self) -> list[str]:
+        """
+        Get keys of resident models from least to most recently used.
+
+        Returns
+        -------
+        list[str]
+            List of keys.
+        """
+        with self._lock:
+            return list(self._entries.keys())
+
+    def items(self) -> list[tuple[str, Any]]:
+        """
+        Get keys and resident models from least to most recently used.
+
+        Returns
+        -------
+        list[tuple[str, Any]]
+            List of keys and models.
+        """
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns
+        -------
+        dict[str, Any]
+            Hits, misses, evictions, budget and footprint of resident models.
+        """
+        with self._lock:
+            models = {key: nbytes for key, (_, nbytes) in self._entries.items()}
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "budget_bytes": self.budget,
+                "resident_bytes": sum(models.values()),
+                "models": models,
+            }
+
+    def _shrink(self) -> list[tuple[str, Any]]:
+        """
+        Evict least recently used models while total footprint exceeds budget,
+        should be called with acquired lock.
+
+        Returns
+        -------
+        list[tuple[str, Any]]
+            Evicted keys and models.
+        """
+        evicted = []
+        total = sum(nbytes for _, nbytes in self._entries.values())
+        candidates = [key for key in list(self._entries)[:-1] if key not in self.pinned]
+        for key in candidates:
+            if total <= self.budget:
+                break
+            value, nbytes = self._entries.pop(key)
+            total -= nbytes
+            self.evictions += 1
+            evicted += [(key, value)]
+        return evicted
+
+    def _release(self, evicted: list[tuple[str, Any]]) -> None:
+        """
+        Call eviction callback for evicted models.
+
+        Parameters
+        ----------
+        evicted : list[tuple[str, Any]]
+            Evicted keys and models.
+
+        Returns
+        -------
+        None
+        """
+        if self._on_evict is None:
+            return
+        for key, value in evicted:
+            self._on_evict(key, value)
@@ -0,0 +1,456 @@
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable
+
+import numpy as np
+
+
+class QueueFullError(RuntimeError):
+    """
+    Raised when scheduler queue is full and request should be retried later.
+
+    Attributes
+    ----------
+    retry_after : int
+        Estimated time in seconds after which queue will have free space.
+    """
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SchedulerClosedError(RuntimeError):
+    """Raised when request is submitted to closed scheduler."""
+
+
+class LatencyBudgetError(RuntimeError):
+    """
+    Raised when estimated inference time of request exceeds latency SLO
+    even with empty queue, so retrying doesn't help.
+
+    Attributes
+    ----------
+    estimated_time : float
+        Estimated inference time of request in seconds.
+    """
+
+    def __init__(self, message: str, estimated_time: float) -> None:
+        super().__init__(message)
+        self.estimated_time = estimated_time
+
+
+class InferenceScheduler:
+    """
+    Dynamic micro-batching scheduler for model inference.
+    Requests are collected during batch window or until max batch size is reached,
+    then they are grouped by input shape and each group is processed by one call
+    of predict_batch function in one of the worker threads. Queue is bounded,
+    requests above its size are rejected immediately instead of waiting.
+    If cost function is set, completion time of each request is estimated
+    from costs of queued requests and requests which can't finish within
+    latency SLO are rejected.
+
+    Attributes
+    ----------
+    name : str
+        Scheduler name, used in thread name and stats.
+    max_batch_size : int
+        Maximum number of images in one batch.
+    batch_window : float
+        Time in seconds to wait for other requests after the first one.
+    max_queue_size : int
+        Maximum number of queued requests, 0 means unbounded queue.
+    workers : int
+        Number of batches which can be processed concurrently.
+    slo : float
+        Latency SLO in seconds, 0 disables admission by estimated time.
+    batch_sizes : Counter
+        Histogram of processed batch sizes.
+    wait_times : deque
+        Recent per-request wait times in seconds between submit and batch start.
+    rejected_requests : int
+        Number of requests rejected because queue was full or SLO couldn't be met.
+
+    Methods
+    -------
+    submit(img)
+        Add image to the queue.
+    estimate(cost)
+        Estimate completion time of new request.
+    retry_after()
+        Estimate time in seconds until queue has free space.
+    stats()
+        Get scheduler statistics.
+    close()
+        Process remaining requests and stop worker threads.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[list[np.ndarray]], list[np.ndarray]],
+        max_batch_size: int = 4,
+        batch_window: float = 0.01,
+        name: str = "model",
+        max_queue_size: int = 0,
+        workers: int = 1,
+        cost: Callable[[np.ndarray], float] = None,
+        slo: float = 0.0,
+    ) -> None:
+        """
+        Constructor of InferenceScheduler class.
+
+        Parameters
+        ----------
+        predict_batch : Callable[[list[np.ndarray]], list[np.ndarray]]
+            Function which enhances list of images with the same shape.
+        max_batch_size : int
+            Maximum number of images in one batch.
+        batch_window : float
+            Time in seconds to wait for other requests after the first one.
+        name : str
+            Scheduler name, used in thread name and stats.
+        max_queue_size : int
+            Maximum number of queued requests, 0 means unbounded queue.
+        workers : int
+            Number of batches which can be processed concurrently.
+        cost : Callable[[np.ndarray], float]
+            Function which estimates inference time of image in seconds,
+            it returns None if estimate isn't available.
+        slo : float
+            Latency SLO in seconds, 0 disables admission by estimated time.
+
+        Returns
+        -------
+        None
+        """
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.slo = slo
+        self.batch_sizes = Counter()
+        self.wait_times = deque(maxlen=1024)
+        self.total_requests = 0
+        self.rejected_requests = 0
+
+        self._predict_batch = predict_batch
+        self._cost = cost
+        # estimated inference time of queued and running requests
+        self._backlog = 0.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        # recent inference times per request, used to estimate retry delay
+        self._request_times = deque(maxlen=64)
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"scheduler-{name}-{i}", daemon=True
+            )
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, img: np.ndarray) -> Future:
+        """
+        Add image to the queue.
+
+        Parameters
+        ----------
+        img : np.ndarray
+            Image in (h, w, c) format.
+
+        Returns
+        -------
+        Future
+            Future with enhanced image, it has estimated_time attribute with
+            estimated completion time in seconds (None without cost estimate),
+            after completion it also has wait_time, inference_time
+            and batch_size attributes.
+
+        Raises
+        ------
+        SchedulerClosedError
+            If scheduler is closed.
+        LatencyBudgetError
+            If estimated inference time of image exceeds latency SLO.
+        QueueFullError
+            If queue is full or request can't be completed within latency SLO.
+        """
+        cost = self._cost(img) if self._cost is not None else None
+
+        future = Future()
+        future.estimated_time = None
+        with self._stats_lock:
+            # checked under lock, so nothing is queued after close sentinels
+            if self._closed:
+                raise SchedulerClosedError(f"scheduler {self.name} is closed.")
+            if cost is not None:
+                future.estimated_time = self._backlog / self.workers + cost
+                if self.slo and cost > self.slo:
+                    self.rejected_requests += 1
+                    raise LatencyBudgetError(
+                        f"estimated inference time {cost:.1f}s exceeds "
+                        f"latency SLO {self.slo:.1f}s of {self.name}.",
+                        cost,
+                    )
+                if self.slo and future.estimated_time > self.slo:
+                    self.rejected_requests += 1
+                    raise QueueFullError(
+                        f"estimated completion time {future.estimated_time:.1f}s "
+                        f"exceeds latency SLO {self.slo:.1f}s of {self.name}.",
+                        max(1, math.ceil(future.estimated_time - self.slo)),
+                    )
+            try:
+                self._queue.put_nowait((img, future, time.perf_counter(), cost))
+            except queue.Full:
+                self.rejected_requests += 1
+                full = True
+            else:
+                self._backlog += cost or 0.0
+                full = False
+        if full:
+            raise QueueFullError(
+                f"queue of scheduler {self.name} is full.", self.retry_after()
+            )
+        return future
+
+    def estimate(self, cost: float) -> float:
+        """
+        Estimate completion time of new request.
+
+        Parameters
+        ----------
+        cost : float
+            Estimated inference time of request in seconds.
+
+        Returns
+        -------
+        float
+            Estimated time in seconds until request is completed.
+        """
+        with self._stats_lock:
+            return self._backlog / self.workers + cost
+
+    def retry_after(self) -> int:
+        """
+        Estimate time in seconds until queue has free space.
+
+        Returns
+        -------
+        int
+            Estimated time in whole seconds, at least 1.
+        """
+        with self._stats_lock:
+            request_times = list(self._request_times)
+        if not request_times:
+            return 1
+        per_request = sum(request_times) / len(request_times)
+        return max(1, math.ceil(self._queue.qsize() * per_request / self.workers))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get scheduler statistics.
+
+        Returns
+        -------
+        dict[str, Any]
+            Queue depth, batch size histogram and wait time statistics in seconds.
+        """
+        with self._stats_lock:
+            wait_times = np.array(self.wait_times, dtype=np.float64)
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+            total_requests = self.total_requests
+            rejected_requests = self.rejected_requests
+            backlog = self._backlog
+
+        wait_stats = {}
+        if wait_times.size:
+            wait_stats = {
+                "mean": float(wait_times.mean()),
+                "p50": float(np.percentile(wait_times, 50)),
+                "p95": float(np.percentile(wait_times, 95)),
+                "max": float(wait_times.max()),
+            }
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "workers": self.workers,
+            "total_requests": total_requests,
+            "rejected_requests": rejected_requests,
+            "backlog_seconds": backlog,
+            "slo": self.slo,
+            "batch_sizes": batch_sizes,
+            "wait_time": wait_stats,
+        }
+
+    def close(self) -> None:
+        """
+        Process remaining requests and stop worker threads.
+
+        Returns
+        -------
+        None
+        """
+        with self._stats_lock:
+            self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _collect(
+        self,
+    ) -> tuple[list[tuple[np.ndarray, Future, float, float]], bool]:
+        """
+        Collect requests for one scheduling step.
+
+        Returns
+        -------
+        tuple[list[tuple[np.ndarray, Future, float, float]], bool]
+            0. Collected requests,
+            1. Whether scheduler was asked to stop.
+        """
+        item = self._queue.get()
+        if item is None:
+            return [], True
+
+        requests = [item]
+        deadline = time.perf_counter() + self.batch_window
+        while len(requests) < self.max_batch_size:
+            timeout = max(0.0, deadline - time.perf_counter())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return requests, True
+            requests += [item]
+        return requests, False
+
+    def _release_backlog(
+        self, group: list[tuple[np.ndarray, Future, float, float]]
+    ) -> None:
+        """
+        Remove estimated costs of finished requests from backlog, must be called
+        with stats lock held.
+
+        Parameters
+        ----------
+        group : list[tuple[np.ndarray, Future, float, float]]
+            Finished requests.
+
+        Returns
+        -------
+        None
+        """
+        costs = sum(cost or 0.0 for *_, cost in group)
+        # rounding errors shouldn't make backlog negative
+        self._backlog = max(0.0, self._backlog - costs)
+
+    def _start(
+        self, requests: list[tuple[np.ndarray, Future, float, float]]
+    ) -> list[tuple[np.ndarray, Future, float, float]]:
+        """
+        Mark futures of collected requests as running and drop cancelled ones,
+        e.g. requests of disconnected clients.
+
+        Parameters
+        ----------
+        requests : list[tuple[np.ndarray, Future, float, float]]
+            Collected requests.
+
+        Returns
+        -------
+        list[tuple[np.ndarray, Future, float, float]]
+            Requests which weren't cancelled.
+        """
+        active, cancelled = [], []
+        for request in requests:
+            if request[1].set_running_or_notify_cancel():
+                active.append(request)
+            else:
+                cancelled.append(request)
+        if cancelled:
+            with self._stats_lock:
+                self._release_backlog(cancelled)
+        return active
+
+    @staticmethod
+    def _resolve(future: Future, result: Any = None, exc: Exception = None) -> None:
+        """
+        Set result or exception of future, it never raises, so worker thread
+        survives futures which were resolved elsewhere.
+
+        Parameters
+        ----------
+        future : Future
+            Future of request.
+        result : Any
+            Enhanced image.
+        exc : Exception
+            Exception of inference, result is ignored if it's set.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self) -> None:
+        """
+        Worker loop, groups collected requests by shape and runs batches.
+
+        Returns
+        -------
+        None
+        """
+        stop = False
+        while not stop:
+            requests, stop = self._collect()
+            requests = self._start(requests)
+
+            groups = {}
+            for request in requests:
+                key = (request[0].shape, request[0].dtype)
+                groups.setdefault(key, []).append(request)
+
+            for group in groups.values():
+                group_start = time.perf_counter()
+                imgs = [img for img, _, _, _ in group]
+                try:
+                    out_imgs = self._predict_batch(imgs)
+                except Exception as exc:
+                    with self._stats_lock:
+                        self._release_backlog(group)
+                    for _, future, _, _ in group:
+                        self._resolve(future, exc=exc)
+                    continue
+                inference_time = time.perf_counter() - group_start
+
+                with self._stats_lock:
+                    self._release_backlog(group)
+                    self.batch_sizes[len(group)] += 1
+                    self.total_requests += len(group)
+                    self._request_times.append(inference_time / len(group))
+                    for _, _, submit_time, _ in group:
+                        self.wait_times.append(group_start - submit_time)
+
+                for (_, future, submit_time, _), out_img in zip(group, out_imgs):
+                    future.wait_time = group_start - submit_time
+                    future.inference_time = inference_time
+                    future.batch_size = len(group)
+                    self._resolve(future, out_img)
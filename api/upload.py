@@ -0,0 +1,242 @@
+import io
+import mmap
+import struct
+from typing import Any, BinaryIO, Callable
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+HEADER_BYTES = 64 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# start of frame markers, C4, C8 and CC are other segments
+JPEG_SOF_MARKERS = {
+    0xC0,
+    0xC1,
+    0xC2,
+    0xC3,
+    0xC5,
+    0xC6,
+    0xC7,
+    0xC9,
+    0xCA,
+    0xCB,
+    0xCD,
+    0xCE,
+    0xCF,
+}
+
+
+def _jpeg_size(data: bytes) -> tuple[int, int]:
+    """
+    Get image size from JPEG segments.
+
+    Parameters
+    ----------
+    data : bytes
+        Beginning of JPEG file.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width), None if start of frame isn't in data.
+    """
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # fill byte before marker
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # markers without length
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            return struct.unpack_from(">HH", data, i + 5)
+        (length,) = struct.unpack_from(">H", data, i + 2)
+        i += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> tuple[int, int]:
+    """
+    Get image size from WebP chunk header.
+
+    Parameters
+    ----------
+    data : bytes
+        Beginning of WebP file.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width), None if chunk is unknown or truncated.
+    """
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        w, h = struct.unpack_from("<HH", data, 26)
+        return h & 0x3FFF, w & 0x3FFF
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        (bits,) = struct.unpack_from("<I", data, 21)
+        return ((bits >> 14) & 0x3FFF) + 1, (bits & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        w = int.from_bytes(data[24:27], "little") + 1
+        h = int.from_bytes(data[27:30], "little") + 1
+        return h, w
+    return None
+
+
+def image_size(data: bytes) -> tuple[int, int]:
+    """
+    Get image size from PNG, JPEG or WebP header without decoding image.
+
+    Parameters
+    ----------
+    data : bytes
+        Beginning of encoded image, HEADER_BYTES is enough for most images.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width), None if format isn't supported or header is incomplete.
+    """
+    data = bytes(data)
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR" and len(data) >= 24:
+        w, h = struct.unpack_from(">II", data, 16)
+        return h, w
+    if data[:2] == b"\xff\xd8":
+        return _jpeg_size(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _webp_size(data)
+    return None
+
+
+def read_image_size(file: BinaryIO) -> tuple[int, int]:
+    """
+    Get image size from header of uploaded file, file position isn't changed.
+
+    Parameters
+    ----------
+    file : BinaryIO
+        Uploaded file.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width), None if format isn't supported or header is incomplete.
+    """
+    position = file.tell()
+    header = file.read(HEADER_BYTES)
+    file.seek(position)
+    return image_size(header)
+
+
+def file_buffer(file: BinaryIO) -> bytes | memoryview:
+    """
+    Get content of uploaded file without copying it if possible.
+
+    Parameters
+    ----------
+    file : BinaryIO
+        Uploaded file, usually SpooledTemporaryFile.
+
+    Returns
+    -------
+    bytes | memoryview
+        File content, files on disk are memory-mapped.
+    """
+    file.seek(0)
+    # small uploads are kept in memory by SpooledTemporaryFile, their copy is cheap
+    # and keeps file closable, large uploads are rolled over to disk and mapped
+    inner = getattr(file, "_file", file)
+    if isinstance(inner, io.BytesIO):
+        return inner.getvalue()
+    try:
+        return memoryview(mmap.mmap(inner.fileno(), 0, access=mmap.ACCESS_READ))
+    except (AttributeError, OSError, ValueError):
+        # file without descriptor or empty file which can't be mapped
+        return file.read()
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware which limits size of request body for selected paths.
+    Requests with larger Content-Length are rejected before body is read,
+    streamed bodies are rejected as soon as limit is exceeded.
+
+    Attributes
+    ----------
+    app : Callable
+        ASGI application.
+    limits : dict[str, int]
+        Maximum body size in bytes for each path.
+    """
+
+    def __init__(self, app: Callable, limits: dict[str, int]) -> None:
+        """
+        Constructor of UploadLimitMiddleware class.
+
+        Parameters
+        ----------
+        app : Callable
+            ASGI application.
+        limits : dict[str, int]
+            Maximum body size in bytes for each path.
+
+        Returns
+        -------
+        None
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(
+        self, scope: dict[str, Any], receive: Callable, send: Callable
+    ) -> None:
+        """
+        Handle ASGI request.
+
+        Parameters
+        ----------
+        scope : dict[str, Any]
+            ASGI connection scope.
+        receive : Callable
+            Function which receives ASGI messages.
+        send : Callable
+            Function which sends ASGI messages.
+
+        Returns
+        -------
+        None
+        """
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"request body is too large, max size is {limit} bytes."
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # body parser passes HTTPException to exception handler
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
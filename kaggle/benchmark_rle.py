@@ -0,0 +1,226 @@
+import base64
+import time
+import zlib
+from argparse import ArgumentParser
+
+import numpy as np
+from rle import _find_runs, _pack_runs, decode, encode
+
+RESOLUTIONS = {
+    "270p": (270, 480),
+    "1080p": (1080, 1920),
+}
+
+
+def rle_loop(img: np.ndarray) -> bytes:
+    """
+    Previous pure python implementation of RLE step of encode function,
+    used as reference.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        BGR image in (h, w, c) format.
+
+    Returns
+    -------
+    bytes
+        Run-length encoded image before compression.
+    """
+    img_to_encode = img.astype(np.uint8)
+    img_to_encode = img_to_encode.flatten()
+    img_to_encode = np.append(img_to_encode, -1)
+
+    cnt, rle = 1, []
+    for i in range(1, img_to_encode.shape[0]):
+        if img_to_encode[i] == img_to_encode[i - 1]:
+            cnt += 1
+            if cnt > 255:
+                rle += [img_to_encode[i - 1], 255]
+                cnt = 1
+        else:
+            rle += [img_to_encode[i - 1], cnt]
+            cnt = 1
+    return bytes(rle)
+
+
+def encode_loop(img: np.ndarray) -> bytes:
+    """
+    Previous pure python implementation of encode function, used as reference.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        BGR image in (h, w, c) format.
+
+    Returns
+    -------
+    bytes
+        Encoded image as bytes.
+    """
+    compressed = zlib.compress(rle_loop(img), zlib.Z_BEST_COMPRESSION)
+    base64_bytes = base64.b64encode(compressed)
+    return base64_bytes
+
+
+def decode_loop(encoded_img: bytes) -> np.ndarray:
+    """
+    Previous pure python implementation of decode function, used as reference.
+
+    Parameters
+    ----------
+    encoded_img : bytes
+        Encoded image as bytes.
+
+    Returns
+    -------
+    np.ndarray
+        Flat decoded image.
+    """
+    rle = zlib.decompress(base64.b64decode(encoded_img))
+    decoded_img = []
+    for i in range(0, len(rle), 2):
+        decoded_img += [rle[i]] * rle[i + 1]
+    return np.array(decoded_img, dtype=np.uint8)
+
+
+def game_like_image(h: int, w: int, seed: int) -> np.ndarray:
+    """
+    Generate image with flat regions and noise, similar to rendered frames.
+
+    Parameters
+    ----------
+    h : int
+        Image height.
+    w : int
+        Image width.
+    seed : int
+        Random seed value.
+
+    Returns
+    -------
+    np.ndarray
+        BGR image in (h, w, 3) format.
+    """
+    rng = np.random.default_rng(seed)
+    img = np.repeat(rng.integers(0, 256, (h // 8 + 1, w // 8 + 1, 3)), 8, axis=0)
+    img = np.repeat(img, 8, axis=1)[:h, :w]
+    noise_mask = rng.random((h, w, 1)) < 0.3
+    noise = rng.integers(0, 256, (h, w, 3))
+    return np.where(noise_mask, noise, img).astype(np.uint8)
+
+
+def benchmark(resolutions: list[str], repeats: int, seed: int) -> None:
+    """
+    Compare vectorized and pure python RLE encoders and decoders.
+
+    Parameters
+    ----------
+    resolutions : list[str]
+        Resolution names from RESOLUTIONS.
+    repeats : int
+        Number of runs of vectorized functions, best time is reported.
+    seed : int
+        Random seed value.
+
+    Returns
+    -------
+    None
+    """
+    for resolution in resolutions:
+        h, w = RESOLUTIONS[resolution]
+        img = game_like_image(h, w, seed)
+
+        start_time = time.perf_counter()
+        reference = encode_loop(img)
+        loop_time = time.perf_counter() - start_time
+
+        vectorized_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            encoded = encode(img)
+            vectorized_times += [time.perf_counter() - start_time]
+        vectorized_time = min(vectorized_times)
+
+        assert encoded == reference, "vectorized encoder != reference encoder"
+
+        # RLE step is timed on its own, difference of noisy end-to-end times
+        # with zlib time can be close to zero or negative
+        start_time = time.perf_counter()
+        rle_reference = rle_loop(img)
+        loop_rle_time = time.perf_counter() - start_time
+
+        rle_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            rle = _pack_runs(*_find_runs(img.ravel())).tobytes()
+            rle_times += [time.perf_counter() - start_time]
+        rle_time = min(rle_times)
+
+        assert rle == rle_reference, "vectorized rle != reference rle"
+
+        zlib_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            zlib.compress(rle, zlib.Z_BEST_COMPRESSION)
+            zlib_times += [time.perf_counter() - start_time]
+        zlib_time = min(zlib_times)
+
+        start_time = time.perf_counter()
+        decoded_reference = decode_loop(reference)
+        decode_loop_time = time.perf_counter() - start_time
+
+        decode_times = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            decoded = decode(encoded, img.shape)
+            decode_times += [time.perf_counter() - start_time]
+        decode_time = min(decode_times)
+
+        assert np.array_equal(decoded.ravel(), decoded_reference), "decoded != ref"
+
+        print(
+            f"{resolution} encode: loop = {loop_time:.3f}s, "
+            f"vectorized = {vectorized_time:.3f}s, "
+            f"speedup = {loop_time / vectorized_time:.1f}x, "
+            f"zlib = {zlib_time:.3f}s"
+        )
+        print(
+            f"{resolution} rle: loop = {loop_rle_time:.3f}s, "
+            f"vectorized = {rle_time:.3f}s, "
+            f"speedup = {loop_rle_time / rle_time:.1f}x"
+        )
+        print(
+            f"{resolution} decode: loop = {decode_loop_time:.3f}s, "
+            f"vectorized = {decode_time:.3f}s, "
+            f"speedup = {decode_loop_time / decode_time:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-r",
+        "--resolutions",
+        type=str,
+        nargs="+",
+        default=list(RESOLUTIONS.keys()),
+        choices=list(RESOLUTIONS.keys()),
+        help="resolutions to benchmark",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeats",
+        type=int,
+        default=5,
+        help="number of runs of vectorized functions",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="random seed value",
+    )
+    args = parser.parse_args()
+
+    benchmark(args.resolutions, args.repeats, args.seed)
@@ -0,0 +1,95 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+_END = object()
+
+
+def pipeline(
+    items: Iterable[Any],
+    read: Callable[[Any], Any],
+    predict: Callable[[Any], Any],
+    encode: Callable[[Any], Any] = None,
+    read_workers: int = 0,
+    encode_workers: int = 0,
+    queue_size: int = 8,
+) -> Iterator[tuple[Any, Any]]:
+    """
+    Three-stage prediction pipeline: read -> predict -> encode.
+    Reading is prefetched by thread pool, prediction runs in the current thread
+    and encoding is done by process pool. Each stage keeps at most queue_size
+    pending items, results are yielded in the order of items.
+
+    Parameters
+    ----------
+    items : Iterable[Any]
+        Items to process, e.g. filenames.
+    read : Callable[[Any], Any]
+        Function to read item, e.g. cv2.imread.
+    predict : Callable[[Any], Any]
+        Function to process read item, e.g. model prediction.
+    encode : Callable[[Any], Any]
+        Picklable function to process prediction, if None prediction is yielded.
+    read_workers : int
+        Number of reader threads, 0 means reading in the current thread.
+    encode_workers : int
+        Number of encoder processes, 0 means encoding in the current thread.
+    queue_size : int
+        Maximum number of pending items in each stage.
+
+    Returns
+    -------
+    Iterator[tuple[Any, Any]]
+        Item and its encoded prediction.
+    """
+    read_pool = ThreadPoolExecutor(read_workers) if read_workers > 0 else None
+    encode_pool = None
+    if encode is not None and encode_workers > 0:
+        encode_pool = ProcessPoolExecutor(encode_workers)
+
+    items = iter(items)
+    read_queue, encode_queue = deque(), deque()
+
+    def fill_read_queue() -> None:
+        """Submit new items to reader threads while queue isn't full."""
+        for item in islice(items, queue_size - len(read_queue)):
+            read_queue.append((item, read_pool.submit(read, item)))
+
+    try:
+        if read_pool:
+            fill_read_queue()
+        while True:
+            if read_pool:
+                if not read_queue:
+                    break
+                item, future = read_queue.popleft()
+                data = future.result()
+                fill_read_queue()
+            else:
+                item = next(items, _END)
+                if item is _END:
+                    break
+                data = read(item)
+
+            prediction = predict(data)
+            del data
+
+            if encode is None:
+                yield item, prediction
+            elif encode_pool:
+                encode_queue.append((item, encode_pool.submit(encode, prediction)))
+                if len(encode_queue) >= queue_size:
+                    item, future = encode_queue.popleft()
+                    yield item, future.result()
+            else:
+                yield item, encode(prediction)
+
+        while encode_queue:
+            item, future = encode_queue.popleft()
+            yield item, future.result()
+    finally:
+        if read_pool:
+            read_pool.shutdown(cancel_futures=True)
+        if encode_pool:
+            encode_pool.shutdown(cancel_futures=True)
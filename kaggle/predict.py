@@ -1,25 +1,94 @@
 import os.path
 from argparse import ArgumentParser
+from typing import Any, Iterator
 
 import cv2
 import numpy as np
 import pandas as pd
+import torch
 from basicsr.utils.img_util import img2tensor, tensor2img
 from rle import encode
+from store import FrameStoreWriter
+from submission import SubmissionWriter
 from tqdm import tqdm
 from transformers import AutoModel
 
 
+def read_batches(
+    filenames: list[str], lr_folder: str, batch_size: int
+) -> Iterator[tuple[list[str], list[np.ndarray]]]:
+    """
+    Read LR images and group consecutive images with the same shape into batches.
+
+    Parameters
+    ----------
+    filenames : list[str]
+        Image filenames.
+    lr_folder : str
+        Path to test dataset folder with LR images.
+    batch_size : int
+        Maximum number of images in batch.
+
+    Returns
+    -------
+    Iterator[tuple[list[str], list[np.ndarray]]]
+        Filenames and images of each batch.
+    """
+    batch_filenames, batch_imgs = [], []
+    for filename in filenames:
+        img = cv2.imread(os.path.join(lr_folder, filename))
+        if batch_imgs and (
+            img.shape != batch_imgs[0].shape or len(batch_imgs) >= batch_size
+        ):
+            yield batch_filenames, batch_imgs
+            batch_filenames, batch_imgs = [], []
+        batch_filenames += [filename]
+        batch_imgs += [img]
+    if batch_imgs:
+        yield batch_filenames, batch_imgs
+
+
+@torch.inference_mode()
+def model_predict(model: Any, imgs: list[np.ndarray], device: str) -> list[np.ndarray]:
+    """
+    Upscale batch of images with the same shape using huggingface model.
+
+    Parameters
+    ----------
+    model : Any
+        Huggingface model.
+    imgs : list[np.ndarray]
+        BGR images in (h, w, c) format.
+    device : str
+        Device on which the model will be run.
+
+    Returns
+    -------
+    list[np.ndarray]
+        Upscaled BGR images in (h*, w*, c) format.
+    """
+    init_tnsr = torch.stack(
+        [img2tensor(img, bgr2rgb=True, float32=True) for img in imgs]
+    ).to(device)
+    out_tnsr = model(init_tnsr / 255.0)
+    return [tensor2img(out, rgb2bgr=True, out_type=np.uint8) for out in out_tnsr]
+
+
 def prediction(
     sample_submission: str,
     lr_folder: str,
     output_file: str,
     model: str,
     device: str,
-    simple_resize: str,
+    simple_resize: list[str],
+    output_format: str = "csv",
+    flush_every: int = 50,
+    batch_size: int = 1,
 ) -> None:
     """
     Get prediction for sample submission using huggingface model.
+    Output is written incrementally, images which are already in output file
+    are skipped, so interrupted prediction can be resumed.
 
     Parameters
     ----------
@@ -33,38 +102,81 @@ def prediction(
         Name (repository) of huggingface model.
     device : str
         Device on which the model will be run.
-    simple_resize : str
-        If specified then the upscaling will be done using deterministic interpolation.
+    simple_resize : list[str]
+        If specified then the upscaling will be done using deterministic interpolation,
+        for several methods LR images are read once and each method is saved into
+        separate output file with method name suffix.
+    output_format : str
+        [csv | store], store writes raw frames into frame store directory.
+    flush_every : int
+        Number of rows after which submission file is flushed to disk.
+    batch_size : int
+        Maximum number of LR images with the same shape in one model forward.
 
     Returns
     -------
     None
     """
-    model = AutoModel.from_pretrained(model, trust_remote_code=True).to(device)
     submission_df = pd.read_csv(sample_submission)
 
-    filenames = submission_df["filename"].values
-    for i in tqdm(range(len(filenames))):
-        filename = filenames[i]
-        init_img = cv2.imread(os.path.join(lr_folder, filename))
-        if simple_resize:
-            out_img = cv2.resize(
-                init_img,
-                (init_img.shape[1] * 4, init_img.shape[0] * 4),
-                interpolation=getattr(cv2, simple_resize),
-            ).astype(np.uint8)
+    if simple_resize and len(simple_resize) > 1:
+        stem, ext = os.path.splitext(output_file)
+        outputs = {method: f"{stem}_{method}{ext}" for method in simple_resize}
+    elif simple_resize:
+        outputs = {simple_resize[0]: output_file}
+    else:
+        outputs = {model: output_file}
+
+    writers = {}
+    for key, path in outputs.items():
+        if output_format == "store":
+            writers[key] = FrameStoreWriter(path)
         else:
-            init_tnsr = (
-                img2tensor(init_img, bgr2rgb=True, float32=True).unsqueeze(0).to(device)
-            ) / 255.0
-            out_tnsr = model(init_tnsr)
-            out_img = tensor2img(
-                out_tnsr,
-                rgb2bgr=True,
-                out_type=np.uint8,
+            writers[key] = SubmissionWriter(
+                path, submission_df, flush_every=flush_every
             )
-        submission_df.loc[i, "rle"] = encode(out_img)
-    submission_df.to_csv(output_file, index=False)
+    filenames = [
+        f
+        for f in submission_df["filename"].values
+        if any(f not in writer for writer in writers.values())
+    ]
+
+    if not simple_resize:
+        hf_model = AutoModel.from_pretrained(model, trust_remote_code=True)
+        hf_model = hf_model.to(device).eval()
+
+    try:
+        with tqdm(total=len(filenames)) as pbar:
+            for batch_filenames, batch_imgs in read_batches(
+                filenames, lr_folder, batch_size
+            ):
+                if simple_resize:
+                    results = {
+                        method: [
+                            cv2.resize(
+                                img,
+                                (img.shape[1] * 4, img.shape[0] * 4),
+                                interpolation=getattr(cv2, method),
+                            )
+                            for img in batch_imgs
+                        ]
+                        for method in simple_resize
+                    }
+                else:
+                    results = {model: model_predict(hf_model, batch_imgs, device)}
+
+                for key, out_imgs in results.items():
+                    for filename, out_img in zip(batch_filenames, out_imgs):
+                        if filename in writers[key]:
+                            continue
+                        if output_format == "store":
+                            writers[key].add(filename, out_img)
+                        else:
+                            writers[key].add(filename, encode(out_img))
+                pbar.update(len(batch_filenames))
+    finally:
+        for writer in writers.values():
+            writer.close()
 
 
 if __name__ == "__main__":
@@ -90,12 +202,34 @@ if __name__ == "__main__":
         default="submission.csv",
         help="path to output file with predictions",
     )
+    parser.add_argument(
+        "-f",
+        "--output-format",
+        type=str,
+        default="csv",
+        choices=["csv", "store"],
+        help="csv submission or frame store directory for local experiments",
+    )
+    parser.add_argument(
+        "--flush-every",
+        type=int,
+        default=50,
+        help="number of rows after which submission file is flushed to disk",
+    )
     parser.add_argument(
         "-r",
         "--simple-resize",
         type=str,
+        nargs="+",
         default=None,
-        help="interpolation method for upscaling or None for model upscaling",
+        help="interpolation methods for upscaling or None for model upscaling",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="maximum number of LR images with the same shape in one model forward",
     )
     parser.add_argument(
         "-m",
@@ -120,4 +254,7 @@ if __name__ == "__main__":
         args.model,
         args.device,
         args.simple_resize,
+        args.output_format,
+        args.flush_every,
+        args.batch_size,
     )
@@ -5,7 +5,10 @@ from pathlib import Path, PurePath
 
 import cv2
 import pandas as pd
+from pipeline import pipeline
 from rle import encode
+from store import FrameStoreWriter
+from submission import SubmissionWriter
 from tqdm import tqdm
 
 sys.path.insert(0, str(Path(__file__).parents[1]))
@@ -20,9 +23,16 @@ def prediction(
     output_file: str,
     model_config: str,
     model_type: str,
+    output_format: str = "csv",
+    read_workers: int = 0,
+    encode_workers: int = 0,
+    queue_size: int = 8,
+    flush_every: int = 50,
 ) -> None:
     """
     Get prediction for sample submission using local model.
+    Output is written incrementally, images which are already in output file
+    are skipped, so interrupted prediction can be resumed.
 
     Parameters
     ----------
@@ -38,6 +48,16 @@ def prediction(
         Model config filename.
     model_type : str
         [pretrained | finetuned].
+    output_format : str
+        [csv | store], store writes raw frames into frame store directory.
+    read_workers : int
+        Number of threads which prefetch LR images, 0 means sequential reading.
+    encode_workers : int
+        Number of processes which encode predictions, 0 means sequential encoding.
+    queue_size : int
+        Maximum number of pending images in each stage of the pipeline.
+    flush_every : int
+        Number of rows after which submission file is flushed to disk.
 
     Returns
     -------
@@ -46,21 +66,29 @@ def prediction(
     model_config_path = root / f"configs/model/{model_type}/{model_config}.yaml"
     model_config_dct = parse_yaml(str(model_config_path))
 
-    upsampler = getattr(model_registry, model_config_dct["model"]).configure(
-        root, model_config_dct
-    )
+    model_module = getattr(model_registry, model_config_dct["model"])
+    upsampler = model_module.configure(root, model_config_dct)
 
     submission_df = pd.read_csv(sample_submission)
 
-    filenames = submission_df["filename"].values
-    for i in tqdm(range(len(filenames))):
-        filename = filenames[i]
-        init_img = cv2.imread(os.path.join(lr_folder, filename))
-        out_img = getattr(model_registry, model_config_dct["model"]).predict(
-            init_img, upsampler
-        )
-        submission_df.loc[i, "rle"] = encode(out_img)
-    submission_df.to_csv(output_file, index=False)
+    if output_format == "store":
+        writer = FrameStoreWriter(output_file)
+    else:
+        writer = SubmissionWriter(output_file, submission_df, flush_every=flush_every)
+    filenames = [f for f in submission_df["filename"].values if f not in writer]
+
+    results = pipeline(
+        filenames,
+        lambda filename: cv2.imread(os.path.join(lr_folder, filename)),
+        lambda init_img: model_module.predict(init_img, upsampler),
+        encode=encode if output_format == "csv" else None,
+        read_workers=read_workers,
+        encode_workers=encode_workers,
+        queue_size=queue_size,
+    )
+    with writer:
+        for filename, result in tqdm(results, total=len(filenames)):
+            writer.add(filename, result)
 
 
 if __name__ == "__main__":
@@ -86,6 +114,14 @@ if __name__ == "__main__":
         default="submission.csv",
         help="path to output file with predictions",
     )
+    parser.add_argument(
+        "-f",
+        "--output-format",
+        type=str,
+        default="csv",
+        choices=["csv", "store"],
+        help="csv submission or frame store directory for local experiments",
+    )
     parser.add_argument(
         "-c",
         "--model-config",
@@ -100,6 +136,30 @@ if __name__ == "__main__":
         default="pretrained",
         help="[pretrained | finetuned]",
     )
+    parser.add_argument(
+        "--read-workers",
+        type=int,
+        default=0,
+        help="number of threads which prefetch LR images, 0 for sequential mode",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=0,
+        help="number of processes which encode predictions, 0 for sequential mode",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=8,
+        help="maximum number of pending images in each pipeline stage",
+    )
+    parser.add_argument(
+        "--flush-every",
+        type=int,
+        default=50,
+        help="number of rows after which submission file is flushed to disk",
+    )
     args = parser.parse_args()
 
     root = Path(__file__).parents[1]
@@ -111,4 +171,9 @@ if __name__ == "__main__":
         args.output_file,
         args.model_config,
         args.model_type,
+        args.output_format,
+        args.read_workers,
+        args.encode_workers,
+        args.queue_size,
+        args.flush_every,
     )
@@ -1,8 +1,124 @@
+import ast
+import os
 from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator
 
 import numpy as np
 import pandas as pd
 from rle import decode
+from store import open_store
+
+MAXI = 20 * np.log10(255)
+MAX_PSNR = 100
+EPS = 1e-6
+
+
+def parse_rle(value: Any) -> bytes:
+    """
+    Parse RLE stored in csv file as bytes literal, i.e. b'...'.
+
+    Parameters
+    ----------
+    value : Any
+        Value from RLE column.
+
+    Returns
+    -------
+    bytes
+        Encoded image as bytes.
+    """
+    if isinstance(value, bytes):
+        return value
+    # base64 alphabet doesn't contain quotes or escapes, so literal can be sliced
+    if value.startswith("b'") and value.endswith("'"):
+        return value[2:-1].encode("ascii")
+    return ast.literal_eval(value)
+
+
+def image_psnr(real_rle: Any, pred_rle: Any) -> float:
+    """
+    PSNR between two encoded images.
+
+    Parameters
+    ----------
+    real_rle : Any
+        Encoded target image.
+    pred_rle : Any
+        Encoded predicted image.
+
+    Returns
+    -------
+    float
+        PSNR value, clipped by MAX_PSNR.
+    """
+    return array_psnr(decode(parse_rle(real_rle)), decode(parse_rle(pred_rle)))
+
+
+def array_psnr(real_img: np.ndarray, pred_img: np.ndarray) -> float:
+    """
+    PSNR between two uint8 images.
+
+    Parameters
+    ----------
+    real_img : np.ndarray
+        Target image in any shape.
+    pred_img : np.ndarray
+        Predicted image with the same number of values.
+
+    Returns
+    -------
+    float
+        PSNR value, clipped by MAX_PSNR.
+    """
+    real_img, pred_img = real_img.reshape(-1), pred_img.reshape(-1)
+    if real_img.size != pred_img.size:
+        raise ValueError(
+            f"predicted image has {pred_img.size} values, expected {real_img.size}."
+        )
+    sq_err = np.square(np.subtract(real_img, pred_img, dtype=np.int32))
+    mse = sq_err.sum(dtype=np.int64) / sq_err.size if sq_err.size else 0.0
+    inf_psnr = MAXI - 10 * np.log10(mse + EPS)
+    return float(min(inf_psnr, MAX_PSNR))
+
+
+def _image_psnr(args: tuple[str, str, Any, Any]) -> tuple[str, str, float]:
+    """
+    Wrapper around image_psnr for process pool.
+
+    Parameters
+    ----------
+    args : tuple[str, str, Any, Any]
+        Filename, usage, encoded target image and encoded predicted image.
+
+    Returns
+    -------
+    tuple[str, str, float]
+        Filename, usage and PSNR value.
+    """
+    filename, usage, real_rle, pred_rle = args
+    return filename, usage, image_psnr(real_rle, pred_rle)
+
+
+def _store_psnr(args: tuple[str, str, Any, str]) -> tuple[str, str, float]:
+    """
+    PSNR between encoded target image and predicted image from frame store,
+    only bytes of this frame are read from the store.
+
+    Parameters
+    ----------
+    args : tuple[str, str, Any, str]
+        Filename, usage, encoded target image and path to frame store.
+
+    Returns
+    -------
+    tuple[str, str, float]
+        Filename, usage and PSNR value.
+    """
+    filename, usage, real_rle, store_path = args
+    pred_img = open_store(store_path)[filename]
+    return filename, usage, array_psnr(decode(parse_rle(real_rle)), pred_img)
 
 
 def score(
@@ -36,22 +152,222 @@ def score(
     if row_id_column_name:
         del solution[row_id_column_name]
         del submission[row_id_column_name]
-    del solution[filename_column_name]
-    del submission[filename_column_name]
 
-    real_rle, pred_rle = (
-        solution[rle_column_name].values,
-        submission[rle_column_name].values,
+    merged = solution[[filename_column_name, rle_column_name]].merge(
+        submission[[filename_column_name, rle_column_name]],
+        on=filename_column_name,
+        how="left",
+        suffixes=("_real", "_pred"),
     )
-    maxi = 20 * np.log10(255)
-    max_psnr = 100
-    cnt, psnr, eps = 0, 0.0, 1e-6
+    real_rle = merged[f"{rle_column_name}_real"].values
+    pred_rle = merged[f"{rle_column_name}_pred"].values
+    if pd.isna(pred_rle).any():
+        raise ValueError("submission doesn't contain all filenames from solution.")
+
+    psnr = 0.0
     for real, pred in zip(real_rle, pred_rle):
-        real_img, pred_img = decode(eval(real)), decode(eval(pred))
-        inf_psnr = maxi - 10 * np.log10(np.mean((real_img - pred_img) ** 2) + eps)
-        psnr += inf_psnr if inf_psnr <= max_psnr else max_psnr
-        cnt += 1
-    return psnr / cnt
+        psnr += image_psnr(real, pred)
+    return psnr / len(real_rle)
+
+
+def _join_chunks(
+    solution_path: str,
+    submission_path: str,
+    filename_column_name: str,
+    rle_column_name: str,
+    usage_column_name: str,
+    chunk_size: int,
+) -> Iterator[tuple[str, str, Any, Any]]:
+    """
+    Read solution and submission files in chunks and join rows by filename.
+    Rows are matched as soon as both of them are read, so if files have
+    the same order only one chunk of each file is stored in memory.
+
+    Parameters
+    ----------
+    solution_path : str
+        Path to solution file.
+    submission_path : str
+        Path to submission file.
+    filename_column_name : str
+        Name of column in which filenames are stored.
+    rle_column_name : str
+        Name of column in which RLEs are stored.
+    usage_column_name : str
+        Name of column in solution file with Public / Private split.
+    chunk_size : int
+        Number of rows read at once from each file.
+
+    Returns
+    -------
+    Iterator[tuple[str, str, Any, Any]]
+        Filename, usage, encoded target image and encoded predicted image.
+    """
+    solution_reader = pd.read_csv(
+        solution_path,
+        usecols=[filename_column_name, rle_column_name, usage_column_name],
+        chunksize=chunk_size,
+    )
+    submission_reader = pd.read_csv(
+        submission_path,
+        usecols=[filename_column_name, rle_column_name],
+        chunksize=chunk_size,
+    )
+    pending_real, pending_pred = {}, {}
+
+    for solution_chunk in solution_reader:
+        for filename, rle, usage in zip(
+            solution_chunk[filename_column_name],
+            solution_chunk[rle_column_name],
+            solution_chunk[usage_column_name],
+        ):
+            pending_real[filename] = (usage, rle)
+
+        while pending_real:
+            for filename in [f for f in pending_real if f in pending_pred]:
+                usage, real_rle = pending_real.pop(filename)
+                yield filename, usage, real_rle, pending_pred.pop(filename)
+            if not pending_real:
+                break
+            submission_chunk = next(submission_reader, None)
+            if submission_chunk is None:
+                raise ValueError(
+                    "submission doesn't contain all filenames from solution, "
+                    f"e.g. {next(iter(pending_real))}."
+                )
+            for filename, rle in zip(
+                submission_chunk[filename_column_name],
+                submission_chunk[rle_column_name],
+            ):
+                pending_pred[filename] = rle
+
+
+def _store_chunks(
+    solution_path: str,
+    store_path: str,
+    filename_column_name: str,
+    rle_column_name: str,
+    usage_column_name: str,
+    chunk_size: int,
+) -> Iterator[tuple[str, str, Any, str]]:
+    """
+    Read solution file in chunks and match its rows with frames from store.
+
+    Parameters
+    ----------
+    solution_path : str
+        Path to solution file.
+    store_path : str
+        Path to frame store with predictions.
+    filename_column_name : str
+        Name of column in which filenames are stored.
+    rle_column_name : str
+        Name of column in which RLEs are stored.
+    usage_column_name : str
+        Name of column in solution file with Public / Private split.
+    chunk_size : int
+        Number of rows read at once from solution file.
+
+    Returns
+    -------
+    Iterator[tuple[str, str, Any, str]]
+        Filename, usage, encoded target image and path to frame store.
+    """
+    store = open_store(store_path)
+    solution_reader = pd.read_csv(
+        solution_path,
+        usecols=[filename_column_name, rle_column_name, usage_column_name],
+        chunksize=chunk_size,
+    )
+    for solution_chunk in solution_reader:
+        for filename, rle, usage in zip(
+            solution_chunk[filename_column_name],
+            solution_chunk[rle_column_name],
+            solution_chunk[usage_column_name],
+        ):
+            if filename not in store:
+                raise ValueError(f"frame store doesn't contain {filename}.")
+            yield filename, usage, rle, store_path
+
+
+def score_files(
+    solution_path: str,
+    submission_path: str,
+    filename_column_name: str = "filename",
+    rle_column_name: str = "rle",
+    usage_column_name: str = "Usage",
+    chunk_size: int = 64,
+    workers: int = 1,
+) -> tuple[dict[str, float], pd.DataFrame]:
+    """
+    Streaming PSNR calculation for local evaluation of submission files.
+    Per image PSNR and Public / Private aggregates are calculated in one pass.
+    Submission can be csv file or frame store directory, frames from store
+    are compared without encoding.
+
+    Parameters
+    ----------
+    solution_path : str
+        Path to solution file.
+    submission_path : str
+        Path to submission file or frame store directory.
+    filename_column_name : str
+        Name of column in which filenames are stored.
+    rle_column_name : str
+        Name of column in which RLEs are stored.
+    usage_column_name : str
+        Name of column in solution file with Public / Private split.
+    chunk_size : int
+        Number of rows read at once from each file.
+    workers : int
+        Number of worker processes, 1 means decoding in the current process.
+
+    Returns
+    -------
+    tuple[dict[str, float], pd.DataFrame]
+        0. Mean PSNR for each usage and for all images (Total),
+        1. pd.DataFrame with filename, usage and PSNR for each image.
+    """
+    if os.path.isdir(submission_path):
+        join_chunks, pair_psnr = _store_chunks, _store_psnr
+    else:
+        join_chunks, pair_psnr = _join_chunks, _image_psnr
+    pairs = join_chunks(
+        solution_path,
+        submission_path,
+        filename_column_name,
+        rle_column_name,
+        usage_column_name,
+        chunk_size,
+    )
+    rows = {filename_column_name: [], usage_column_name: [], "psnr": []}
+    totals, counts = {"Total": 0.0}, {"Total": 0}
+
+    def add(filename: str, usage: str, psnr: float) -> None:
+        """Add PSNR value of one image to rows and aggregates."""
+        rows[filename_column_name] += [filename]
+        rows[usage_column_name] += [usage]
+        rows["psnr"] += [psnr]
+        for key in (usage, "Total"):
+            totals[key] = totals.get(key, 0.0) + psnr
+            counts[key] = counts.get(key, 0) + 1
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # bounded number of submitted tasks keeps memory usage constant
+            futures = deque()
+            for pair in pairs:
+                futures.append(executor.submit(pair_psnr, pair))
+                if len(futures) >= 4 * workers:
+                    add(*futures.popleft().result())
+            while futures:
+                add(*futures.popleft().result())
+    else:
+        for pair in pairs:
+            add(*pair_psnr(pair))
+
+    aggregates = {key: totals[key] / counts[key] for key in totals if counts[key]}
+    return aggregates, pd.DataFrame(rows)
 
 
 if __name__ == "__main__":
@@ -60,7 +376,7 @@ if __name__ == "__main__":
         "--submission",
         type=str,
         default="submission.csv",
-        help="path to submission file",
+        help="path to submission file or frame store directory",
     )
     parser.add_argument(
         "--solution",
@@ -71,14 +387,40 @@ if __name__ == "__main__":
     parser.add_argument("--col1", type=str, default=None)
     parser.add_argument("--col2", type=str, default="filename")
     parser.add_argument("--col3", type=str, default="rle")
+    parser.add_argument("--col4", type=str, default="Usage")
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=int,
+        default=64,
+        help="number of rows read at once from each file",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes",
+    )
+    parser.add_argument(
+        "--per-image",
+        type=str,
+        default=None,
+        help="path to save PSNR value of each image",
+    )
     args = parser.parse_args()
 
-    psnr = score(
-        pd.read_csv(args.solution).copy(),
-        pd.read_csv(args.submission).copy(),
-        args.col1,
+    psnr, per_image = score_files(
+        args.solution,
+        args.submission,
         args.col2,
         args.col3,
+        args.col4,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
     )
+    if args.per_image:
+        per_image.to_csv(args.per_image, index=False)
 
-    print(f"PSNR = {psnr:.3f}")
+    for usage, value in psnr.items():
+        print(f"{usage} PSNR = {value:.3f}")
@@ -1,13 +1,71 @@
 import base64
+import math
 import os
 import zlib
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 
 import cv2
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
+CHUNK_SIZE = 1 << 20
+
+
+def _find_runs(flat: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find runs of equal consecutive values in flat uint8 array.
+
+    Parameters
+    ----------
+    flat : np.ndarray
+        Flat uint8 array.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        0. Value of each run,
+        1. Length of each run.
+    """
+    if flat.size == 0:
+        return np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.append(starts, flat.size))
+    return flat[starts], lengths
+
+
+def _pack_runs(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Split runs longer than 255 and interleave them into (value, count) pairs.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Value of each run.
+    lengths : np.ndarray
+        Length of each run.
+
+    Returns
+    -------
+    np.ndarray
+        Flat uint8 array in [value, count, value, count, ...] format.
+    """
+    if lengths.size and lengths.max() > 255:
+        chunks = (lengths + 254) // 255
+        counts = np.full(int(chunks.sum()), 255, dtype=np.uint8)
+        counts[np.cumsum(chunks) - 1] = lengths - 255 * (chunks - 1)
+        values = np.repeat(values, chunks)
+    else:
+        counts = lengths
+
+    rle = np.empty(2 * counts.size, dtype=np.uint8)
+    rle[0::2] = values
+    rle[1::2] = counts
+    return rle
+
 
 def encode(img: np.ndarray) -> bytes:
     """
@@ -25,27 +83,13 @@ def encode(img: np.ndarray) -> bytes:
     bytes
         Encoded image as bytes.
     """
-    img_to_encode = img.astype(np.uint8)
-    img_to_encode = img_to_encode.flatten()
-    img_to_encode = np.append(img_to_encode, -1)
-
-    cnt, rle = 1, []
-    for i in range(1, img_to_encode.shape[0]):
-        if img_to_encode[i] == img_to_encode[i - 1]:
-            cnt += 1
-            if cnt > 255:
-                rle += [img_to_encode[i - 1], 255]
-                cnt = 1
-        else:
-            rle += [img_to_encode[i - 1], cnt]
-            cnt = 1
-
-    compressed = zlib.compress(bytes(rle), zlib.Z_BEST_COMPRESSION)
+    rle = _pack_runs(*_find_runs(img.astype(np.uint8).ravel()))
+    compressed = zlib.compress(rle.tobytes(), zlib.Z_BEST_COMPRESSION)
     base64_bytes = base64.b64encode(compressed)
     return base64_bytes
 
 
-def decode(encoded_img: bytes) -> np.ndarray:
+def decode(encoded_img: bytes, shape: tuple[int, int, int] = None) -> np.ndarray:
     """
     Reverse operation for encode function to get original images.
 
@@ -53,21 +97,187 @@ def decode(encoded_img: bytes) -> np.ndarray:
     ----------
     encoded_img : bytes
         Encoded image as bytes.
+    shape : tuple[int, int, int]
+        Image shape in (h, w, c) format, if specified decoded image is reshaped.
 
     Returns
     -------
     np.ndarray
-        BGR image in (h, w, c) format, c = 3 (even for png format).
+        Flat decoded image or BGR image in (h, w, c) format if shape is specified.
     """
-    rle = zlib.decompress(base64.b64decode(encoded_img))
-    decoded_img = []
-    for i in range(0, len(rle), 2):
-        decoded_img += [rle[i]] * rle[i + 1]
-    return np.array(decoded_img, dtype=np.uint8)
+    rle = np.frombuffer(zlib.decompress(base64.b64decode(encoded_img)), np.uint8)
+    if rle.size % 2 != 0:
+        raise ValueError("corrupted RLE, odd number of bytes in (value, count) pairs.")
+    values, counts = rle[0::2], rle[1::2]
+
+    if shape is not None:
+        total = int(counts.sum(dtype=np.int64))
+        if total != math.prod(shape):
+            raise ValueError(
+                f"total run length {total} doesn't match image shape {tuple(shape)}."
+            )
+        return np.repeat(values, counts).reshape(shape)
+    return np.repeat(values, counts)
+
+
+def iter_encode(img: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Incremental version of encode function with bounded memory usage.
+    Image is processed in chunks of rows, concatenation of all yielded parts
+    is equal to encode(img).
+
+    Parameters
+    ----------
+    img : np.ndarray
+        cv2.imread(f) - BGR image in (h, w, c) format, c = 3 (even for png format).
+    chunk_size : int
+        Approximate number of image bytes processed at once.
+
+    Returns
+    -------
+    Iterator[bytes]
+        Parts of encoded image.
+    """
+    rows = max(1, chunk_size // max(1, math.prod(img.shape[1:])))
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION)
+    run_value, run_length = np.empty(1, dtype=np.uint8), np.zeros(1, dtype=np.int64)
+    tail = b""
+
+    for start in range(0, img.shape[0], rows):
+        values, lengths = _find_runs(img[start : start + rows].astype(np.uint8).ravel())
+        if values.size == 0:
+            continue
+        if run_length[0] > 0:
+            if values[0] == run_value[0]:
+                lengths[0] += run_length[0]
+            else:
+                values = np.concatenate((run_value, values))
+                lengths = np.concatenate((run_length, lengths))
+        # last run can continue in the next chunk
+        run_value, run_length = values[-1:], lengths[-1:]
+
+        data = tail + compressor.compress(_pack_runs(values[:-1], lengths[:-1]))
+        cut = len(data) - len(data) % 3
+        tail = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut])
+
+    if run_length[0] > 0:
+        tail += compressor.compress(_pack_runs(run_value, run_length))
+    yield base64.b64encode(tail + compressor.flush())
+
+
+def iter_decode(
+    encoded_img: bytes, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    """
+    Incremental version of decode function with bounded memory usage.
+    Concatenation of all yielded parts is equal to decode(encoded_img).
+
+    Parameters
+    ----------
+    encoded_img : bytes
+        Encoded image as bytes.
+    chunk_size : int
+        Approximate number of decoded bytes in each part.
+
+    Returns
+    -------
+    Iterator[np.ndarray]
+        Flat uint8 parts of decoded image.
+    """
+    decompressor = zlib.decompressobj()
+    step = 4 * max(1, chunk_size // 4)
+    tail = b""
+
+    for start in range(0, len(encoded_img), step):
+        data = base64.b64decode(encoded_img[start : start + step])
+        while data:
+            rle = tail + decompressor.decompress(data, chunk_size)
+            data = decompressor.unconsumed_tail
+            cut = len(rle) - len(rle) % 2
+            tail = rle[cut:]
+
+            rle = np.frombuffer(rle, dtype=np.uint8, count=cut)
+            values, counts = rle[0::2], rle[1::2]
+            ends = np.cumsum(counts, dtype=np.int64)
+            if ends.size == 0:
+                continue
+            splits = np.searchsorted(
+                ends, np.arange(chunk_size, ends[-1], chunk_size), side="right"
+            )
+            for part_values, part_counts in zip(
+                np.split(values, splits), np.split(counts, splits)
+            ):
+                if part_values.size:
+                    yield np.repeat(part_values, part_counts)
+
+    if tail or not decompressor.eof:
+        raise ValueError("corrupted RLE, stream ended in the middle of data.")
+
+
+def decode_into(
+    encoded_img: bytes, out: np.ndarray, chunk_size: int = CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Decode image directly into preallocated array (or np.memmap).
+
+    Parameters
+    ----------
+    encoded_img : bytes
+        Encoded image as bytes.
+    out : np.ndarray
+        Contiguous uint8 array of any shape, which will be filled by decoded image.
+    chunk_size : int
+        Approximate number of decoded bytes processed at once.
+
+    Returns
+    -------
+    np.ndarray
+        Filled out array.
+    """
+    if out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("out should be contiguous uint8 array.")
+    flat_out = out.reshape(-1)
+    offset = 0
+    for part in iter_decode(encoded_img, chunk_size):
+        if offset + part.size > flat_out.size:
+            raise ValueError(f"total run length exceeds output size {flat_out.size}.")
+        flat_out[offset : offset + part.size] = part
+        offset += part.size
+    if offset != flat_out.size:
+        raise ValueError(
+            f"total run length {offset} doesn't match output size {flat_out.size}."
+        )
+    return out
+
+
+def encode_file(path: str) -> bytes:
+    """
+    Encode image from file and check that decoding gives the same image.
+
+    Parameters
+    ----------
+    path : str
+        Path to image.
+
+    Returns
+    -------
+    bytes
+        Encoded image as bytes.
+    """
+    img = cv2.imread(path)
+    encoded_img = encode(img)
+    decoded_img = decode(encoded_img, img.shape)
+    assert np.array_equal(img, decoded_img), "encoded != decoded"
+    return encoded_img
 
 
 def encode_folder(
-    folder: str, save_path: str = "solution.csv", public_size: float = 0.3
+    folder: str,
+    save_path: str = "solution.csv",
+    public_size: float = 0.3,
+    workers: int = 1,
 ) -> None:
     """
     Encode images from folder (target images from test set) and save into solution.csv.
@@ -80,6 +290,8 @@ def encode_folder(
         Path to save solution.csv.
     public_size : float
         Size of public part of the dataset for the leaderboard.
+    workers : int
+        Number of worker processes, 1 means encoding in the current process.
 
     Returns
     -------
@@ -93,18 +305,27 @@ def encode_folder(
         size=int(public_size * len(files)),
         replace=False,
     )
-    for i in tqdm(range(len(files))):
-        img = cv2.imread(os.path.join(folder, files[i]))
-        h, w, c = img.shape
-        encoded_img = encode(img)
-        decoded_img = decode(encoded_img).reshape(h, w, c)
-        assert (img - decoded_img).sum() == 0, "encoded != decoded"
-        dct["filename"] += [files[i]]
-        dct["rle"] += [encode(img)]
-        if i in public_ind:
-            dct["Usage"] += ["Public"]
-        else:
-            dct["Usage"] += ["Private"]
+    public_ind = set(public_ind.tolist())
+    paths = [os.path.join(folder, filename) for filename in files]
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        encoded_imgs = executor.map(encode_file, paths, chunksize=8)
+    else:
+        executor = None
+        encoded_imgs = map(encode_file, paths)
+
+    try:
+        for i, encoded_img in enumerate(tqdm(encoded_imgs, total=len(files))):
+            dct["filename"] += [files[i]]
+            dct["rle"] += [encoded_img]
+            if i in public_ind:
+                dct["Usage"] += ["Public"]
+            else:
+                dct["Usage"] += ["Private"]
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
 
     df = pd.DataFrame(dct)
     df.to_csv(save_path, index=True, index_label="id")
@@ -133,6 +354,13 @@ if __name__ == "__main__":
         default=0.3,
         help="size of public part of the dataset for the leaderboard",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes",
+    )
     parser.add_argument(
         "--seed",
         type=int,
@@ -142,4 +370,9 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     np.random.seed(args.seed)
-    encode_folder(args.folder, save_path=args.save_path, public_size=args.public_size)
+    encode_folder(
+        args.folder,
+        save_path=args.save_path,
+        public_size=args.public_size,
+        workers=args.workers,
+    )
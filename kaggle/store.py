@@ -0,0 +1,351 @@
+import csv
+import math
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from rle import encode
+from tqdm import tqdm
+
+DATA_FILE = "data.bin"
+INDEX_FILE = "index.csv"
+
+
+class FrameStore:
+    """
+    Read only binary store of uint8 frames, frames are memory-mapped.
+
+    Attributes
+    ----------
+    path : str
+        Path to store directory.
+    index : dict[str, tuple[int, tuple[int, ...]]]
+        Mapping of filenames to (offset, shape) of frames in data file.
+
+    Methods
+    -------
+    filenames()
+        Get filenames of all stored frames in order of writing.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor of FrameStore class.
+
+        Parameters
+        ----------
+        path : str
+            Path to store directory.
+
+        Returns
+        -------
+        None
+        """
+        if not os.path.exists(os.path.join(path, INDEX_FILE)):
+            raise ValueError(f"{path} is not a frame store.")
+        self.path = path
+        self.index = read_index(path)
+
+        data_path = os.path.join(path, DATA_FILE)
+        if os.path.getsize(data_path) > 0:
+            self._data = np.memmap(data_path, dtype=np.uint8, mode="r")
+        else:
+            self._data = np.empty(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.index
+
+    def __getitem__(self, filename: str) -> np.ndarray:
+        """
+        Get frame without reading other frames from disk.
+
+        Parameters
+        ----------
+        filename : str
+            Frame filename.
+
+        Returns
+        -------
+        np.ndarray
+            Read only memory-mapped frame in (h, w, c) format.
+        """
+        offset, shape = self.index[filename]
+        return self._data[offset : offset + math.prod(shape)].reshape(shape)
+
+    def filenames(self) -> list[str]:
+        """
+        Get filenames of all stored frames in order of writing.
+
+        Returns
+        -------
+        list[str]
+            List of filenames.
+        """
+        return list(self.index.keys())
+
+
+class FrameStoreWriter:
+    """
+    Append only writer of binary store of uint8 frames.
+    Frame data is flushed before its index record, so after a crash the store
+    contains only complete frames and writing can be continued.
+
+    Attributes
+    ----------
+    path : str
+        Path to store directory.
+    index : dict[str, tuple[int, tuple[int, ...]]]
+        Mapping of filenames to (offset, shape) of frames in data file.
+
+    Methods
+    -------
+    add(filename, img)
+        Append frame to the store.
+    close()
+        Close store files.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor of FrameStoreWriter class, existing store is opened for appending.
+
+        Parameters
+        ----------
+        path : str
+            Path to store directory.
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.index = read_index(path)
+
+        end = 0
+        for offset, shape in self.index.values():
+            end = max(end, offset + math.prod(shape))
+
+        # index is rewritten to drop incomplete record which could be left after
+        # crash, it's replaced atomically, so a crash during rewrite keeps old index
+        index_path = os.path.join(path, INDEX_FILE)
+        with open(index_path + ".tmp", "w", newline="") as f:
+            writer = csv.writer(f)
+            for filename, (offset, shape) in self.index.items():
+                writer.writerow([filename, offset, *shape])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(index_path + ".tmp", index_path)
+
+        self._data_file = open(os.path.join(path, DATA_FILE), "ab")
+        # drop bytes of frame which was being written during crash
+        self._data_file.truncate(end)
+        self._offset = end
+
+        self._index_file = open(index_path, "a", newline="")
+        self._index_writer = csv.writer(self._index_file)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.index
+
+    def __enter__(self) -> "FrameStoreWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def add(self, filename: str, img: np.ndarray) -> None:
+        """
+        Append frame to the store.
+
+        Parameters
+        ----------
+        filename : str
+            Frame filename.
+        img : np.ndarray
+            Image in (h, w, c) format.
+
+        Returns
+        -------
+        None
+        """
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        self._data_file.write(img.data)
+        self._data_file.flush()
+        self._index_writer.writerow([filename, self._offset, *img.shape])
+        self._index_file.flush()
+        self.index[filename] = (self._offset, img.shape)
+        self._offset += img.nbytes
+
+    def close(self) -> None:
+        """
+        Close store files.
+
+        Returns
+        -------
+        None
+        """
+        self._data_file.close()
+        self._index_file.close()
+
+
+def read_index(path: str) -> dict[str, tuple[int, tuple[int, ...]]]:
+    """
+    Read index of frame store.
+
+    Parameters
+    ----------
+    path : str
+        Path to store directory.
+
+    Returns
+    -------
+    dict[str, tuple[int, tuple[int, ...]]]
+        Mapping of filenames to (offset, shape) of frames in data file.
+    """
+    index = {}
+    index_path = os.path.join(path, INDEX_FILE)
+    data_path = os.path.join(path, DATA_FILE)
+    if not os.path.exists(index_path) or not os.path.exists(data_path):
+        return index
+
+    data_size = os.path.getsize(data_path)
+    with open(index_path, "r", newline="") as f:
+        for row in csv.reader(f):
+            try:
+                filename, offset, *shape = row
+                offset, shape = int(offset), tuple(int(x) for x in shape)
+            except ValueError:
+                continue
+            # record is incomplete or its frame wasn't fully written
+            if len(shape) < 2 or offset + math.prod(shape) > data_size:
+                continue
+            index[filename] = (offset, shape)
+    return index
+
+
+_stores = {}
+
+
+def open_store(path: str) -> FrameStore:
+    """
+    Open frame store once per process, store is reopened if its index was changed
+    and the previous version is dropped from cache.
+
+    Parameters
+    ----------
+    path : str
+        Path to store directory.
+
+    Returns
+    -------
+    FrameStore
+        Opened frame store.
+    """
+    mtime = os.stat(os.path.join(path, INDEX_FILE)).st_mtime_ns
+    cached = _stores.get(path)
+    if cached is None or cached[0] != mtime:
+        # memory map of stale store is closed when its last frame is released
+        cached = _stores[path] = (mtime, FrameStore(path))
+    return cached[1]
+
+
+def _encode_frame(args: tuple[str, str]) -> bytes:
+    """
+    Encode frame from store, used in process pool.
+
+    Parameters
+    ----------
+    args : tuple[str, str]
+        Path to store directory and frame filename.
+
+    Returns
+    -------
+    bytes
+        Encoded image as bytes.
+    """
+    path, filename = args
+    return encode(open_store(path)[filename])
+
+
+def export_csv(
+    store_path: str, sample_submission: str, output_file: str, workers: int = 1
+) -> None:
+    """
+    Export frame store into submission file in kaggle format.
+
+    Parameters
+    ----------
+    store_path : str
+        Path to store directory.
+    sample_submission : str
+        Path to sample submission file.
+    output_file : str
+        Path to output file with predictions.
+    workers : int
+        Number of worker processes, 1 means encoding in the current process.
+
+    Returns
+    -------
+    None
+    """
+    store = open_store(store_path)
+    submission_df = pd.read_csv(sample_submission)
+
+    filenames = submission_df["filename"].values
+    missing = [filename for filename in filenames if filename not in store]
+    if missing:
+        raise ValueError(f"{len(missing)} frames are missing, e.g. {missing[0]}.")
+
+    tasks = [(store_path, filename) for filename in filenames]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rle = list(
+                tqdm(executor.map(_encode_frame, tasks, chunksize=8), total=len(tasks))
+            )
+    else:
+        rle = [_encode_frame(task) for task in tqdm(tasks)]
+
+    submission_df["rle"] = rle
+    submission_df.to_csv(output_file, index=False)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-s",
+        "--store",
+        type=str,
+        required=True,
+        help="path to frame store directory",
+    )
+    parser.add_argument(
+        "-p",
+        "--sample-submission",
+        type=str,
+        required=True,
+        help="path to sample submission file",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-file",
+        type=str,
+        default="submission.csv",
+        help="path to output file with predictions",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes",
+    )
+    args = parser.parse_args()
+
+    export_csv(args.store, args.sample_submission, args.output_file, args.workers)
@@ -0,0 +1,163 @@
+import os
+from typing import Any
+
+import pandas as pd
+
+
+class SubmissionWriter:
+    """
+    Incremental writer of submission file in kaggle format.
+    Rows are appended and flushed to disk periodically, if file already exists
+    its complete rows are kept and can be skipped on restart.
+
+    Attributes
+    ----------
+    path : str
+        Path to submission file.
+    columns : list[str]
+        Columns of sample submission.
+    flush_every : int
+        Number of rows after which buffer is written to disk.
+    done : set[str]
+        Filenames of rows which are already written.
+
+    Methods
+    -------
+    add(filename, rle)
+        Add encoded prediction for filename.
+    flush()
+        Write buffered rows to disk.
+    close()
+        Flush buffered rows.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_submission: pd.DataFrame,
+        rle_column_name: str = "rle",
+        filename_column_name: str = "filename",
+        flush_every: int = 50,
+    ) -> None:
+        """
+        Constructor of SubmissionWriter class.
+
+        Parameters
+        ----------
+        path : str
+            Path to submission file.
+        sample_submission : pd.DataFrame
+            Sample submission, other columns are copied from it.
+        rle_column_name : str
+            Name of column in which RLEs are stored.
+        filename_column_name : str
+            Name of column in which filenames are stored.
+        flush_every : int
+            Number of rows after which buffer is written to disk.
+
+        Returns
+        -------
+        None
+        """
+        self.path = path
+        self.columns = list(sample_submission.columns)
+        self.flush_every = flush_every
+        self._rle_column_name = rle_column_name
+        self._rows = sample_submission.set_index(filename_column_name, drop=False)
+        self._filename_column_name = filename_column_name
+        self._buffer = []
+        self.done = self._restore()
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.done
+
+    def __enter__(self) -> "SubmissionWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _restore(self) -> set[str]:
+        """
+        Keep complete rows of existing submission file or create new file.
+
+        Returns
+        -------
+        set[str]
+            Filenames of complete rows.
+        """
+        if not os.path.exists(self.path):
+            open(self.path, "w").close()
+
+        # row which was being written during crash doesn't end with newline
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - (1 << 16))
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    break
+                end = start
+            else:
+                f.truncate(0)
+
+        if os.path.getsize(self.path) == 0:
+            pd.DataFrame(columns=self.columns).to_csv(self.path, index=False)
+            return set()
+
+        if list(pd.read_csv(self.path, nrows=0).columns) != self.columns:
+            raise ValueError(f"columns of {self.path} differ from sample submission.")
+        existing = pd.read_csv(self.path, usecols=[self._filename_column_name])
+        return set(existing[self._filename_column_name])
+
+    def add(self, filename: str, rle: bytes) -> None:
+        """
+        Add encoded prediction for filename.
+
+        Parameters
+        ----------
+        filename : str
+            Image filename from sample submission.
+        rle : bytes
+            Encoded image.
+
+        Returns
+        -------
+        None
+        """
+        row = self._rows.loc[filename].to_dict()
+        row[self._rle_column_name] = rle
+        self._buffer += [row]
+        self.done.add(filename)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write buffered rows to disk.
+
+        Returns
+        -------
+        None
+        """
+        if not self._buffer:
+            return
+        with open(self.path, "a", newline="") as f:
+            pd.DataFrame(self._buffer, columns=self.columns).to_csv(
+                f, header=False, index=False
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        self._buffer = []
+
+    def close(self) -> None:
+        """
+        Flush buffered rows.
+
+        Returns
+        -------
+        None
+        """
+        self.flush()
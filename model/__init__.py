@@ -1,3 +1,72 @@
-from .emt_model import configure, predict  # noqa
-from .real_esrgan import configure, predict  # noqa
-from .resshift import configure, predict  # noqa
+"""
+Registry of model modules. Each module provides configure, predict,
+predict_batch and batched functions and is imported on first access, e.g.
+getattr(model_registry, config["model"]), so only backends of used model
+are loaded.
+"""
+
+import importlib
+from types import ModuleType
+
+_modules = {
+    "emt_model": f"{__name__}.emt_model",
+    "real_esrgan": f"{__name__}.real_esrgan",
+    "resshift": f"{__name__}.resshift",
+}
+
+
+def register(name: str, module_path: str) -> None:
+    """
+    Register model module, it's imported on first access.
+
+    Parameters
+    ----------
+    name : str
+        Model name used in config["model"].
+    module_path : str
+        Import path of module with configure, predict, predict_batch and batched.
+
+    Returns
+    -------
+    None
+    """
+    _modules[name] = module_path
+    globals().pop(name, None)
+
+
+def available() -> list[str]:
+    """
+    Get names of registered models.
+
+    Returns
+    -------
+    list[str]
+        Model names.
+    """
+    return sorted(_modules)
+
+
+def __getattr__(name: str) -> ModuleType:
+    """
+    Import registered model module on first access.
+
+    Parameters
+    ----------
+    name : str
+        Model name used in config["model"].
+
+    Returns
+    -------
+    ModuleType
+        Model module.
+    """
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_modules[name])
+    # next accesses don't go through __getattr__
+    globals()[name] = module
+    return module
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_modules))
@@ -9,6 +9,14 @@ from basicsr.utils import img2tensor
 from emt.models.ir_model import IRModel
 from tritonclient import http as httpclient
 
+from model.tiling import Tiler
+from model.warmup import warmup
+
+# peak memory of EMT forward per input pixel, window attention maps dominate
+TILE_BYTES_PER_PIXEL = 32 * 1024
+# tile side is multiple of the largest attention window side
+TILE_MULTIPLE = 32
+
 
 class EMTModel:
     """
@@ -36,11 +44,15 @@ class EMTModel:
         Model name in tritonserver, available only if backend == 'triton'.
     triton_model_version : optional, str
         Model version in tritonserver, available only if backend == 'triton'.
+    tiler : Tiler
+        Splitter of large images into overlapping tiles.
 
     Methods
     -------
     enhance(img)
         Enhance image using EMT model.
+    enhance_batch(imgs)
+        Enhance batch of images with the same shape using EMT model.
     """
 
     def __init__(self, root: PurePath, config: dict[str, Any]) -> None:
@@ -89,11 +101,50 @@ class EMTModel:
             self.triton_model_version = config["triton_model_version"]
         else:
             raise ValueError(f"The {self.backend} backend isn't supported")
+        self.tiler = Tiler.from_config(
+            config,
+            TILE_BYTES_PER_PIXEL,
+            TILE_MULTIPLE,
+            outscale=config["network_g"]["upscale"],
+        )
 
-    @torch.no_grad()
     def enhance(self, img: np.ndarray) -> np.ndarray:
         """
-        Enhance image using EMT model.
+        Enhance image using EMT model, large image is split into overlapping tiles.
+
+        Parameters
+        ----------
+        img : np.ndarray
+            Image in (h, w, c) format.
+
+        Returns
+        -------
+        np.ndarray
+            High resolution image in (h*, w*, c) format.
+        """
+        return self.enhance_batch([img])[0]
+
+    def enhance_batch(self, imgs: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Enhance batch of images with the same shape using EMT model,
+        large images are split into overlapping tiles, which are batched.
+
+        Parameters
+        ----------
+        imgs : list[np.ndarray]
+            Images in (h, w, c) format.
+
+        Returns
+        -------
+        list[np.ndarray]
+            High resolution images in (h*, w*, c) format.
+        """
+        return self.tiler.run(imgs, self._forward_batch)
+
+    @torch.no_grad()
+    def _forward(self, img: np.ndarray) -> np.ndarray:
+        """
+        Run EMT model on whole image.
 
         Parameters
         ----------
@@ -149,8 +200,41 @@ class EMTModel:
             raise ValueError(f"The {self.backend} backend isn't supported")
         return out_img
 
+    @torch.no_grad()
+    def _forward_batch(self, imgs: list[np.ndarray]) -> list[np.ndarray]:
+        """
+        Run EMT model on batch of whole images with the same shape,
+        only torch backend runs batch in one forward.
+
+        Parameters
+        ----------
+        imgs : list[np.ndarray]
+            Images in (h, w, c) format.
+
+        Returns
+        -------
+        list[np.ndarray]
+            High resolution images in (h*, w*, c) format.
+        """
+        if self.backend != "torch" or len(imgs) == 1:
+            return [self._forward(img) for img in imgs]
+
+        inp_tensor = torch.stack(img2tensor(imgs)).to(self.device)
+        out_tensor = (
+            self.net_g(inp_tensor)
+            .detach()
+            .cpu()
+            .clamp(0, 2**self.nbits - 1.0)
+            .round()
+            .numpy()
+            .transpose(0, 2, 3, 1)
+        ).astype(np.uint8)
+        return [cv2.cvtColor(out_img, cv2.COLOR_BGR2RGB) for out_img in out_tensor]
 
-def configure(root: PurePath, config: dict[str, Any]) -> Any:
+
+def configure(
+    root: PurePath, config: dict[str, Any], warmup_shapes: list[str] = None
+) -> Any:
     """
     Create EMTModel class instance from configuration dictionary.
 
@@ -160,6 +244,9 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         Path to project root directory.
     config : dict[str, Any]
         Dictionary with configuration parameters.
+    warmup_shapes : list[str]
+        Input resolutions which are run once after loading, e.g. 270p or 256x256,
+        warmup is skipped if None.
 
     Returns
     -------
@@ -167,9 +254,28 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         EMTModel class instance.
     """
     upsampler = EMTModel(root, config)
+    if warmup_shapes:
+        warmup(predict_batch, upsampler, warmup_shapes)
     return upsampler
 
 
+def batched(config: dict[str, Any]) -> bool:
+    """
+    Check whether model runs batch of images in one forward.
+
+    Parameters
+    ----------
+    config : dict[str, Any]
+        Dictionary with configuration parameters.
+
+    Returns
+    -------
+    bool
+        True for torch backend.
+    """
+    return config["backend"] == "torch"
+
+
 def predict(img: np.ndarray, upsampler: Any) -> np.ndarray:
     """
     Enhance low resolution image using EMT model.
@@ -188,3 +294,23 @@ def predict(img: np.ndarray, upsampler: Any) -> np.ndarray:
     """
     out_img = upsampler.enhance(img)
     return out_img
+
+
+def predict_batch(imgs: list[np.ndarray], upsampler: Any) -> list[np.ndarray]:
+    """
+    Enhance batch of low resolution images with the same shape using EMT model.
+
+    Parameters
+    ----------
+    imgs : list[np.ndarray]
+        Images in (h, w, c) format.
+    upsampler : Any
+        EMTModel class instance.
+
+    Returns
+    -------
+    list[np.ndarray]
+        High resolution images in (h*, w*, c) format.
+    """
+    out_imgs = upsampler.enhance_batch(imgs)
+    return out_imgs
@@ -1,13 +1,24 @@
 from pathlib import PurePath
 from typing import Any
 
+import cv2
 import numpy as np
+import torch
+import torch.nn.functional as F
 from basicsr.archs.rrdbnet_arch import RRDBNet
 from realesrgan import RealESRGANer
 from realesrgan.archs.srvgg_arch import SRVGGNetCompact
 
+from model.tiling import Tiler
+from model.warmup import warmup
 
-def configure(root: PurePath, config: dict[str, Any]) -> Any:
+# peak memory of RRDBNet forward per input pixel, x4 upsampling features dominate
+TILE_BYTES_PER_PIXEL = 16 * 1024
+
+
+def configure(
+    root: PurePath, config: dict[str, Any], warmup_shapes: list[str] = None
+) -> Any:
     """
     Create Real-ESRGAN model from configuration dictionary.
 
@@ -17,6 +28,9 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         Path to project root directory.
     config : dict[str, Any]
         Dictionary with configuration parameters.
+    warmup_shapes : list[str]
+        Input resolutions which are run once after loading, e.g. 270p or 256x256,
+        warmup is skipped if None.
 
     Returns
     -------
@@ -101,7 +115,8 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         model_path=model_path,
         dni_weight=dni_weight,
         model=model,
-        tile=config["tile"],
+        # large images are split into tiles and blended by shared tiler
+        tile=0,
         tile_pad=config["tile_pad"],
         pre_pad=config["pre_pad"],
         half=not config["fp32"],
@@ -114,9 +129,102 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         outscale=config["outscale"],
         hf_repository=config["huggingface_model_repository"],
     )
+    upsampler.tiler = Tiler.from_config(
+        config, TILE_BYTES_PER_PIXEL, outscale=config["outscale"] or netscale
+    )
+    # torch backend runs images with the same shape in one forward,
+    # other backends use per-image enhance
+    upsampler.batch_settings = None
+    if config["backend"] == "torch":
+        upsampler.batch_settings = {
+            "scale": netscale,
+            "pre_pad": config["pre_pad"],
+            "outscale": config["outscale"],
+        }
+    if warmup_shapes:
+        warmup(predict_batch, upsampler, warmup_shapes)
     return upsampler
 
 
+def batched(config: dict[str, Any]) -> bool:
+    """
+    Check whether model runs batch of images in one forward.
+
+    Parameters
+    ----------
+    config : dict[str, Any]
+        Dictionary with configuration parameters.
+
+    Returns
+    -------
+    bool
+        True for torch backend.
+    """
+    return config["backend"] == "torch"
+
+
+@torch.no_grad()
+def _forward_batch(imgs: list[np.ndarray], upsampler: Any) -> list[np.ndarray]:
+    """
+    Run Real-ESRGAN network on batch of images with the same shape in one forward,
+    pre- and post-processing of 8-bit BGR images matches RealESRGANer.enhance.
+    Images of other types and other backends use per-image enhance.
+
+    Parameters
+    ----------
+    imgs : list[np.ndarray]
+        Images in (h, w, c) format.
+    upsampler : Any
+        Real-ESRGAN model.
+
+    Returns
+    -------
+    list[np.ndarray]
+        High resolution images in (h*, w*, c) format.
+    """
+    settings = upsampler.batch_settings
+    if (
+        settings is None
+        or len(imgs) == 1
+        or imgs[0].dtype != np.uint8
+        or imgs[0].ndim != 3
+        or imgs[0].shape[2] != 3
+    ):
+        return [upsampler.enhance(img)[0] for img in imgs]
+
+    h, w = imgs[0].shape[:2]
+    scale = settings["scale"]
+    # BGR to RGB and (n, h, w, c) to (n, c, h, w)
+    batch = np.ascontiguousarray(np.stack(imgs)[..., ::-1].transpose(0, 3, 1, 2))
+    inp_tensor = torch.from_numpy(batch).to(upsampler.device).float() / 255.0
+    inp_tensor = inp_tensor.to(upsampler.dtype)
+
+    # pre pad and pad to multiple of 2 for x2 and of 4 for x1 models,
+    # both are on bottom and right side, so output is cropped at once
+    pre_pad = settings["pre_pad"]
+    if pre_pad:
+        inp_tensor = F.pad(inp_tensor, (0, pre_pad, 0, pre_pad), "reflect")
+    mod_scale = {2: 2, 1: 4}.get(scale)
+    if mod_scale is not None:
+        mod_pad_h = -inp_tensor.shape[2] % mod_scale
+        mod_pad_w = -inp_tensor.shape[3] % mod_scale
+        inp_tensor = F.pad(inp_tensor, (0, mod_pad_w, 0, mod_pad_h), "reflect")
+
+    out_tensor = upsampler.net_g(inp_tensor)[:, :, : h * scale, : w * scale]
+    out_batch = out_tensor.float().cpu().clamp_(0, 1).numpy()
+    out_batch = (out_batch[:, ::-1].transpose(0, 2, 3, 1) * 255.0).round()
+    out_imgs = list(out_batch.astype(np.uint8))
+
+    outscale = settings["outscale"]
+    if outscale is not None and outscale != float(scale):
+        size = (int(w * outscale), int(h * outscale))
+        out_imgs = [
+            cv2.resize(out_img, size, interpolation=cv2.INTER_LANCZOS4)
+            for out_img in out_imgs
+        ]
+    return out_imgs
+
+
 def predict(
     img: np.ndarray,
     upsampler: Any,
@@ -136,5 +244,27 @@ def predict(
     np.ndarray
         High resolution image in (h*, w*, c) format.
     """
-    out_img, _ = upsampler.enhance(img)
+    out_img = predict_batch([img], upsampler)[0]
     return out_img
+
+
+def predict_batch(imgs: list[np.ndarray], upsampler: Any) -> list[np.ndarray]:
+    """
+    Enhance batch of low resolution images with the same shape using Real-ESRGAN model,
+    large images are split into overlapping tiles, torch backend runs images or tiles
+    in one forward, other backends process them one by one.
+
+    Parameters
+    ----------
+    imgs : list[np.ndarray]
+        Images in (h, w, c) format.
+    upsampler : Any
+        Real-ESRGAN model.
+
+    Returns
+    -------
+    list[np.ndarray]
+        High resolution images in (h*, w*, c) format.
+    """
+    out_imgs = upsampler.tiler.run(imgs, lambda tiles: _forward_batch(tiles, upsampler))
+    return out_imgs
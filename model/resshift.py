@@ -12,8 +12,12 @@ sys.path.insert(0, str(project_root))
 from submodules.resshift.inference_resshift import get_configs_from_global_config
 from submodules.resshift.sampler import ResShiftSampler
 
+from model.warmup import warmup
 
-def configure(root: PurePath, config: dict[str, Any]) -> Any:
+
+def configure(
+    root: PurePath, config: dict[str, Any], warmup_shapes: list[str] = None
+) -> Any:
     """
     Create ResShift model from configuration dictionary.
 
@@ -23,6 +27,9 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         Path to project root directory.
     config : dict[str, Any]
         Dictionary with configuration parameters.
+    warmup_shapes : list[str]
+        Input resolutions which are run once after loading, e.g. 270p or 256x256,
+        warmup is skipped if None.
 
     Returns
     -------
@@ -43,9 +50,28 @@ def configure(root: PurePath, config: dict[str, Any]) -> Any:
         device=config["device"],
         package_root=config["resshift_location"],
     )
+    if warmup_shapes:
+        warmup(predict_batch, resshift_sampler, warmup_shapes)
     return resshift_sampler
 
 
+def batched(config: dict[str, Any]) -> bool:
+    """
+    Check whether model runs batch of images in one forward.
+
+    Parameters
+    ----------
+    config : dict[str, Any]
+        Dictionary with configuration parameters.
+
+    Returns
+    -------
+    bool
+        Always False, sampler enhances one image per call.
+    """
+    return False
+
+
 def predict(
     img: np.ndarray,
     upsampler: Any,
@@ -68,3 +94,24 @@ def predict(
     out_img = upsampler.inference_single(img)
     out_img = cv2.cvtColor(out_img, cv2.COLOR_RGB2BGR)
     return out_img
+
+
+def predict_batch(imgs: list[np.ndarray], upsampler: Any) -> list[np.ndarray]:
+    """
+    Enhance batch of low resolution images with the same shape using ResShift model,
+    images are processed one by one, because model doesn't support batch inference.
+
+    Parameters
+    ----------
+    imgs : list[np.ndarray]
+        Images in (h, w, c) format.
+    upsampler : Any
+        ResShift model.
+
+    Returns
+    -------
+    list[np.ndarray]
+        High resolution images in (h*, w*, c) format.
+    """
+    out_imgs = [predict(img, upsampler) for img in imgs]
+    return out_imgs
@@ -0,0 +1,369 @@
+import math
+from typing import Any, Callable
+
+import numpy as np
+
+
+def auto_tile_size(memory_mb: float, bytes_per_pixel: int, multiple: int = 8) -> int:
+    """
+    Get the largest square tile side which fits into memory budget.
+
+    Parameters
+    ----------
+    memory_mb : float
+        Memory budget of one forward in megabytes.
+    bytes_per_pixel : int
+        Peak memory of model forward per input pixel in bytes.
+    multiple : int
+        Tile side is rounded down to multiple of this value, e.g. window size
+        of transformer.
+
+    Returns
+    -------
+    int
+        Tile side in input pixels, at least multiple.
+    """
+    side = int(math.sqrt(memory_mb * 2**20 / bytes_per_pixel))
+    return max(multiple, side // multiple * multiple)
+
+
+def tile_starts(size: int, tile: int, overlap: int) -> list[int]:
+    """
+    Get start positions of overlapping tiles along one axis, the last tile is
+    shifted back to the border, so all tiles have the same size.
+
+    Parameters
+    ----------
+    size : int
+        Image size along axis.
+    tile : int
+        Tile size along axis.
+    overlap : int
+        Minimum overlap of neighbouring tiles.
+
+    Returns
+    -------
+    list[int]
+        Start positions.
+    """
+    if size <= tile:
+        return [0]
+    stride = max(1, tile - overlap)
+    starts = list(range(0, size - tile, stride))
+    starts.append(size - tile)
+    return starts
+
+
+def blend_ramp(length: int, before: int, after: int) -> np.ndarray:
+    """
+    Get 1D blending weights of tile, weights rise linearly over overlap with
+    previous tile and fall over overlap with next tile, so neighbouring tiles
+    cross-fade in overlap.
+
+    Parameters
+    ----------
+    length : int
+        Tile size along axis.
+    before : int
+        Overlap with previous tile, 0 at image border.
+    after : int
+        Overlap with next tile, 0 at image border.
+
+    Returns
+    -------
+    np.ndarray
+        Positive weights of shape (length,).
+    """
+    position = np.arange(length, dtype=np.float32) + 0.5
+    ramp = np.ones(length, dtype=np.float32)
+    if before > 0:
+        ramp = np.minimum(ramp, position / before)
+    if after > 0:
+        ramp = np.minimum(ramp, position[::-1] / after)
+    return ramp
+
+
+def axis_weights(
+    starts: list[int], tile: int, out_tile: int, out_size: int
+) -> dict[int, tuple[int, np.ndarray]]:
+    """
+    Get normalized blending weights of tiles along one axis. Weights of tile
+    grid are separable, so weights normalized on each axis sum to 1 in every
+    pixel of output and tiles are accumulated without weight canvas.
+
+    Parameters
+    ----------
+    starts : list[int]
+        Start positions of tiles in input pixels, see tile_starts.
+    tile : int
+        Tile size in input pixels.
+    out_tile : int
+        Tile size in output pixels.
+    out_size : int
+        Output size along axis.
+
+    Returns
+    -------
+    dict[int, tuple[int, np.ndarray]]
+        Output start position and weights for each input start position,
+        weights are cut at output border.
+    """
+    scale = out_tile / tile
+    out_starts = [round(start * scale) for start in starts]
+    # last tile ends at image border, so it is aligned with output border
+    out_starts[-1] = max(0, out_size - out_tile)
+    ramps = []
+    for i, out_start in enumerate(out_starts):
+        before = out_starts[i - 1] + out_tile - out_start if i > 0 else 0
+        after = out_start + out_tile - out_starts[i + 1] if i + 1 < len(starts) else 0
+        # truncated tile can be larger than output of whole image
+        ramps.append(blend_ramp(out_tile, before, after)[: out_size - out_start])
+
+    total = np.zeros(out_size, dtype=np.float32)
+    for out_start, ramp in zip(out_starts, ramps):
+        total[out_start : out_start + len(ramp)] += ramp
+    return {
+        start: (out_start, ramp / total[out_start : out_start + len(ramp)])
+        for start, out_start, ramp in zip(starts, out_starts, ramps)
+    }
+
+
+class Tiler:
+    """
+    Overlapping tile inference for any model backend. Images larger than tile
+    are split into tiles of the same size, tiles are passed through model in
+    batches and upscaled tiles are blended in overlaps. Images which fit into
+    tile are passed through model as is.
+
+    Attributes
+    ----------
+    tile : int
+        Tile side in input pixels, 0 to choose it from memory budget.
+    pad : int
+        Context in input pixels added on each side of tile, neighbouring tiles
+        overlap by 2 * pad.
+    memory_mb : float
+        Memory budget of one forward in megabytes, None disables tiling when
+        tile is 0.
+    bytes_per_pixel : int
+        Peak memory of model forward per input pixel in bytes.
+    multiple : int
+        Automatic tile side is multiple of this value.
+    outscale : float
+        Output scale of model, None to take it from upscaled tiles.
+
+    Methods
+    -------
+    tile_size()
+        Get tile side.
+    batch_size(tile_h, tile_w)
+        Get number of tiles in one forward.
+    run(imgs, forward)
+        Enhance images tile by tile.
+    """
+
+    def __init__(
+        self,
+        tile: int = 0,
+        pad: int = 16,
+        memory_mb: float = None,
+        bytes_per_pixel: int = 16 * 1024,
+        multiple: int = 8,
+        outscale: float = None,
+    ) -> None:
+        """
+        Constructor of Tiler class.
+
+        Parameters
+        ----------
+        tile : int
+            Tile side in input pixels, 0 to choose it from memory budget.
+        pad : int
+            Context in input pixels added on each side of tile.
+        memory_mb : float
+            Memory budget of one forward in megabytes, None disables tiling when
+            tile is 0.
+        bytes_per_pixel : int
+            Peak memory of model forward per input pixel in bytes.
+        multiple : int
+            Automatic tile side is multiple of this value.
+        outscale : float
+            Output scale of model, None to take it from upscaled tiles.
+
+        Returns
+        -------
+        None
+        """
+        if tile < 0 or pad < 0:
+            raise ValueError(f"Tile {tile} and tile pad {pad} must be non-negative")
+        self.tile = tile
+        self.pad = pad
+        self.memory_mb = memory_mb
+        self.bytes_per_pixel = bytes_per_pixel
+        self.multiple = multiple
+        self.outscale = outscale
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict[str, Any],
+        bytes_per_pixel: int,
+        multiple: int = 8,
+        outscale: float = None,
+    ) -> "Tiler":
+        """
+        Create Tiler from tile, tile_pad and tile_memory_mb of model config,
+        missing keys keep whole-image inference.
+
+        Parameters
+        ----------
+        config : dict[str, Any]
+            Model configuration dictionary.
+        bytes_per_pixel : int
+            Peak memory of model forward per input pixel in bytes.
+        multiple : int
+            Automatic tile side is multiple of this value.
+        outscale : float
+            Output scale of model, None to take it from upscaled tiles.
+
+        Returns
+        -------
+        Tiler
+            Tiler instance.
+        """
+        return cls(
+            tile=config.get("tile") or 0,
+            pad=config.get("tile_pad", 16),
+            memory_mb=config.get("tile_memory_mb"),
+            bytes_per_pixel=bytes_per_pixel,
+            multiple=multiple,
+            outscale=outscale,
+        )
+
+    def tile_size(self) -> int:
+        """
+        Get tile side.
+
+        Returns
+        -------
+        int
+            Tile side in input pixels including context, None if tiling is disabled.
+        """
+        if self.tile:
+            return self.tile + 2 * self.pad
+        if self.memory_mb is None:
+            return None
+        side = auto_tile_size(self.memory_mb, self.bytes_per_pixel, self.multiple)
+        # tiles overlap by 2 * pad, so smaller tile would advance by 1 pixel
+        min_side = (2 * self.pad // self.multiple + 1) * self.multiple
+        return max(side, min_side)
+
+    def batch_size(self, tile_h: int, tile_w: int) -> int:
+        """
+        Get number of tiles in one forward which fit into memory budget.
+
+        Parameters
+        ----------
+        tile_h : int
+            Tile height.
+        tile_w : int
+            Tile width.
+
+        Returns
+        -------
+        int
+            Batch size, at least 1.
+        """
+        if self.memory_mb is None:
+            return 1
+        tile_bytes = tile_h * tile_w * self.bytes_per_pixel
+        return max(1, int(self.memory_mb * 2**20 // tile_bytes))
+
+    def run(
+        self,
+        imgs: list[np.ndarray],
+        forward: Callable[[list[np.ndarray]], list[np.ndarray]],
+    ) -> list[np.ndarray]:
+        """
+        Enhance images tile by tile.
+
+        Parameters
+        ----------
+        imgs : list[np.ndarray]
+            Images in (h, w, c) format.
+        forward : Callable[[list[np.ndarray]], list[np.ndarray]]
+            Function which enhances batch of images with the same shape.
+
+        Returns
+        -------
+        list[np.ndarray]
+            High resolution images in (h*, w*, c) format.
+        """
+        tile = self.tile_size()
+        if tile is None or all(
+            img.shape[0] <= tile and img.shape[1] <= tile for img in imgs
+        ):
+            return forward(imgs)
+        return [self._run_one(img, tile, forward) for img in imgs]
+
+    def _run_one(
+        self,
+        img: np.ndarray,
+        tile: int,
+        forward: Callable[[list[np.ndarray]], list[np.ndarray]],
+    ) -> np.ndarray:
+        """
+        Enhance one image tile by tile and blend tiles in overlaps.
+
+        Parameters
+        ----------
+        img : np.ndarray
+            Image in (h, w, c) format.
+        tile : int
+            Tile side in input pixels.
+        forward : Callable[[list[np.ndarray]], list[np.ndarray]]
+            Function which enhances batch of images with the same shape.
+
+        Returns
+        -------
+        np.ndarray
+            High resolution image in (h*, w*, c) format.
+        """
+        h, w = img.shape[:2]
+        tile_h, tile_w = min(tile, h), min(tile, w)
+        ys = tile_starts(h, tile_h, 2 * self.pad)
+        xs = tile_starts(w, tile_w, 2 * self.pad)
+        boxes = [(y, x) for y in ys for x in xs]
+        batch_size = self.batch_size(tile_h, tile_w)
+
+        out, weights_y, weights_x = None, None, None
+        for i in range(0, len(boxes), batch_size):
+            batch = boxes[i : i + batch_size]
+            out_tiles = forward([img[y : y + tile_h, x : x + tile_w] for y, x in batch])
+            for (y, x), out_tile in zip(batch, out_tiles):
+                if out is None:
+                    # output size follows whole-image resize of backend,
+                    # tile ratio is used only if outscale is unknown
+                    if self.outscale is None:
+                        scale = out_tile.shape[0] / tile_h
+                        out_h, out_w = round(h * scale), round(w * scale)
+                    else:
+                        out_h, out_w = int(h * self.outscale), int(w * self.outscale)
+                    out = np.zeros((out_h, out_w, out_tile.shape[2]), np.float32)
+                    weights_y = axis_weights(ys, tile_h, out_tile.shape[0], out_h)
+                    weights_x = axis_weights(xs, tile_w, out_tile.shape[1], out_w)
+                    dtype = out_tile.dtype
+
+                out_y, ramp_y = weights_y[y]
+                out_x, ramp_x = weights_x[x]
+                region_h, region_w = len(ramp_y), len(ramp_x)
+                weighted = out_tile[:region_h, :region_w].astype(np.float32)
+                weighted *= ramp_y[:, None, None]
+                weighted *= ramp_x[None, :, None]
+                out[out_y : out_y + region_h, out_x : out_x + region_w] += weighted
+
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            np.round(out, out=out)
+            np.clip(out, info.min, info.max, out=out)
+        return out.astype(dtype)
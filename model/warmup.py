@@ -0,0 +1,77 @@
+import logging
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {
+    "270p": (270, 480),
+    "360p": (360, 640),
+    "540p": (540, 960),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+}
+
+
+def parse_shape(spec: str) -> tuple[int, int]:
+    """
+    Parse warmup input resolution.
+
+    Parameters
+    ----------
+    spec : str
+        Resolution name from RESOLUTIONS, e.g. 540p, or size in HxW format,
+        e.g. 256x256.
+
+    Returns
+    -------
+    tuple[int, int]
+        (height, width).
+    """
+    if spec in RESOLUTIONS:
+        return RESOLUTIONS[spec]
+    try:
+        h, w = map(int, spec.lower().split("x"))
+    except ValueError:
+        raise ValueError(
+            f"warmup resolution '{spec}' should be one of "
+            f"{', '.join(RESOLUTIONS)} or in HxW format."
+        )
+    return h, w
+
+
+def warmup(
+    predict_batch: Callable[[list[np.ndarray], Any], list[np.ndarray]],
+    upsampler: Any,
+    shapes: list[str],
+) -> dict[str, float]:
+    """
+    Run inference once for each input resolution, so memory pools, graph
+    optimizations and convolution algorithm caches are ready before the first
+    request.
+
+    Parameters
+    ----------
+    predict_batch : Callable[[list[np.ndarray], Any], list[np.ndarray]]
+        predict_batch function of model module.
+    upsampler : Any
+        Configured model.
+    shapes : list[str]
+        Input resolutions, see parse_shape.
+
+    Returns
+    -------
+    dict[str, float]
+        Warmup time in seconds for each resolution.
+    """
+    # all resolutions are checked before slow inference runs
+    sizes = [parse_shape(spec) for spec in shapes]
+    timings = {}
+    for spec, (h, w) in zip(shapes, sizes):
+        start = time.perf_counter()
+        predict_batch([np.zeros((h, w, 3), dtype=np.uint8)], upsampler)
+        timings[spec] = time.perf_counter() - start
+        logger.info(f"warmup {spec} ({h}x{w}) time = {timings[spec]:.3f}")
+    return timings
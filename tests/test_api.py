@@ -1,9 +1,15 @@
 import io
 import shutil
+import socket
+import subprocess
 import sys
+import time
 import unittest
+import zipfile
 from pathlib import Path
 
+import numpy as np
+import requests
 from fastapi.testclient import TestClient
 from PIL import Image
 
@@ -18,8 +24,48 @@ class APITestCase(unittest.TestCase):
         path_to_extra = Path(__file__).parents[1] / f"api/{folder_name}"
         folder = f"./{folder_name}"
         shutil.copytree(path_to_extra, folder)
-        cls.api_client = TestClient(app)
+        # entering client runs startup, which loads model in background
+        cls.api_client = TestClient(app).__enter__()
         cls.folder = folder
+        while cls.api_client.get("/health/ready").json()["state"] == "loading":
+            time.sleep(0.1)
+
+    def test_health(self):
+        assert self.api_client.get("/health/live").status_code == 200
+        response = self.api_client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"]
+
+    def test_startup_time(self):
+        # server should accept connections and report liveness before model is loaded
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port)],
+            cwd=Path(__file__).parents[1],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            start = time.perf_counter()
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    assert server.poll() is None, "server exited"
+                    assert time.perf_counter() - start < 60
+                    time.sleep(0.05)
+
+            url = f"http://127.0.0.1:{port}"
+            assert requests.get(f"{url}/health/live").status_code == 200
+            ready = requests.get(f"{url}/health/ready")
+            assert ready.status_code == 503 and ready.json()["state"] == "loading"
+            assert "Retry-After" in ready.headers
+        finally:
+            server.terminate()
+            server.wait()
 
     def test_get_info(self):
         response = self.api_client.get("/info")
@@ -35,6 +81,25 @@ class APITestCase(unittest.TestCase):
         assert response_correct.status_code == 200
         assert response_incorrect.status_code == 400
 
+    def test_configure_model_file_invalid(self):
+        # invalid config is rejected before background switch is started
+        for content in [b"model: unknown\nbackend: torch\n", b"model: real_esrgan\n"]:
+            response = self.api_client.post(
+                "/configure_model/file",
+                files={"config_file": ("config.yaml", content, "application/x-yaml")},
+            )
+            assert response.status_code == 400
+
+    def test_configure_model_status(self):
+        response = self.api_client.post(
+            "/configure_model/name",
+            params={"config_name": "pretrained/RealESRGAN_x4plus", "wait": True},
+        )
+        status = self.api_client.get("/configure_model/status").json()
+        assert response.status_code == 200
+        assert status["state"] == "ready"
+        assert status["active"] == "pretrained/RealESRGAN_x4plus"
+
     def test_upscale_example(self):
         response = self.api_client.post("/upscale/example")
         upscaled_bytes = io.BytesIO(response.content)
@@ -42,6 +107,59 @@ class APITestCase(unittest.TestCase):
         assert response.status_code == 200
         assert upscaled_image.size == (2560, 1440)
 
+    def test_metrics(self):
+        self.api_client.post("/upscale/example")
+        response = self.api_client.get("/metrics")
+        assert response.status_code == 200
+        assert 'srgb_requests_total{endpoint="/upscale/example"' in response.text
+        assert 'stage="inference",model="pretrained/RealESRGAN_x4plus"' in response.text
+
+    def test_upscale_batch(self):
+        def png(value):
+            image = Image.fromarray(np.full((16, 16, 3), value, dtype=np.uint8))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            return buffer.getvalue()
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zip_file:
+            zip_file.writestr("zipped/c.png", png(30))
+            zip_file.writestr("zipped/d.png", png(40))
+        response = self.api_client.post(
+            "/upscale/batch",
+            files=[
+                ("files", ("a.png", png(10), "image/png")),
+                ("files", ("b.png", png(20), "image/png")),
+                ("files", ("images.zip", archive.getvalue(), "application/zip")),
+            ],
+        )
+        assert response.status_code == 200
+
+        # uploads are read while archive is streamed, after endpoint returned
+        with zipfile.ZipFile(io.BytesIO(response.content)) as result:
+            names = sorted(result.namelist())
+            assert names == ["a.png", "b.png", "zipped/c.png", "zipped/d.png"]
+            for name in names:
+                upscaled_image = Image.open(io.BytesIO(result.read(name)))
+                assert upscaled_image.size == (64, 64)
+
+    def test_upscale_batch_zip_limit(self):
+        # highly compressible entry is rejected by its inflated size
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("large.png", b"\0" * (65 * 2**20))
+        response = self.api_client.post(
+            "/upscale/batch",
+            files=[("files", ("images.zip", archive.getvalue(), "application/zip"))],
+        )
+        assert response.status_code == 413
+
+    def test_estimate(self):
+        response = self.api_client.get("/estimate", params={"height": 8, "width": 8})
+        assert response.status_code == 200
+        assert response.json()["admitted"]
+
     @classmethod
     def tearDownClass(cls):
+        cls.api_client.__exit__(None, None, None)
         shutil.rmtree(cls.folder)
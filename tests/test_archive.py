@@ -0,0 +1,26 @@
+import io
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.archive import ZipStream
+
+
+class ZipStreamTestCase(unittest.TestCase):
+    def test_stream(self):
+        archive = ZipStream()
+        entries = {"a.png": b"a" * 100, "dir/b.png": b"b" * 10, "c.npy": b""}
+        chunks = [archive.add(name, data) for name, data in entries.items()]
+        # each entry is available before archive is finished
+        assert all(chunk for chunk in chunks)
+        chunks += [archive.add("a.png", b"duplicate")]
+        chunks += [archive.close()]
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as f:
+            assert f.namelist() == list(entries) + ["a_1.png"]
+            for name, data in entries.items():
+                assert f.read(name) == data
+            assert f.read("a_1.png") == b"duplicate"
+            assert f.testzip() is None
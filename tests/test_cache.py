@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.cache import ResultCache, cache_key
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def test_cache_key(self):
+        assert cache_key(b"img", "model", "png") == cache_key(b"img", "model", "png")
+        assert cache_key(b"img", "model", "png") != cache_key(b"img", "model", "npy")
+        assert cache_key(b"img", "model", "png") != cache_key(b"img2", "model", "png")
+
+    def test_disk_spill(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = ResultCache(memory_budget=10, disk_path=folder, disk_budget=20)
+            cache.put("a", b"a" * 8)
+            cache.put("b", b"b" * 8)
+            assert cache.get("a") == (b"a" * 8, "disk")
+            assert cache.get("b") == (b"b" * 8, "memory")
+
+            cache.put("c", b"c" * 8)
+            cache.put("d", b"d" * 8)
+            # disk tier keeps only two entries, least recently used is removed
+            assert cache.get("a") == (None, None)
+            assert sorted(os.listdir(folder)) == ["b", "c"]
+
+            reopened = ResultCache(memory_budget=10, disk_path=folder, disk_budget=20)
+            assert reopened.get("c") == (b"c" * 8, "disk")
+
+    def test_coalescing(self):
+        cache = ResultCache(memory_budget=1 << 20)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b"result"
+
+        async def run():
+            results = await asyncio.gather(
+                *[cache.get_or_compute("key", compute) for _ in range(4)]
+            )
+            results += [await cache.get_or_compute("key", compute)]
+            return results
+
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert [source for _, source in results] == ["miss"] + ["coalesced"] * 3 + [
+            "memory"
+        ]
+        stats = cache.stats()
+        assert stats["hit_ratio"] == 0.8 and stats["bytes_saved"] == 4 * len(b"result")
+
+    def test_failed_compute(self):
+        cache = ResultCache(memory_budget=1 << 20)
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("broken model")
+
+        async def run():
+            return await asyncio.gather(
+                *[cache.get_or_compute("key", compute) for _ in range(2)],
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.get("key") == (None, None)
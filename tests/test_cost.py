@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.cost import CostModel
+
+
+class CostModelTestCase(unittest.TestCase):
+    def test_estimate(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "cost_model.json")
+            costs = CostModel(path)
+            assert costs.estimate("pretrained/EMT_x4", "torch", 1.0) is None
+
+            costs.update("pretrained/EMT_x4", "torch", 2.0)
+            costs.update("pretrained/EMT_x4", "onnx", 0.5)
+            costs.save()
+
+            reloaded = CostModel(path)
+            assert reloaded.estimate("pretrained/EMT_x4", "torch", 0.5) == 1.0
+            assert reloaded.estimate("pretrained/EMT_x4", "onnx", 2.0) == 1.0
+            assert reloaded.estimate("pretrained/EMT_x4", "triton", 1.0) is None
@@ -0,0 +1,46 @@
+import io
+import sys
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.encoding import encode_image, negotiate_format
+
+
+class EncodingTestCase(unittest.TestCase):
+    def test_negotiate_format(self):
+        assert negotiate_format() == "png"
+        assert negotiate_format("*/*") == "png"
+        assert negotiate_format("image/webp, image/png;q=0.5") == "webp"
+        assert negotiate_format("image/png;q=0.5, image/jpeg") == "jpeg"
+        assert negotiate_format("text/html, application/x-npy;q=0.1") == "npy"
+        assert negotiate_format("image/webp", fmt="JPG") == "jpeg"
+        with self.assertRaises(ValueError):
+            negotiate_format("text/html")
+        with self.assertRaises(ValueError):
+            negotiate_format(fmt="gif")
+
+    def test_lossless_formats(self):
+        img = np.random.randint(0, 256, (16, 24, 3), dtype=np.uint8)
+        for fmt, kwargs in [
+            ("png", {}),
+            ("png", {"compression": 0}),
+            ("webp", {}),
+        ]:
+            enc_img = np.frombuffer(encode_image(img, fmt, **kwargs), np.uint8)
+            assert np.array_equal(cv2.imdecode(enc_img, cv2.IMREAD_COLOR), img)
+
+        npy = np.load(io.BytesIO(encode_image(img, "npy")))
+        assert npy.dtype == np.uint8 and np.array_equal(npy, img)
+
+    def test_lossy_formats(self):
+        img = np.full((16, 16, 3), 128, dtype=np.uint8)
+        for fmt in ["jpeg", "webp"]:
+            enc_img = np.frombuffer(encode_image(img, fmt, quality=90), np.uint8)
+            dec_img = cv2.imdecode(enc_img, cv2.IMREAD_COLOR)
+            assert dec_img.shape == img.shape
+        with self.assertRaises(ValueError):
+            encode_image(img, "jpeg", quality=101)
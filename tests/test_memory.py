@@ -0,0 +1,19 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.memory import MemoryTrace
+
+
+class MemoryTraceTestCase(unittest.TestCase):
+    def test_peak(self):
+        trace = MemoryTrace()
+        trace.hold("raw", 10)
+        trace.hold("img", 30)
+        trace.release("raw")
+        trace.hold("out_img", 100)
+        trace.release("img")
+        trace.hold("bytes_img", 20)
+        assert trace.peak == 130
+        assert "peak buffers" in trace.summary()
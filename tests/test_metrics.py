@@ -0,0 +1,43 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.metrics import Counter, Gauge, Histogram, Registry, resolution_bucket
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_resolution_bucket(self):
+        assert resolution_bucket(270, 480) == "270p"
+        assert resolution_bucket(1080, 1920) == "1080p"
+        assert resolution_bucket(1920, 1080) == "1080p"
+        assert resolution_bucket(500, 500) == "540p"
+        assert resolution_bucket(4000, 4000) == ">2160p"
+
+    def test_histogram(self):
+        histogram = Histogram("latency", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="decode")
+        histogram.observe(0.5, stage="decode")
+        histogram.observe(5.0, stage="decode")
+        assert histogram.render() == [
+            'latency_bucket{stage="decode",le="0.1"} 1',
+            'latency_bucket{stage="decode",le="1.0"} 2',
+            'latency_bucket{stage="decode",le="+Inf"} 3',
+            'latency_sum{stage="decode"} 5.55',
+            'latency_count{stage="decode"} 3',
+        ]
+
+    def test_registry(self):
+        registry = Registry()
+        counter = registry.register(Counter("requests_total", "Requests.", ("path",)))
+        registry.register(Gauge("depth", "Depth.", lambda: {(): 3}))
+        counter.inc(path='/a"b')
+        counter.inc(path='/a"b')
+        assert registry.render() == (
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{path="/a\\"b"} 2.0\n'
+            "# HELP depth Depth.\n"
+            "# TYPE depth gauge\n"
+            "depth 3\n"
+        )
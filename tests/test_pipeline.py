@@ -0,0 +1,36 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "kaggle"))
+from pipeline import pipeline
+from rle import encode
+
+
+def slow_read(i: int) -> np.ndarray:
+    time.sleep(0.01 * (i % 3))
+    return np.full((4, 4, 3), i, dtype=np.uint8)
+
+
+class PipelineTestCase(unittest.TestCase):
+    def test_pipeline_order(self):
+        items = list(range(20))
+        expected = [(i, encode(slow_read(i) * 2)) for i in items]
+        for read_workers, encode_workers in [(0, 0), (3, 0), (0, 2), (3, 2)]:
+            results = pipeline(
+                items,
+                slow_read,
+                lambda img: img * 2,
+                encode=encode,
+                read_workers=read_workers,
+                encode_workers=encode_workers,
+                queue_size=4,
+            )
+            assert list(results) == expected
+
+    def test_pipeline_without_encode(self):
+        results = list(pipeline(range(5), slow_read, lambda img: img.sum(), None, 2))
+        assert results == [(i, 48 * i) for i in range(5)]
@@ -0,0 +1,60 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.pool import ModelPool
+
+
+class ModelPoolTestCase(unittest.TestCase):
+    def test_lru_eviction(self):
+        evicted = []
+        pool = ModelPool(
+            budget=250,
+            estimate=lambda value: 100,
+            on_evict=lambda key, value: evicted.append(key),
+            measure=False,
+        )
+        pool.get("a", lambda: "model a")
+        pool.get("b", lambda: "model b")
+        assert pool.get("a", lambda: "reloaded a") == "model a"
+        pool.get("c", lambda: "model c")
+
+        assert evicted == ["b"] and pool.keys() == ["a", "c"]
+        stats = pool.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 3
+        assert stats["evictions"] == 1
+        assert stats["resident_bytes"] == sum(stats["models"].values())
+
+    def test_keeps_last_model(self):
+        pool = ModelPool(budget=0, estimate=lambda value: 100, measure=False)
+        pool.get("a", lambda: "model a")
+        pool.get("b", lambda: "model b")
+        assert pool.keys() == ["b"]
+
+    def test_pinned(self):
+        evicted = []
+        pool = ModelPool(
+            budget=100,
+            estimate=lambda value: 100,
+            on_evict=lambda key, value: evicted.append(key),
+            measure=False,
+        )
+        pool.get("a", lambda: "model a")
+        pool.pin("a")
+        pool.get("b", lambda: "model b")
+        assert pool.keys() == ["a", "b"] and evicted == []
+
+        pool.get("a", lambda: "reloaded a")
+        pool.unpin("a")
+        assert pool.keys() == ["a"] and evicted == ["b"]
+
+    def test_failed_load(self):
+        pool = ModelPool(budget=100)
+
+        def load():
+            raise ValueError("broken config")
+
+        with self.assertRaises(ValueError):
+            pool.get("a", load)
+        assert "a" not in pool and len(pool) == 0
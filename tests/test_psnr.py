@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "kaggle"))
+from psnr import MAXI, image_psnr, score, score_files
+from rle import encode, encode_folder
+
+
+class PSNRTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        folder = "./images_to_score"
+        images_folder = os.path.join(folder, "images")
+        os.makedirs(images_folder)
+        for i in range(6):
+            img = (np.random.random((16, 16, 3)) * 255).astype(np.uint8)
+            cv2.imwrite(os.path.join(images_folder, f"{i}.png"), img)
+
+        solution_path = os.path.join(folder, "solution.csv")
+        np.random.seed(42)
+        encode_folder(images_folder, solution_path, public_size=0.5)
+
+        solution = pd.read_csv(solution_path)
+        submission = solution[["id", "filename", "rle"]].iloc[::-1].copy()
+        submission["rle"] = [
+            encode(cv2.imread(os.path.join(images_folder, f)) // 2)
+            for f in submission["filename"]
+        ]
+        submission_path = os.path.join(folder, "submission.csv")
+        submission.to_csv(submission_path, index=False)
+
+        cls.folder = folder
+        cls.solution_path = solution_path
+        cls.submission_path = submission_path
+
+    def test_image_psnr_no_wraparound(self):
+        real = np.zeros((4, 4, 3), dtype=np.uint8)
+        pred = np.full((4, 4, 3), 10, dtype=np.uint8)
+        psnr = image_psnr(encode(real), str(encode(pred)))
+        assert abs(psnr - (MAXI - 10 * np.log10(100 + 1e-6))) <= 1e-6
+        assert image_psnr(encode(real), encode(real)) == 100
+
+    def test_score_files(self):
+        expected = score(
+            pd.read_csv(self.solution_path),
+            pd.read_csv(self.submission_path),
+            "id",
+            "filename",
+            "rle",
+        )
+        for chunk_size, workers in [(1, 1), (4, 1), (2, 2)]:
+            psnr, per_image = score_files(
+                self.solution_path,
+                self.submission_path,
+                chunk_size=chunk_size,
+                workers=workers,
+            )
+            assert abs(psnr["Total"] - expected) <= 1e-6
+            assert set(psnr.keys()) == {"Public", "Private", "Total"}
+            assert per_image.shape[0] == 6
+            public = per_image[per_image["Usage"] == "Public"]["psnr"].mean()
+            assert abs(psnr["Public"] - public) <= 1e-6
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+import model as model_registry
+
+
+class ModelRegistryTestCase(unittest.TestCase):
+    def test_lazy_import(self):
+        # fresh interpreter, so modules imported by other tests don't interfere
+        code = (
+            "import sys; import model; "
+            "print(any(name in sys.modules for name in "
+            "['model.emt_model', 'model.real_esrgan', 'model.resshift']))"
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", code], cwd=Path(__file__).parents[1]
+        )
+        assert output.decode().strip() == "False"
+        assert model_registry.available() == ["emt_model", "real_esrgan", "resshift"]
+
+    def test_register(self):
+        model_registry.register("plugin_model", "colorsys")
+        try:
+            assert getattr(model_registry, "plugin_model").__name__ == "colorsys"
+            assert "plugin_model" in dir(model_registry)
+        finally:
+            model_registry._modules.pop("plugin_model")
+            vars(model_registry).pop("plugin_model", None)
+
+    def test_unknown_model(self):
+        with self.assertRaises(AttributeError):
+            getattr(model_registry, "unknown_model")
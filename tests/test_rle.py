@@ -1,7 +1,10 @@
+import base64
 import os
 import shutil
 import sys
+import tempfile
 import unittest
+import zlib
 from pathlib import Path
 
 import cv2
@@ -9,7 +12,14 @@ import numpy as np
 import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parents[1]))
-from kaggle.rle import decode, encode, encode_folder
+from kaggle.rle import (
+    decode,
+    decode_into,
+    encode,
+    encode_folder,
+    iter_decode,
+    iter_encode,
+)
 
 
 class RLETestCase(unittest.TestCase):
@@ -30,6 +40,35 @@ class RLETestCase(unittest.TestCase):
         assert isinstance(decoded_img, np.ndarray)
         assert np.allclose(self.img, decoded_img.reshape(*self.img.shape))
 
+    def test_encode_long_runs(self):
+        flat = np.array([7] * 255 + [0] * 900 + [7] * 510 + [1], dtype=np.uint8)
+        img = flat.reshape(1, -1, 2)
+        rle = [7, 255, 0, 255, 0, 255, 0, 255, 0, 135, 7, 255, 7, 255, 1, 1]
+        expected = base64.b64encode(zlib.compress(bytes(rle), zlib.Z_BEST_COMPRESSION))
+        assert encode(img) == expected
+        assert np.array_equal(decode(expected), flat)
+
+    def test_decode_shape(self):
+        encoded_img = encode(self.img)
+        decoded_img = decode(encoded_img, self.img.shape)
+        assert decoded_img.shape == self.img.shape
+        assert np.array_equal(self.img, decoded_img)
+        with self.assertRaises(ValueError):
+            decode(encoded_img, (32, 32, 4))
+
+    def test_iter_encode_decode(self):
+        img = np.repeat(self.img, 20, axis=1)
+        img[5:20] = 0
+        encoded_img = encode(img)
+        for chunk_size in [64, 4096, 1 << 20]:
+            assert b"".join(iter_encode(img, chunk_size)) == encoded_img
+            parts = list(iter_decode(encoded_img, chunk_size))
+            assert np.array_equal(np.concatenate(parts), img.ravel())
+            out = decode_into(encoded_img, np.empty_like(img), chunk_size)
+            assert np.array_equal(out, img)
+        with self.assertRaises(ValueError):
+            decode_into(encoded_img, np.empty((32, 640, 4), dtype=np.uint8))
+
     def test_encode_folder(self):
         f = os.path.join(self.folder, "solution.csv")
         encode_folder(self.folder, f)
@@ -39,6 +78,22 @@ class RLETestCase(unittest.TestCase):
         assert isinstance(decoded_img, np.ndarray)
         assert np.allclose(self.img, decoded_img.reshape(*self.img.shape))
 
+    def test_encode_folder_workers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            images_folder = os.path.join(tmp_dir, "images")
+            os.makedirs(images_folder)
+            for i in range(4):
+                cv2.imwrite(os.path.join(images_folder, f"{i}.png"), self.img + i)
+            f1 = os.path.join(tmp_dir, "solution_single.csv")
+            f2 = os.path.join(tmp_dir, "solution_workers.csv")
+            np.random.seed(42)
+            encode_folder(images_folder, f1)
+            np.random.seed(42)
+            encode_folder(images_folder, f2, workers=2)
+            df1, df2 = pd.read_csv(f1), pd.read_csv(f2)
+            assert df1.equals(df2)
+            assert (df1["Usage"] == "Public").sum() == 1
+
     @classmethod
     def tearDownClass(cls):
         shutil.rmtree(cls.folder)
@@ -0,0 +1,139 @@
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.scheduler import (
+    InferenceScheduler,
+    LatencyBudgetError,
+    QueueFullError,
+    SchedulerClosedError,
+)
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def test_batching_by_shape(self):
+        batches = []
+
+        def predict_batch(imgs):
+            assert len({img.shape for img in imgs}) == 1
+            batches.append(len(imgs))
+            return [img * 2 for img in imgs]
+
+        scheduler = InferenceScheduler(
+            predict_batch, max_batch_size=4, batch_window=0.2
+        )
+        imgs = [np.full((2 + i % 2, 2, 3), i, dtype=np.uint8) for i in range(8)]
+        with ThreadPoolExecutor(8) as executor:
+            futures = list(executor.map(scheduler.submit, imgs))
+        for img, future in zip(imgs, futures):
+            assert np.array_equal(future.result(timeout=5), img * 2)
+            assert future.wait_time >= 0 and future.batch_size >= 1
+        scheduler.close()
+
+        stats = scheduler.stats()
+        assert stats["total_requests"] == 8 and stats["queue_depth"] == 0
+        assert sum(k * v for k, v in stats["batch_sizes"].items()) == 8
+        assert max(batches) > 1
+
+    def test_exception(self):
+        def predict_batch(imgs):
+            raise ValueError("broken model")
+
+        scheduler = InferenceScheduler(predict_batch, batch_window=0.0)
+        future = scheduler.submit(np.zeros((2, 2, 3), dtype=np.uint8))
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        scheduler.close()
+
+    def test_backpressure(self):
+        release = threading.Event()
+
+        def predict_batch(imgs):
+            release.wait(timeout=5)
+            return imgs
+
+        scheduler = InferenceScheduler(
+            predict_batch, max_batch_size=1, batch_window=0.0, max_queue_size=2
+        )
+        img = np.zeros((2, 2, 3), dtype=np.uint8)
+        futures = [scheduler.submit(img)]
+        # wait until worker takes the first request from the queue
+        while scheduler.stats()["queue_depth"] > 0:
+            pass
+        futures += [scheduler.submit(img), scheduler.submit(img)]
+        with self.assertRaises(QueueFullError) as ctx:
+            scheduler.submit(img)
+        assert ctx.exception.retry_after >= 1
+        assert scheduler.stats()["rejected_requests"] == 1
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        scheduler.close()
+        with self.assertRaises(SchedulerClosedError):
+            scheduler.submit(img)
+
+    def test_admission(self):
+        release = threading.Event()
+
+        def predict_batch(imgs):
+            release.wait(timeout=5)
+            return imgs
+
+        # cost is 1 second per 100 pixels, latency SLO is 3 seconds
+        scheduler = InferenceScheduler(
+            predict_batch,
+            max_batch_size=1,
+            batch_window=0.0,
+            cost=lambda img: img.shape[0] * img.shape[1] / 100,
+            slo=3.0,
+        )
+        img = np.zeros((10, 10, 3), dtype=np.uint8)
+        futures = [scheduler.submit(img), scheduler.submit(img)]
+        assert [future.estimated_time for future in futures] == [1.0, 2.0]
+        assert scheduler.estimate(1.0) == 3.0
+
+        futures += [scheduler.submit(img)]
+        with self.assertRaises(QueueFullError) as ctx:
+            scheduler.submit(img)
+        assert ctx.exception.retry_after == 1
+        with self.assertRaises(LatencyBudgetError):
+            scheduler.submit(np.zeros((20, 20, 3), dtype=np.uint8))
+        assert scheduler.stats()["rejected_requests"] == 2
+
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        assert scheduler.stats()["backlog_seconds"] == 0.0
+        scheduler.close()
+
+    def test_cancel(self):
+        release = threading.Event()
+        batches = []
+
+        def predict_batch(imgs):
+            release.wait(timeout=5)
+            batches.append(len(imgs))
+            return imgs
+
+        scheduler = InferenceScheduler(
+            predict_batch, max_batch_size=1, batch_window=0.0
+        )
+        img = np.zeros((2, 2, 3), dtype=np.uint8)
+        running = scheduler.submit(img)
+        while scheduler.stats()["queue_depth"] > 0:
+            pass
+        cancelled = scheduler.submit(img)
+        assert cancelled.cancel() and not running.cancel()
+
+        release.set()
+        running.result(timeout=5)
+        # worker skips cancelled request and keeps serving
+        assert scheduler.submit(img).result(timeout=5) is not None
+        scheduler.close()
+        assert batches == [1, 1]
@@ -0,0 +1,103 @@
+import os
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "kaggle"))
+import store as store_module
+from psnr import score_files
+from rle import decode, encode
+from store import FrameStore, FrameStoreWriter, export_csv, open_store
+
+
+class StoreTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        folder = "./frame_store"
+        os.makedirs(folder)
+        cls.imgs = {
+            f"{i}.png": (np.random.random((8 + i, 12, 3)) * 255).astype(np.uint8)
+            for i in range(4)
+        }
+        cls.sample_submission = os.path.join(folder, "sample_submission.csv")
+        pd.DataFrame(
+            {"id": range(4), "filename": list(cls.imgs.keys()), "rle": [""] * 4}
+        ).to_csv(cls.sample_submission, index=False)
+        cls.folder = folder
+
+    def test_write_read_resume(self):
+        path = os.path.join(self.folder, "store_resume")
+        with FrameStoreWriter(path) as store:
+            store.add("0.png", self.imgs["0.png"])
+            store.add("1.png", self.imgs["1.png"])
+
+        # simulate crash in the middle of writing of the next frame
+        with open(os.path.join(path, "data.bin"), "ab") as f:
+            f.write(b"\x01" * 10)
+        with open(os.path.join(path, "index.csv"), "a") as f:
+            f.write("2.png,9999")
+
+        with FrameStoreWriter(path) as store:
+            assert "1.png" in store and "2.png" not in store
+            store.add("2.png", self.imgs["2.png"])
+
+        store = FrameStore(path)
+        assert store.filenames() == ["0.png", "1.png", "2.png"]
+        for filename in store.filenames():
+            assert np.array_equal(store[filename], self.imgs[filename])
+
+    def test_interrupted_index_rewrite(self):
+        path = os.path.join(self.folder, "store_rewrite")
+        with FrameStoreWriter(path) as store:
+            store.add("0.png", self.imgs["0.png"])
+
+        # crash while index is rewritten leaves only temporary file
+        with open(os.path.join(path, "index.csv.tmp"), "w") as f:
+            f.write("")
+        with FrameStoreWriter(path) as store:
+            assert "0.png" in store
+        assert FrameStore(path).filenames() == ["0.png"]
+
+    def test_open_store(self):
+        path = os.path.join(self.folder, "store_cache")
+        with FrameStoreWriter(path) as store:
+            store.add("0.png", self.imgs["0.png"])
+        first = open_store(path)
+        assert open_store(path) is first
+
+        with FrameStoreWriter(path) as store:
+            store.add("1.png", self.imgs["1.png"])
+        # index file may keep mtime on coarse clocks
+        os.utime(os.path.join(path, "index.csv"), ns=(0, 0))
+        second = open_store(path)
+        assert second is not first and "1.png" in second
+        assert sum(key == path for key in store_module._stores) == 1
+
+    def test_export_and_score(self):
+        path = os.path.join(self.folder, "store_export")
+        with FrameStoreWriter(path) as store:
+            for filename, img in self.imgs.items():
+                store.add(filename, img)
+
+        submission_path = os.path.join(self.folder, "submission.csv")
+        export_csv(path, self.sample_submission, submission_path)
+        df = pd.read_csv(submission_path)
+        for filename, rle in zip(df["filename"], df["rle"]):
+            assert rle == str(encode(self.imgs[filename]))
+            assert np.array_equal(decode(eval(rle)), self.imgs[filename].ravel())
+
+        solution_path = os.path.join(self.folder, "solution.csv")
+        df["Usage"] = ["Public", "Private"] * 2
+        df.to_csv(solution_path, index=False)
+        psnr_csv, _ = score_files(solution_path, submission_path)
+        psnr_store, _ = score_files(solution_path, path)
+        assert psnr_csv == psnr_store
+        assert psnr_store["Total"] == 100
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "kaggle"))
+from rle import encode
+from submission import SubmissionWriter
+
+
+class SubmissionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        folder = "./submission_writer"
+        os.makedirs(folder)
+        cls.sample_submission = pd.DataFrame(
+            {"id": range(5), "filename": [f"{i}.png" for i in range(5)], "rle": 0}
+        )
+        cls.rle = {
+            f"{i}.png": encode(np.full((4, 4, 3), i, dtype=np.uint8)) for i in range(5)
+        }
+        cls.folder = folder
+
+    def expected_csv(self) -> str:
+        expected_df = self.sample_submission.copy()
+        expected_df["rle"] = [self.rle[f] for f in expected_df["filename"]]
+        path = os.path.join(self.folder, "expected.csv")
+        expected_df.to_csv(path, index=False)
+        with open(path, "r") as f:
+            return f.read()
+
+    def test_write_and_resume(self):
+        path = os.path.join(self.folder, "submission.csv")
+        with SubmissionWriter(path, self.sample_submission, flush_every=2) as writer:
+            for filename in ["0.png", "1.png", "2.png"]:
+                writer.add(filename, self.rle[filename])
+
+        # simulate crash in the middle of writing of the next row
+        with open(path, "a") as f:
+            f.write("3,3.png,b'eJ")
+
+        with SubmissionWriter(path, self.sample_submission, flush_every=2) as writer:
+            filenames = [
+                f for f in self.sample_submission["filename"] if f not in writer
+            ]
+            assert filenames == ["3.png", "4.png"]
+            for filename in filenames:
+                writer.add(filename, self.rle[filename])
+
+        with open(path, "r") as f:
+            assert f.read() == self.expected_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder)
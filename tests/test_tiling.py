@@ -0,0 +1,105 @@
+import sys
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from model.tiling import Tiler, auto_tile_size, axis_weights, blend_ramp, tile_starts
+
+
+def upscale(imgs, scale=4):
+    return [
+        cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+        for img in imgs
+    ]
+
+
+class TilingTestCase(unittest.TestCase):
+    def test_auto_tile_size(self):
+        assert auto_tile_size(64, 1024) == 256
+        assert auto_tile_size(64, 1024, multiple=96) == 192
+        assert auto_tile_size(0.001, 1024, multiple=32) == 32
+
+    def test_tile_starts(self):
+        assert tile_starts(100, 128, 20) == [0]
+        assert tile_starts(100, 40, 10) == [0, 30, 60]
+        assert tile_starts(110, 40, 10) == [0, 30, 60, 70]
+
+    def test_blend_ramp(self):
+        assert np.all(blend_ramp(16, 0, 0) == 1)
+        # neighbouring tiles cross-fade to 1 in overlap
+        first, second = blend_ramp(16, 0, 8), blend_ramp(16, 8, 0)
+        np.testing.assert_allclose(first[8:] + second[:8], 1)
+        assert np.all(first > 0) and np.all(second > 0)
+
+    def test_axis_weights(self):
+        starts = tile_starts(110, 40, 10)
+        weights = axis_weights(starts, 40, 160, 440)
+        total = np.zeros(440)
+        for out_start, ramp in weights.values():
+            total[out_start : out_start + len(ramp)] += ramp
+        np.testing.assert_allclose(total, 1, rtol=1e-6)
+
+    def test_run(self):
+        img = np.random.default_rng(0).integers(0, 256, (150, 230, 3), np.uint8)
+        batches = []
+
+        def forward(imgs):
+            batches.append([img.shape for img in imgs])
+            return upscale(imgs)
+
+        tiler = Tiler(tile=48, pad=8, memory_mb=1, bytes_per_pixel=256)
+        out = tiler.run([img], forward)[0]
+        assert out.dtype == np.uint8
+        np.testing.assert_array_equal(out, upscale([img])[0])
+        # all tiles have the same shape and batch fits into memory budget
+        shapes = {shape for batch in batches for shape in batch}
+        assert shapes == {(64, 64, 3)}
+        assert max(len(batch) for batch in batches) == tiler.batch_size(64, 64)
+
+    def test_run_fits(self):
+        imgs = [np.zeros((32, 32, 3), np.uint8)] * 2
+        batches = []
+
+        def forward(imgs):
+            batches.append(len(imgs))
+            return upscale(imgs)
+
+        assert Tiler(tile=64, pad=8).run(imgs, forward)[0].shape == (128, 128, 3)
+        assert Tiler(memory_mb=None).run(imgs, forward)[0].shape == (128, 128, 3)
+        assert batches == [2, 2]
+
+    def test_from_config(self):
+        # configs without budget keep whole-image inference
+        assert Tiler.from_config({}, 1024).tile_size() is None
+        assert Tiler.from_config({"tile": 0, "tile_pad": 10}, 1024).tile_size() is None
+        tiler = Tiler.from_config({"tile": 0, "tile_memory_mb": 64}, 1024)
+        assert tiler.tile_size() == 256
+        assert Tiler.from_config({"tile": 100, "tile_pad": 10}, 1024).tile_size() == 120
+
+    def test_tile_larger_than_overlap(self):
+        # automatic tile is raised above overlap of neighbouring tiles
+        tiler = Tiler(pad=16, memory_mb=0.001, bytes_per_pixel=1024, multiple=8)
+        assert tiler.tile_size() == 40
+        with self.assertRaises(ValueError):
+            Tiler(tile=-1)
+
+    def test_run_fractional_scale(self):
+        img = np.random.default_rng(0).integers(0, 256, (100, 70, 3), np.uint8)
+        out = Tiler(tile=24, pad=4).run([img], lambda imgs: upscale(imgs, 2.5))[0]
+        assert out.shape == (250, 175, 3)
+
+    def test_run_outscale(self):
+        def forward(imgs):
+            # backend resizes each image to int(size * outscale)
+            return [
+                cv2.resize(img, (int(img.shape[1] * 1.3), int(img.shape[0] * 1.3)))
+                for img in imgs
+            ]
+
+        img = np.random.default_rng(0).integers(0, 256, (117, 89, 3), np.uint8)
+        out = Tiler(tile=20, pad=4, outscale=1.3).run([img], forward)[0]
+        assert out.shape == (152, 115, 3)
+        assert out[-1].any() and out[:, -1].any()
@@ -0,0 +1,71 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from api.upload import UploadLimitMiddleware, file_buffer, image_size, read_image_size
+
+
+class UploadTestCase(unittest.TestCase):
+    def test_image_size(self):
+        img = np.random.default_rng(0).integers(0, 256, (37, 53, 3), dtype=np.uint8)
+        for ext, params in [
+            (".png", []),
+            (".jpg", []),
+            (".jpg", [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]),
+            (".webp", [cv2.IMWRITE_WEBP_QUALITY, 80]),
+            (".webp", [cv2.IMWRITE_WEBP_QUALITY, 101]),
+        ]:
+            _, encoded = cv2.imencode(ext, img, params)
+            assert image_size(encoded.tobytes()) == (37, 53), ext
+
+        _, encoded = cv2.imencode(".png", img)
+        assert image_size(encoded.tobytes()[:20]) is None
+        assert image_size(b"not an image") is None
+
+    def test_file_buffer(self):
+        _, encoded = cv2.imencode(".png", np.zeros((8, 8, 3), np.uint8))
+        data = encoded.tobytes()
+        for max_size in [1 << 20, 16]:
+            with tempfile.SpooledTemporaryFile(max_size=max_size) as file:
+                file.write(data)
+                file.seek(0)
+                assert read_image_size(file) == (8, 8)
+                assert file.tell() == 0
+                buffer = file_buffer(file)
+                assert bytes(buffer) == data
+                img = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+                assert img.shape == (8, 8, 3)
+                del buffer
+
+    def test_upload_limit(self):
+        app = FastAPI()
+        app.add_middleware(UploadLimitMiddleware, limits={"/upload": 1024})
+
+        @app.post("/upload")
+        def upload(file: UploadFile) -> int:
+            return len(file.file.read())
+
+        client = TestClient(app)
+        response = client.post("/upload", files={"file": ("a.bin", b"a" * 100)})
+        assert response.status_code == 200 and response.json() == 100
+        response = client.post("/upload", files={"file": ("a.bin", b"a" * 2048)})
+        assert response.status_code == 413
+
+        def chunks():
+            for _ in range(4):
+                yield b"a" * 512
+
+        # body without Content-Length is counted while it's received
+        response = client.post(
+            "/upload",
+            content=chunks(),
+            headers={"Content-Type": "multipart/form-data; boundary=x"},
+        )
+        assert response.status_code == 413
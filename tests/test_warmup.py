@@ -0,0 +1,32 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+from model.warmup import parse_shape, warmup
+
+
+class WarmupTestCase(unittest.TestCase):
+    def test_parse_shape(self):
+        assert parse_shape("270p") == (270, 480)
+        assert parse_shape("540p") == (540, 960)
+        assert parse_shape("256x128") == (256, 128)
+        with self.assertRaises(ValueError):
+            parse_shape("large")
+
+    def test_warmup(self):
+        shapes = []
+
+        def predict_batch(imgs, upsampler):
+            shapes.extend(img.shape for img in imgs)
+            return imgs
+
+        timings = warmup(predict_batch, None, ["270p", "360p", "64x64"])
+        assert shapes == [(270, 480, 3), (360, 640, 3), (64, 64, 3)]
+        assert list(timings) == ["270p", "360p", "64x64"]
+
+    def test_invalid_shape(self):
+        calls = []
+        with self.assertRaises(ValueError):
+            warmup(lambda imgs, upsampler: calls.append(1), None, ["270p", "big"])
+        assert not calls
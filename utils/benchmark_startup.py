@@ -0,0 +1,105 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+root = Path(__file__).parents[1]
+
+# commands are run from project root, CLI tools exit after parsing --help,
+# so their time is the time of module imports
+ENTRY_POINTS = {
+    "model_registry": [sys.executable, "-c", "import model"],
+    "api": [sys.executable, "-c", "import api.main"],
+    "predict_local": [sys.executable, "kaggle/predict_local.py", "--help"],
+    "predict": [sys.executable, "kaggle/predict.py", "--help"],
+    "metric_inference": [sys.executable, "metric/metric_inference.py", "--help"],
+    "torch2onnx": [sys.executable, "optimization/torch2onnx.py", "--help"],
+    # discovery imports all test modules without running tests
+    "tests": [
+        sys.executable,
+        "-c",
+        "import unittest; unittest.defaultTestLoader.discover('tests')",
+    ],
+}
+
+
+def measure(command: list[str], repeats: int) -> tuple[list[float], str]:
+    """
+    Measure wall time of command in fresh processes.
+
+    Parameters
+    ----------
+    command : list[str]
+        Command to run.
+    repeats : int
+        Number of runs.
+
+    Returns
+    -------
+    tuple[list[float], str]
+        0. Wall times of runs in seconds,
+        1. Last line of stderr if command failed, else None.
+    """
+    env = dict(os.environ, PYTHONPATH=str(root))
+    times, error = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=root, env=env, capture_output=True)
+        times += [time.perf_counter() - start]
+        if process.returncode != 0:
+            lines = process.stderr.decode().strip().splitlines()
+            error = lines[-1] if lines else f"exit code {process.returncode}"
+            break
+    return times, error
+
+
+def benchmark(entry_points: list[str], repeats: int) -> None:
+    """
+    Print startup time of entry points.
+
+    Parameters
+    ----------
+    entry_points : list[str]
+        Entry point names from ENTRY_POINTS.
+    repeats : int
+        Number of runs of each entry point, median and best times are reported.
+
+    Returns
+    -------
+    None
+    """
+    for name in entry_points:
+        times, error = measure(ENTRY_POINTS[name], repeats)
+        if error is not None:
+            print(f"{name}: failed after {times[-1]:.3f}s, {error}")
+            continue
+        print(
+            f"{name}: median = {statistics.median(times):.3f}s, "
+            f"best = {min(times):.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "-e",
+        "--entry-points",
+        type=str,
+        nargs="+",
+        default=list(ENTRY_POINTS.keys()),
+        choices=list(ENTRY_POINTS.keys()),
+        help="entry points to benchmark",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeats",
+        type=int,
+        default=5,
+        help="number of runs of each entry point",
+    )
+    args = parser.parse_args()
+
+    benchmark(args.entry_points, args.repeats)
@@ -0,0 +1,110 @@
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path, PurePath
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+import model as model_registry
+from api.cost import CostModel
+from model.warmup import parse_shape
+from utils.parse import parse_yaml
+
+
+def calibrate(
+    root: PurePath,
+    config_names: list[str],
+    shapes: list[str],
+    repeats: int,
+    output: str,
+    backend: str = None,
+) -> None:
+    """
+    Measure inference cost of model configs in seconds per input megapixel
+    and write it to cost model file used by API admission control.
+
+    Parameters
+    ----------
+    root : PurePath
+        Path to project root directory.
+    config_names : list[str]
+        Model config names in pretrained/model or trained/model format.
+    shapes : list[str]
+        Input resolutions, e.g. 270p or 256x256.
+    repeats : int
+        Number of runs for each resolution.
+    output : str
+        Path to cost model JSON file, existing costs of other configs are kept.
+    backend : str
+        Backend which overrides backend from configs.
+
+    Returns
+    -------
+    None
+    """
+    costs = CostModel(output)
+    for config_name in config_names:
+        config = parse_yaml(str(root / f"configs/model/{config_name}.yaml"))
+        if backend:
+            config["backend"] = backend
+        module = getattr(model_registry, config["model"])
+        # first run of each resolution is excluded from measurement
+        upsampler = module.configure(root, config, warmup_shapes=shapes)
+
+        total_time, total_megapixels = 0.0, 0.0
+        for shape in shapes:
+            h, w = parse_shape(shape)
+            img = np.random.default_rng(0).integers(0, 256, (h, w, 3), np.uint8)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                module.predict_batch([img], upsampler)
+                total_time += time.perf_counter() - start
+                total_megapixels += h * w / 10**6
+
+        seconds_per_megapixel = total_time / total_megapixels
+        costs.update(config_name, config["backend"], seconds_per_megapixel)
+        costs.save()
+        print(f"{config_name} ({config['backend']}): {seconds_per_megapixel:.3f} s/MP")
+
+
+if __name__ == "__main__":
+    root = Path(__file__).parents[1]
+
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--configs",
+        type=str,
+        nargs="+",
+        required=True,
+        help="model config names in pretrained/model or trained/model format",
+    )
+    parser.add_argument(
+        "--shapes",
+        type=str,
+        nargs="+",
+        default=["270p", "540p"],
+        help="input resolutions, e.g. 270p or 256x256",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeats",
+        type=int,
+        default=3,
+        help="number of runs for each resolution",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default=None,
+        help="backend which overrides backend from configs",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(root / "configs/cost_model.json"),
+        help="path to cost model JSON file",
+    )
+    args = parser.parse_args()
+
+    calibrate(root, args.configs, args.shapes, args.repeats, args.output, args.backend)